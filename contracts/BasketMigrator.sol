@@ -10,6 +10,7 @@ import {IBasketLogic} from "../interfaces/IBasketLogic.sol";
 import {ISwapRouter} from "../interfaces/uniswap/ISwapRouter.sol";
 import {ICurvePool_2Token} from "../interfaces/ICurvePool_2Token.sol";
 import {IERC20} from "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import {MerkleProof} from "@openzeppelin/contracts/utils/cryptography/MerkleProof.sol";
 import {SafeERC20} from "@openzeppelin/contracts/token/ERC20/utils/SafeERC20.sol";
 import {IUniswapV2Router01} from "@uniswap/periphery-contracts-v2/interfaces/IUniswapV2Router01.sol";
 
@@ -64,6 +65,18 @@ contract BasketMigrator {
     address internal constant crvLINK =
         0xcee60cFa923170e4f8204AE08B4fA6A3F5656F3a;
 
+    /// @notice UniswapV2 router address, index 0 of packed swaps.
+    address internal constant routerUniV2 =
+        0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D;
+
+    /// @notice Sushiswap router address, index 1 of packed swaps.
+    address internal constant routerSushi =
+        0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F;
+
+    /// @notice UniswapV3 router address, index 2 of packed swaps.
+    address internal constant routerUniV3 =
+        0xE592427A0AEce92De3Edee1F18E0157C05861564;
+
     /// @notice Governance address for this contract.
     address public immutable gov;
 
@@ -110,6 +123,21 @@ contract BasketMigrator {
     /// @notice Error emitted when the baking fails.
     error BakeFailed();
 
+    /// @notice Error emitted when a packed swap has an unknown router index.
+    error UnknownRouter();
+
+    /// @notice Error emitted on exit when the migration settled with a root.
+    error MerkleSettled();
+
+    /// @notice Error emitted when a claim was already made.
+    error AlreadyClaimed();
+
+    /// @notice Error emitted when a Merkle proof is invalid.
+    error InvalidProof();
+
+    /// @notice Error emitted when settling with an empty Merkle root.
+    error InvalidRoot();
+
     /*///////////////////////////////////////////////////////////////
                     Events definition
     ///////////////////////////////////////////////////////////////*/
@@ -120,6 +148,12 @@ contract BasketMigrator {
     /// @notice Event emitted when the deposits are closed.
     event Closed();
 
+    /// @notice Event emitted when a user's DEFI++ is sent.
+    event Exit(address indexed who, uint256 amount);
+
+    /// @notice Event emitted when the migration settles with a Merkle root.
+    event Root(bytes32 merkleRoot);
+
     /*///////////////////////////////////////////////////////////////
                           Storage
     ///////////////////////////////////////////////////////////////*/
@@ -140,6 +174,17 @@ contract BasketMigrator {
     /// @notice Deposited amount per user.
     mapping(address => uint256) public deposits;
 
+    /// @notice Whether a token is max-approved for a spender.
+    /// @dev Set once the approval is given, allowances of the migration
+    ///      never get close to type(uint256).max.
+    mapping(address => mapping(address => bool)) public approved;
+
+    /// @notice Root of the (index, account, amount) claims, if settled so.
+    bytes32 public merkleRoot;
+
+    /// @notice Claimed indexes, 256 per word.
+    mapping(uint256 => uint256) internal claimedBitmap;
+
     /*///////////////////////////////////////////////////////////////
                           Constructor
     ///////////////////////////////////////////////////////////////*/
@@ -181,14 +226,55 @@ contract BasketMigrator {
     /// @notice Let users withdraw their share.
     function exit() external {
         if (state != 2) revert NotBaked();
+        if (merkleRoot != bytes32(0)) revert MerkleSettled();
+        if (!_exit(msg.sender)) revert NoDeposit();
+    }
+
+    /// @notice Claim DEFI++ for an account, when settled with a Merkle root.
+    /// @dev Anyone can claim for anyone, DEFI++ always goes to `account`.
+    /// @param index Index of the claim in the tree.
+    /// @param account Account to send DEFI++ to.
+    /// @param amount Amount of DEFI++ to send.
+    /// @param proof Merkle proof of the claim.
+    function claim(
+        uint256 index,
+        address account,
+        uint256 amount,
+        bytes32[] calldata proof
+    ) external {
+        if (state != 2) revert NotBaked();
+        if (isClaimed(index)) revert AlreadyClaimed();
 
-        uint256 deposited = deposits[msg.sender];
+        bytes32 leaf = keccak256(abi.encodePacked(index, account, amount));
+        if (!MerkleProof.verify(proof, merkleRoot, leaf)) revert InvalidProof();
 
-        if (deposited == 0) revert NoDeposit();
+        claimedBitmap[index >> 8] |= 1 << (index & 0xff);
+        IERC20(DPP).transfer(account, amount);
 
-        deposits[msg.sender] = 0;
-        uint256 amount = (rate * deposited) / 1e18;
-        IERC20(DPP).transfer(msg.sender, amount);
+        emit Exit(account, amount);
+    }
+
+    /// @notice Whether the claim at `index` was made.
+    function isClaimed(uint256 index) public view returns (bool) {
+        return claimedBitmap[index >> 8] & (1 << (index & 0xff)) != 0;
+    }
+
+    /// @notice Send their share to many users at once.
+    /// @dev Users with no deposit left (e.g. that already exited) are
+    ///      skipped, so a batch can't be made to revert.
+    /// @param users Users to send DEFI++ to.
+    function exitFor(address[] calldata users) external {
+        if (state != 2) revert NotBaked();
+        if (msg.sender != gov) revert NotGovernance();
+        if (merkleRoot != bytes32(0)) revert MerkleSettled();
+
+        for (uint256 i; i < users.length; ) {
+            _exit(users[i]);
+
+            unchecked {
+                ++i;
+            }
+        }
     }
 
     /*///////////////////////////////////////////////////////////////
@@ -241,6 +327,47 @@ contract BasketMigrator {
         }
     }
 
+    /// @notice Execute given-out swaps ahead of a bake.
+    /// @dev Lets big bakes buy the underlyings over several transactions,
+    ///      the final bake then runs with no (or few) swaps.
+    /// @param swaps A list of swaps (v2 or v3) encoded in structs.
+    /// @param deadline A deadline for the swaps to happen.
+    function execSwapsGivenOut(Swap[] calldata swaps, uint256 deadline)
+        external
+    {
+        if (state != 1) revert NotBaking();
+        if (msg.sender != gov) revert NotGovernance();
+        if (deadline <= block.timestamp) revert DeadlineReached();
+
+        _execSwapsGivenOut(swaps);
+    }
+
+    /// @notice Execute swaps, packed.
+    /// @dev Same as execSwaps, swaps in the packed format (see _execPacked).
+    /// @param swaps Packed swaps.
+    /// @param deadline A deadline for the swaps to happen.
+    function execSwapsPacked(bytes calldata swaps, uint256 deadline) external {
+        if (state != 1) revert NotBaking();
+        if (msg.sender != gov) revert NotGovernance();
+        if (deadline <= block.timestamp) revert DeadlineReached();
+
+        _execPacked(swaps, false);
+    }
+
+    /// @notice Execute given-out swaps ahead of a bake, packed.
+    /// @dev Same as execSwapsGivenOut, swaps in the packed format.
+    /// @param swaps Packed swaps.
+    /// @param deadline A deadline for the swaps to happen.
+    function execSwapsGivenOutPacked(bytes calldata swaps, uint256 deadline)
+        external
+    {
+        if (state != 1) revert NotBaking();
+        if (msg.sender != gov) revert NotGovernance();
+        if (deadline <= block.timestamp) revert DeadlineReached();
+
+        _execPacked(swaps, true);
+    }
+
     /// @notice Bake it all.
     /// @param amountOut Amount to bake.
     /// @param maxAmountIn Maximum amount of WETH to use.
@@ -254,37 +381,34 @@ contract BasketMigrator {
         bool approvals,
         Swap[] calldata swaps
     ) external payable {
-        if (state != 1) revert NotBaking();
-        if (msg.sender != gov) revert NotGovernance();
-        if (deadline <= block.timestamp) revert DeadlineReached();
-
-        if (msg.value != 0) {
-            // help the bake by sending some ETH
-            (bool succ, ) = WETH.call{value: msg.value}("");
-            if (!succ) revert();
-        }
-
-        uint256 balanceIn = IERC20(WETH).balanceOf(address(this));
+        uint256 balanceIn = _beforeBake(deadline);
 
         // Execute swaps
         _execSwapsGivenOut(swaps);
 
-        // Execute approvals if needed
-        if (approvals) _execApprovalsForBasket();
-
-        // Join DEFI++
-        IBasketFacet(DPP).joinPool(amountOut);
+        _afterBake(amountOut, maxAmountIn, approvals, balanceIn);
+    }
 
-        // Check amount used is less than required
-        uint256 usedIn = balanceIn - IERC20(WETH).balanceOf(address(this));
+    /// @notice Bake it all, packed.
+    /// @dev Same as bake, swaps in the packed format (see _execPacked).
+    /// @param amountOut Amount to bake.
+    /// @param maxAmountIn Maximum amount of WETH to use.
+    /// @param deadline A deadline for the bake to occour.
+    /// @param approvals Indicates if approvals for underlyings should be done.
+    /// @param swaps Packed swaps from WETH to underlyings.
+    function bakePacked(
+        uint256 amountOut,
+        uint256 maxAmountIn,
+        uint256 deadline,
+        bool approvals,
+        bytes calldata swaps
+    ) external payable {
+        uint256 balanceIn = _beforeBake(deadline);
 
-        if (usedIn >= maxAmountIn) revert BakeFailed();
+        // Execute swaps
+        _execPacked(swaps, true);
 
-        if (msg.value != 0) {
-            balanceIn = IERC20(WETH).balanceOf(address(this));
-            uint256 refund = (balanceIn >= msg.value) ? msg.value : balanceIn;
-            if (refund != 0) IERC20(WETH).transfer(msg.sender, refund);
-        }
+        _afterBake(amountOut, maxAmountIn, approvals, balanceIn);
     }
 
     /// @notice Settle the migration and broadcast exchange rate.
@@ -298,6 +422,22 @@ contract BasketMigrator {
         rate = (dppBalance * 1e18) / total; // compute rate
     }
 
+    /// @notice Settle the migration with the root of the claims.
+    /// @dev Call settle(false) first: claims are computed off-chain from its
+    ///      rate and the deposits. exit and exitFor are disabled after this.
+    /// @param root Merkle root of the (index, account, amount) claims.
+    function settleMerkle(bytes32 root) external {
+        if (state != 1) revert NotBaking();
+        if (msg.sender != gov) revert NotGovernance();
+        // a zero root would leave exit and exitFor open, and claim unusable
+        if (root == bytes32(0)) revert InvalidRoot();
+
+        merkleRoot = root;
+        state = 2;
+
+        emit Root(root);
+    }
+
     /*///////////////////////////////////////////////////////////////
                             Internal
     ///////////////////////////////////////////////////////////////*/
@@ -316,11 +456,150 @@ contract BasketMigrator {
         }
     }
 
+    /// @dev Sends `user` their share, returns false if they have no deposit.
+    function _exit(address user) internal returns (bool) {
+        uint256 deposited = deposits[user];
+
+        if (deposited == 0) return false;
+
+        deposits[user] = 0;
+        uint256 amount = (rate * deposited) / 1e18;
+        IERC20(DPP).transfer(user, amount);
+
+        emit Exit(user, amount);
+        return true;
+    }
+
+    /// @dev Checks and wraps ETH for a bake, returns the WETH balance.
+    function _beforeBake(uint256 deadline) internal returns (uint256) {
+        if (state != 1) revert NotBaking();
+        if (msg.sender != gov) revert NotGovernance();
+        if (deadline <= block.timestamp) revert DeadlineReached();
+
+        if (msg.value != 0) {
+            // help the bake by sending some ETH
+            (bool succ, ) = WETH.call{value: msg.value}("");
+            if (!succ) revert();
+        }
+
+        return IERC20(WETH).balanceOf(address(this));
+    }
+
+    /// @dev Joins DEFI++ with the underlyings bought, checks the WETH used.
+    function _afterBake(
+        uint256 amountOut,
+        uint256 maxAmountIn,
+        bool approvals,
+        uint256 balanceIn
+    ) internal {
+        // Execute approvals if needed
+        if (approvals) _execApprovalsForBasket();
+
+        // Join DEFI++
+        IBasketFacet(DPP).joinPool(amountOut);
+
+        // Check amount used is less than required
+        uint256 usedIn = balanceIn - IERC20(WETH).balanceOf(address(this));
+
+        if (usedIn >= maxAmountIn) revert BakeFailed();
+
+        if (msg.value != 0) {
+            balanceIn = IERC20(WETH).balanceOf(address(this));
+            uint256 refund = (balanceIn >= msg.value) ? msg.value : balanceIn;
+            if (refund != 0) IERC20(WETH).transfer(msg.sender, refund);
+        }
+    }
+
+    /// @dev Executes packed swaps. They are concatenated, each one being:
+    ///      - the router, as an uint8 index: 0 UniswapV2, 1 Sushiswap,
+    ///        2 UniswapV3
+    ///      - V2: the path length as an uint8, then the path (20 bytes each)
+    ///      - V3: tokenIn and tokenOut (20 bytes each), then the fee (uint24)
+    ///      - amount then limit, as uint128
+    ///      Amount and limit are exact in / min out if !givenOut, exact out /
+    ///      max in otherwise.
+    function _execPacked(bytes calldata swaps, bool givenOut) internal {
+        uint256 i;
+
+        while (i < swaps.length) {
+            uint8 router = uint8(swaps[i]);
+
+            if (router == 2) {
+                i = _execPackedV3(swaps, i + 1, givenOut);
+            } else {
+                i = _execPackedV2(swaps, i + 1, router, givenOut);
+            }
+        }
+    }
+
+    /// @dev Executes the V2 swap packed at swaps[i:], returns its end.
+    function _execPackedV2(
+        bytes calldata swaps,
+        uint256 i,
+        uint8 index,
+        bool givenOut
+    ) internal returns (uint256) {
+        address router;
+        if (index == 0) router = routerUniV2;
+        else if (index == 1) router = routerSushi;
+        else revert UnknownRouter();
+
+        uint256 length = uint8(swaps[i]);
+        address[] memory path = new address[](length);
+        i += 1;
+
+        for (uint256 j; j < length; ) {
+            path[j] = address(bytes20(swaps[i:i + 20]));
+
+            unchecked {
+                i += 20;
+                ++j;
+            }
+        }
+
+        uint256 amount = uint128(bytes16(swaps[i:i + 16]));
+        uint256 limit = uint128(bytes16(swaps[i + 16:i + 32]));
+
+        if (givenOut) _swapV2GivenOut(router, path, amount, limit);
+        else _swapV2GivenIn(router, path, amount, limit);
+
+        return i + 32;
+    }
+
+    /// @dev Executes the V3 swap packed at swaps[i:], returns its end.
+    function _execPackedV3(
+        bytes calldata swaps,
+        uint256 i,
+        bool givenOut
+    ) internal returns (uint256) {
+        address tokenIn = address(bytes20(swaps[i:i + 20]));
+        address tokenOut = address(bytes20(swaps[i + 20:i + 40]));
+        uint24 fee = uint24(bytes3(swaps[i + 40:i + 43]));
+        uint256 amount = uint128(bytes16(swaps[i + 43:i + 59]));
+        uint256 limit = uint128(bytes16(swaps[i + 59:i + 75]));
+
+        if (givenOut) {
+            _swapV3GivenOut(routerUniV3, tokenIn, tokenOut, fee, amount, limit);
+        } else {
+            _swapV3GivenIn(routerUniV3, tokenIn, tokenOut, fee, amount, limit);
+        }
+
+        return i + 75;
+    }
+
+    /// @dev Max-approves `spender` for `token`, unless already done.
+    function _approveMax(address token, address spender) internal {
+        if (approved[token][spender]) return;
+
+        approved[token][spender] = true;
+        IERC20(token).approve(spender, type(uint256).max);
+    }
+
     function _execApprovalsForBasket() internal {
         address[] memory tokens = IBasketFacet(DPP).getTokens();
 
         for (uint256 i = 0; i < tokens.length; ) {
-            IERC20(tokens[i]).approve(DPP, type(uint256).max);
+            _approveMax(tokens[i], DPP);
 
             unchecked {
                 ++i;
@@ -333,18 +612,24 @@ contract BasketMigrator {
         (
             address router,
             address[] memory path,
-            uint256 amountOut,
-            uint256 amountInMin
+            uint256 amountIn,
+            uint256 amountOutMin
         ) = abi.decode(swap.data, (address, address[], uint256, uint256));
 
-        IERC20 tokenIn = IERC20(path[0]);
-        if (tokenIn.allowance(address(this), router) <= amountOut) {
-            tokenIn.approve(router, type(uint256).max);
-        }
+        _swapV2GivenIn(router, path, amountIn, amountOutMin);
+    }
+
+    function _swapV2GivenIn(
+        address router,
+        address[] memory path,
+        uint256 amountIn,
+        uint256 amountOutMin
+    ) internal {
+        _approveMax(path[0], router);
 
         IUniswapV2Router01(router).swapExactTokensForTokens(
-            amountOut,
-            amountInMin,
+            amountIn,
+            amountOutMin,
             path,
             address(this),
             block.timestamp
@@ -360,10 +645,16 @@ contract BasketMigrator {
             uint256 amountInMax
         ) = abi.decode(swap.data, (address, address[], uint256, uint256));
 
-        IERC20 tokenIn = IERC20(path[0]);
-        if (tokenIn.allowance(address(this), router) <= amountInMax) {
-            tokenIn.approve(router, type(uint256).max);
-        }
+        _swapV2GivenOut(router, path, amountOut, amountInMax);
+    }
+
+    function _swapV2GivenOut(
+        address router,
+        address[] memory path,
+        uint256 amountOut,
+        uint256 amountInMax
+    ) internal {
+        _approveMax(path[0], router);
 
         IUniswapV2Router01(router).swapTokensForExactTokens(
             amountOut,
@@ -388,9 +679,18 @@ contract BasketMigrator {
                 (address, address, address, uint24, uint256, uint256)
             );
 
-        if (IERC20(tokenIn).allowance(address(this), router) <= amountIn) {
-            IERC20(tokenIn).approve(router, type(uint256).max);
-        }
+        _swapV3GivenIn(router, tokenIn, tokenOut, fee, amountIn, amountOutMin);
+    }
+
+    function _swapV3GivenIn(
+        address router,
+        address tokenIn,
+        address tokenOut,
+        uint24 fee,
+        uint256 amountIn,
+        uint256 amountOutMin
+    ) internal {
+        _approveMax(tokenIn, router);
 
         ISwapRouter.ExactInputSingleParams memory params;
         params.tokenIn = tokenIn;
@@ -418,9 +718,18 @@ contract BasketMigrator {
                 (address, address, address, uint24, uint256, uint256)
             );
 
-        if (IERC20(tokenIn).allowance(address(this), router) <= amountInMax) {
-            IERC20(tokenIn).approve(router, type(uint256).max);
-        }
+        _swapV3GivenOut(router, tokenIn, tokenOut, fee, amountOut, amountInMax);
+    }
+
+    function _swapV3GivenOut(
+        address router,
+        address tokenIn,
+        address tokenOut,
+        uint24 fee,
+        uint256 amountOut,
+        uint256 amountInMax
+    ) internal {
+        _approveMax(tokenIn, router);
 
         ISwapRouter.ExactOutputSingleParams memory params;
         params.tokenIn = tokenIn;
@@ -0,0 +1,35 @@
+// SPDX-License-Identifier: MIT
+pragma solidity >=0.8.0;
+pragma experimental ABIEncoderV2;
+
+interface IMulticall2 {
+    struct Call {
+        address target;
+        bytes callData;
+    }
+
+    struct Result {
+        bool success;
+        bytes returnData;
+    }
+
+    function aggregate(Call[] memory calls)
+        external
+        returns (uint256 blockNumber, bytes[] memory returnData);
+
+    function tryAggregate(bool requireSuccess, Call[] memory calls)
+        external
+        returns (Result[] memory returnData);
+
+    function tryBlockAndAggregate(bool requireSuccess, Call[] memory calls)
+        external
+        returns (
+            uint256 blockNumber,
+            bytes32 blockHash,
+            Result[] memory returnData
+        );
+
+    function getBlockNumber() external view returns (uint256 blockNumber);
+
+    function getEthBalance(address addr) external view returns (uint256 balance);
+}
@@ -0,0 +1,62 @@
+"""
+Vendored ABI store.
+
+One JSON file per contract under abis/, named after the lowercase address:
+
+    {"version": 1, "name": ..., "source": "interfaces" | "explorer", "abi": [...]}
+
+Entries seeded by hand ("interfaces") only hold the functions the scripts
+and tests use, entries written through after an explorer lookup ("explorer")
+hold the full verified ABI. Files with another `version` are ignored, so a
+change of format falls back to the explorer instead of misloading.
+"""
+
+import json
+import os
+
+ABI_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "abis")
+ABI_STORE_VERSION = 1
+
+
+class AbiStore:
+    def __init__(self, path=ABI_DIR):
+        self.path = path
+
+    def _file(self, address):
+        return os.path.join(self.path, f"{address.lower()}.json")
+
+    def get(self, address):
+        """
+        Returns (name, abi) of the stored contract, or None on a miss.
+        """
+        try:
+            with open(self._file(address)) as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        if entry.get("version") != ABI_STORE_VERSION:
+            return None
+
+        return (entry["name"], entry["abi"])
+
+    def put(self, address, name, abi, source="explorer"):
+        os.makedirs(self.path, exist_ok=True)
+
+        entry = {
+            "version": ABI_STORE_VERSION,
+            "name": name,
+            "source": source,
+            "abi": abi,
+        }
+        with open(self._file(address), "w") as f:
+            json.dump(entry, f, indent=1)
+            f.write("\n")
+
+    def addresses(self):
+        return sorted(
+            f[: -len(".json")] for f in os.listdir(self.path) if f.endswith(".json")
+        )
+
+
+ABI_STORE = AbiStore()
@@ -0,0 +1,33 @@
+"""
+Approvals the migrator needs for a batch of swaps or a bake.
+
+BasketMigrator max-approves a (token, spender) pair the first time it uses it
+and records it in `approved`, later calls skip both the approve and the
+allowance read. The pairs a plan uses are known ahead of time: the first
+token of each leg for its router, and every basket token for the basket
+itself when baking. Checking them against `approved` (see
+scripts.multicall.missing_approvals) tells which approvals a call will pay
+for, and whether bake needs `approvals` at all.
+"""
+
+from scripts.constants import DPP_ADDR, ROUTER_SUSHI, ROUTER_UNIV2, ROUTER_UNIV3
+
+ROUTERS = {"univ2": ROUTER_UNIV2, "sushi": ROUTER_SUSHI, "univ3": ROUTER_UNIV3}
+
+
+def required_approvals(legs, basket_tokens=(), basket=DPP_ADDR):
+    """
+    Sorted (token, spender) pairs, lowercase, used by `legs` and, for a
+    bake, by joining `basket` with `basket_tokens`.
+    """
+    pairs = {(leg.path[0].lower(), ROUTERS[leg.venue].lower()) for leg in legs}
+    pairs |= {(t.lower(), basket.lower()) for t in basket_tokens}
+
+    return sorted(pairs)
+
+
+def needs_basket_approvals(missing, basket=DPP_ADDR):
+    """
+    Whether bake must run with `approvals`, given the `missing` pairs.
+    """
+    return any(spender == basket.lower() for (_, spender) in missing)
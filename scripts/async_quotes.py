@@ -0,0 +1,326 @@
+"""
+Asyncio quote engine.
+
+Fans out quotes as raw JSON-RPC eth_calls, bounded by a semaphore, with
+per-request timeouts, retries and optional hedged duplicates sent to the next
+RPC endpoint when the first one is slow. Results match the blocking helpers
+of scripts.quotes, sentinels included: a reverting call or an undecodable
+answer is a failed quote, while a node that times out or errors out raises.
+Uniswap V3 pools are resolved through the persistent pool index, so a pool
+costs a getPool call the first time only.
+"""
+
+import asyncio
+import itertools
+
+import aiohttp
+from eth_abi import decode_single, encode_abi
+from eth_abi.exceptions import DecodingError
+from eth_utils import function_signature_to_4byte_selector
+
+from scripts.constants import FACTORY_UNIV3, QUOTER_UNIV3
+from scripts.pool_index import POOL_INDEX, ZERO_ADDRESS, PoolIndex
+from scripts.quotes import ROUTERS_UNIV2, ROUTES, Quote, failed_quote
+from scripts.univ2_math import sort_tokens
+
+GET_AMOUNTS_OUT = function_signature_to_4byte_selector(
+    "getAmountsOut(uint256,address[])"
+)
+GET_AMOUNTS_IN = function_signature_to_4byte_selector("getAmountsIn(uint256,address[])")
+GET_POOL = function_signature_to_4byte_selector("getPool(address,address,uint24)")
+QUOTE_EXACT_INPUT_SINGLE = function_signature_to_4byte_selector(
+    "quoteExactInputSingle(address,address,uint24,uint256,uint160)"
+)
+QUOTE_EXACT_OUTPUT_SINGLE = function_signature_to_4byte_selector(
+    "quoteExactOutputSingle(address,address,uint24,uint256,uint160)"
+)
+
+
+class RPCError(Exception):
+    """JSON-RPC error returned by an endpoint."""
+
+
+class Reverted(RPCError):
+    """The call reverted, retrying or hedging won't help."""
+
+
+def _calldata(selector, types, args):
+    return "0x" + (selector + encode_abi(types, args)).hex()
+
+
+class AsyncQuoteEngine:
+    """
+    Concurrent quoter over one or more JSON-RPC `endpoints`.
+
+    - `concurrency`: maximum number of requests in flight.
+    - `timeout`: seconds allowed for every attempt of a request.
+    - `retries`: extra attempts after a failed one, rotating endpoints.
+    - `hedge_delay`: if set, a duplicate request is sent to the next endpoint
+      each time this many seconds pass without an answer (up to `hedges`).
+    - `stats`: if set, a scripts.rpc_stats.RpcStats recording every request.
+    - `pool_index`: the scripts.pool_index.PoolIndex resolving V3 pools.
+    """
+
+    def __init__(
+        self,
+        endpoints,
+        concurrency=16,
+        timeout=10.0,
+        retries=2,
+        backoff=0.1,
+        hedge_delay=None,
+        hedges=1,
+        stats=None,
+        pool_index=POOL_INDEX,
+    ):
+        if isinstance(endpoints, str):
+            endpoints = [endpoints]
+
+        self.endpoints = list(endpoints)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_delay = hedge_delay
+        self.hedges = hedges if hedge_delay is not None else 0
+        self.stats = stats
+        self.pool_index = pool_index
+
+        self._ids = itertools.count(1)
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def _post(self, endpoint, method, params):
+        payload = {
+            "jsonrpc": "2.0",
+            "id": next(self._ids),
+            "method": method,
+            "params": params,
+        }
+
+        if self.stats is not None:
+            start = self.stats.clock()
+
+        async with self._session.post(endpoint, json=payload) as resp:
+            resp.raise_for_status()
+            body = await resp.json(content_type=None)
+
+        if self.stats is not None:
+            self.stats.record(method, params, self.stats.clock() - start, body)
+
+        if "error" in body:
+            error = body["error"]
+            message = error.get("message", "")
+            if error.get("code") == 3 or "revert" in message:
+                raise Reverted(message)
+            raise RPCError(message)
+
+        return body["result"]
+
+    async def _hedged(self, method, params, attempt):
+        n = len(self.endpoints)
+        order = [
+            self.endpoints[(attempt + i) % n] for i in range(min(n, 1 + self.hedges))
+        ]
+        pending = set()
+        error = None
+
+        try:
+            for (i, endpoint) in enumerate(order):
+                task = asyncio.ensure_future(self._post(endpoint, method, params))
+                pending.add(task)
+                last = i + 1 == len(order)
+
+                while pending:
+                    (done, pending) = await asyncio.wait(
+                        pending,
+                        timeout=None if last else self.hedge_delay,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+
+                    if not done:
+                        break  # too slow, send a duplicate to the next endpoint
+
+                    for task in done:
+                        if task.exception() is None:
+                            return task.result()
+                        if isinstance(task.exception(), Reverted):
+                            raise task.exception()
+                        error = task.exception()
+
+                    if not last:
+                        break  # failed, move to the next endpoint right away
+
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def request(self, method, params):
+        """
+        Sends a JSON-RPC request with retries, timeouts and hedging.
+        """
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    return await asyncio.wait_for(
+                        self._hedged(method, params, attempt), self.timeout
+                    )
+                except Reverted:
+                    raise
+                except (asyncio.TimeoutError, aiohttp.ClientError, RPCError) as e:
+                    error = e
+
+                if attempt < self.retries:
+                    await asyncio.sleep(self.backoff * 2**attempt)
+
+            raise error
+
+    async def block_number(self):
+        return int(await self.request("eth_blockNumber", []), 16)
+
+    async def eth_call(self, to, data, block):
+        params = [{"to": to, "data": data}, hex(block)]
+        result = await self.request("eth_call", params)
+        return bytes.fromhex(result[2:])
+
+    @staticmethod
+    def _pool_key(q):
+        return PoolIndex.key(
+            FACTORY_UNIV3, *sort_tokens(q.token_in, q.token_out), q.fee
+        )
+
+    async def resolve_pools(self, quotes, block):
+        """
+        Asks the factory about the V3 pools of `quotes` the index doesn't know.
+        """
+        keys = {self._pool_key(q): q for q in quotes if q.venue == "univ3"}
+        missing = [
+            (k, q) for (k, q) in keys.items() if self.pool_index.get(k, block) is None
+        ]
+        if not missing:
+            return
+
+        pools = await asyncio.gather(
+            *(
+                self.eth_call(
+                    FACTORY_UNIV3,
+                    _calldata(
+                        GET_POOL,
+                        ["address", "address", "uint24"],
+                        [q.token_in, q.token_out, q.fee],
+                    ),
+                    block,
+                )
+                for (_, q) in missing
+            )
+        )
+
+        for ((k, _), pool) in zip(missing, pools):
+            self.pool_index.put(k, decode_single("address", pool), block)
+        self.pool_index.save()
+
+    async def quote(self, q, block):
+        """
+        Quotes a single Quote at `block`, returning the failed sentinel if the
+        call reverts or its answer can't be decoded.
+        """
+        if q.venue == "univ3":
+            pool = self.pool_index.get(self._pool_key(q), block)
+            if pool is None or pool.lower() == ZERO_ADDRESS:
+                return failed_quote(q.given_out)
+
+            if q.given_out:
+                selector = QUOTE_EXACT_OUTPUT_SINGLE
+            else:
+                selector = QUOTE_EXACT_INPUT_SINGLE
+
+            (target, data) = (
+                QUOTER_UNIV3,
+                _calldata(
+                    selector,
+                    ["address", "address", "uint24", "uint256", "uint160"],
+                    [q.token_in, q.token_out, q.fee, q.amount, 0],
+                ),
+            )
+        else:
+            selector = GET_AMOUNTS_IN if q.given_out else GET_AMOUNTS_OUT
+            (target, data) = (
+                ROUTERS_UNIV2[q.venue],
+                _calldata(
+                    selector,
+                    ["uint256", "address[]"],
+                    [q.amount, [q.token_in, q.token_out]],
+                ),
+            )
+
+        try:
+            result = await self.eth_call(target, data, block)
+            if q.venue == "univ3":
+                return decode_single("uint256", result)
+            amounts = decode_single("uint256[]", result)
+        except (Reverted, DecodingError):
+            return failed_quote(q.given_out)
+
+        return amounts[0] if q.given_out else amounts[1]
+
+    async def quote_all(self, quotes, block_identifier=None):
+        """
+        Quotes all `quotes` concurrently, pinned to one block.
+
+        Returns (block_number, [amount, ...]) in the same order as `quotes`.
+        """
+        if block_identifier is None:
+            block_identifier = await self.block_number()
+
+        await self.resolve_pools(quotes, block_identifier)
+
+        amounts = await asyncio.gather(
+            *(self.quote(q, block_identifier) for q in quotes)
+        )
+
+        return (block_identifier, list(amounts))
+
+
+def quote_all(endpoints, quotes, block_identifier=None, **kwargs):
+    """
+    Blocking entry point: runs AsyncQuoteEngine(endpoints, **kwargs).quote_all.
+    """
+
+    async def run():
+        async with AsyncQuoteEngine(endpoints, **kwargs) as engine:
+            return await engine.quote_all(quotes, block_identifier)
+
+    return asyncio.run(run())
+
+
+def quote_venues(
+    endpoints, trades, given_out=False, block_identifier=None, routes=ROUTES, **kwargs
+):
+    """
+    Quotes every (token_in, token_out, amount) of `trades` on all `routes`.
+
+    Returns (block_number, [{(venue, fee): amount}, ...]) following `trades`.
+    """
+    quotes = [
+        Quote(v, token_in, token_out, amount, given_out, fee)
+        for (token_in, token_out, amount) in trades
+        for (v, fee) in routes
+    ]
+
+    (block_number, amounts) = quote_all(endpoints, quotes, block_identifier, **kwargs)
+
+    by_trade = [
+        dict(zip(routes, amounts[i : i + len(routes)]))
+        for i in range(0, len(amounts), len(routes))
+    ]
+
+    return (block_number, by_trade)
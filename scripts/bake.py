@@ -1,43 +1,33 @@
 from ape_safe import ApeSafe
-from brownie import ZERO_ADDRESS
-from eth_abi import encode_single
-from brownie import interface, chain
-from brownie import Contract, BasketMigrator
-
-AMOUNT_OUT = 0  # todo: update when baking
-
-
-HALF_HOUR = 1800
-WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
-DEV_SAFE_ADDRESS = "0x6458A23B020f489651f2777Bd849ddEd34DfCcd2"
+from brownie import interface, chain, network, web3
+from brownie import BasketMigrator
+
+from scripts.constants import (
+    DEV_SAFE_ADDRESS,
+    DPP_ADDR,
+    HALF_HOUR,
+    WETH,
+)
+from scripts.approvals import needs_basket_approvals, required_approvals
+from scripts.gas_model import GasModel, contract_version
+from scripts.bake_solver import bake_plan, solve_bake, tokens_for_amount
+from scripts.chunks import chunk_bake, post_chunks
+from scripts.multicall import balances_of, missing_approvals
+from scripts.packed import pack_legs
+from scripts.paths import PathFinder, connector_pairs
+from scripts.planner import plan_given_out
+from scripts.replan import Replanner
+from scripts.rpc_stats import RpcStats, export_path
+from scripts.simulation import check, report, simulate
+from scripts.snapshots import (
+    fetch_basket,
+    fetch_market,
+    fetch_univ3_pool,
+    pool_addresses,
+    weth_pairs,
+)
 
 MIGRATOR = ""
-DPP_ADDR = "0x8D1ce361eb68e9E05573443C407D4A3Bed23B033"
-ROUTER_UNIV2 = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
-ROUTER_SUSHI = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
-ROUTER_UNIV3 = "0xE592427A0AEce92De3Edee1F18E0157C05861564"
-QUOTER_UNIV3 = "0xb27308f9F90D607463bb33eA1BeBb41C27CE5AB6"
-FACTORY_UNIV3 = "0x1F98431c8aD98523631AE4a59f267346ea31F984"
-
-"""
-Fetches a quote from the Uniswap V2 application
-"""
-
-
-def quote_univ2(router, token_in, token_out, amount_in):
-    router = interface.IUniswapV2Router01(router)
-    try:
-        return router.getAmountsOut(amount_in, [token_in, token_out])[1]
-    except:
-        return 0
-
-
-def quote_univ2_given_out(router, token_in, token_out, amount_out):
-    router = interface.IUniswapV2Router01(router)
-    try:
-        return router.getAmountsIn(amount_out, [token_in, token_out])[0]
-    except:
-        return 2**256 - 1
 
 
 def swap_univ2(router, token_in, token_out, max_in, amount_out, account):
@@ -55,40 +45,6 @@ def swap_univ2(router, token_in, token_out, max_in, amount_out, account):
     )
 
 
-def quote_univ3(factory, quoter, token_in, token_out, amount_in):
-    factory = interface.IUniswapV3Factory(factory)
-    pool = factory.getPool(token_in, token_out, 3000)
-
-    if pool == ZERO_ADDRESS:
-        return 0
-    else:
-        try:
-            quoter = interface.IQuoter(quoter)
-            quote = quoter.quoteExactInputSingle.call(
-                token_in, token_out, 3000, amount_in, 0
-            )
-            return quote
-        except:
-            return 0
-
-
-def quote_univ3_given_out(factory, quoter, token_in, token_out, amount_out):
-    factory = interface.IUniswapV3Factory(factory)
-    pool = factory.getPool(token_in, token_out, 3000)
-
-    if pool == ZERO_ADDRESS:
-        return 2**256 - 1
-    else:
-        try:
-            quoter = interface.IQuoter(quoter)
-            quote = quoter.quoteExactOutputSingle.call(
-                token_in, token_out, 3000, amount_out, 0
-            )
-            return quote
-        except:
-            return 2**256 - 1
-
-
 def swap_univ3(router, token_in, token_out, max_in, amount_out, account):
     router = interface.ISwapRouter(router)
     interface.ERC20(token_in).approve(router, max_in, {"from": account})
@@ -107,93 +63,184 @@ def swap_univ3(router, token_in, token_out, max_in, amount_out, account):
     )
 
 
-def main():
-    # Initalise contracts
-    safe = ApeSafe(DEV_SAFE_ADDRESS)
-    migrator = BasketMigrator(MIGRATOR)
-    dpp_basket = interface.IBasketFacet(DPP_ADDR)
-    router_univ2 = Contract.from_explorer(ROUTER_UNIV2)
-    router_univ3 = Contract.from_explorer(ROUTER_UNIV3)
-    router_sushi = Contract.from_explorer(ROUTER_SUSHI)
-    quoter_univ3 = Contract.from_explorer(QUOTER_UNIV3)
-    factory_univ3 = Contract.from_explorer(FACTORY_UNIV3)
-
-    # extract the tokens and qtys needed for AMOUNT_OUT of defi++
-    (tokens, amounts) = dpp_basket.calcTokensForAmount(AMOUNT_OUT)
-
-    swaps = []
-    max_amount_in = 0
-
-    # fetch quotes from univ2,3 and sushi with 2% slippage
-    for (t, amt) in zip(tokens, amounts):
-        univ2_in = int(quote_univ2_given_out(router_univ2, WETH, t, amt) * 1.02)
-        sushi_in = int(quote_univ2_given_out(router_sushi, WETH, t, amt) * 1.02)
-        univ3_in = int(
-            quote_univ3_given_out(factory_univ3, quoter_univ3, WETH, t, amt) * 1.02
-        )
+def main(mode="", *flags):
+    # "simulate" checks the calls' realized amounts before posting them
+    simulating = "simulate" in (mode, *flags)
+    if simulating and "fork" not in network.show_active():
+        raise ValueError("simulate runs on a fork, e.g. --network mainnet-fork")
 
-        # cycle through the quotes to find the best price
-        if univ2_in <= sushi_in and univ2_in <= univ3_in:
-            swaps.append(
-                (
-                    False,
-                    encode_single(
-                        "(address,address[],uint256,uint256)",
-                        [router_univ2.address, [WETH, t], amt, univ2_in],
-                    ),
-                )
+    # "refresh" updates the last plan instead of planning from scratch
+    refreshing = "refresh" in (mode, *flags)
+
+    # "chunked" splits the swaps in calls under the target gas, "separate"
+    # also posts each call as its own Safe transaction
+    separate = "separate" in (mode, *flags)
+    chunked = separate or "chunked" in (mode, *flags)
+    replanner = Replanner("bake")
+
+    # record every RPC request, by stage of the run
+    stats = RpcStats()
+    stats.install(web3)
+
+    # Initalise contracts
+    with stats.stage("init"):
+        safe = ApeSafe(DEV_SAFE_ADDRESS)
+        migrator = BasketMigrator(MIGRATOR)
+        dpp_basket = interface.IBasketFacet(DPP_ADDR)
+
+    with stats.stage("quoting"):
+        # WETH available to bake, and the DEFI++ basket at the same block
+        (block, (budget,)) = balances_of([WETH], MIGRATOR)
+        basket = fetch_basket(DPP_ADDR, block)
+
+        print(f"balance WETH before: {budget / 1e18}")
+
+        if refreshing and replanner.usable(block):
+            # the pools of the last plan's Market, brought to this block
+            traded = replanner.refresh(
+                web3.eth.get_logs, block, pool_addresses, fetch_univ3_pool
+            )
+            market = replanner.market
+        else:
+            # load every pool of the tokens against WETH, and the pairs of the
+            # connector tokens, once, all from the same block
+            traded = None
+            market = fetch_market(
+                weth_pairs(basket.tokens),
+                block_identifier=block,
+                v2_pairs=connector_pairs(basket.tokens, WETH),
             )
 
-            max_amount_in += univ2_in
-        elif sushi_in <= univ2_in and sushi_in <= univ3_in:
-            swaps.append(
-                (
-                    False,
-                    encode_single(
-                        "(address,address[],uint256,uint256)",
-                        [router_sushi.address, [WETH, t], amt, sushi_in],
-                    ),
+    print(f"pools loaded at block {market.block}")
+
+    with stats.stage("planning"):
+        # compare routes on their proceeds net of gas, at the current gas price
+        gas_model = GasModel.load(contract_version(BasketMigrator.bytecode))
+        gas_price = web3.eth.gas_price
+        finder = PathFinder(market, gas_model=gas_model)
+
+        def buy(t, amt, exclude):
+            return plan_given_out(market, finder, WETH, t, amt, gas_price, exclude)
+
+        plan = None
+        if traded is not None:
+            # the same bake, re-planning the underlyings whose pools traded
+            amount_out = replanner.meta["amount_out"]
+            amounts = tokens_for_amount(basket, amount_out)
+            try:
+                tokens = replanner.replan(
+                    traded, dict(zip(basket.tokens, amounts)), buy
+                )
+                plan = bake_plan(market, amount_out, replanner.plan())
+                print(f"{len(traded)} pools traded, {len(tokens)} tokens re-planned")
+            except ValueError as e:
+                # an underlying lost its routes: the full run names them all
+                print(f"refresh failed: {e}")
+
+            if plan is None or plan.max_amount_in > budget:
+                # the bake has to shrink: size it again on every pool
+                plan = None
+                market = fetch_market(
+                    weth_pairs(basket.tokens),
+                    block_identifier=block,
+                    v2_pairs=connector_pairs(basket.tokens, WETH),
                 )
+                finder = PathFinder(market, gas_model=gas_model)
+
+        if plan is None:
+            # largest amount of defi++ the WETH can buy: each token is split
+            # across venues and fee tiers, or sent through a multi-hop path.
+            # The max in of every leg allows for its pools' depth over the
+            # signing delay
+            plan = solve_bake(basket, market, finder, budget, gas_price)
+            replanner.record(
+                market,
+                dict(zip(basket.tokens, tokens_for_amount(basket, plan.amount_out))),
+                {
+                    t: [leg for leg in plan.legs if leg.path[-1].lower() == t.lower()]
+                    for t in basket.tokens
+                },
+                amount_out=plan.amount_out,
             )
 
-            max_amount_in += sushi_in
+        swaps = list(zip(plan.legs, plan.limits))
+
+        print(
+            f"baking {plan.amount_out / 1e18} DEFI++ "
+            f"for at most {plan.max_amount_in / 1e18} WETH"
+        )
+
+        # approvals the plan still needs: bake skips the basket's when none is
+        missing = missing_approvals(
+            MIGRATOR, required_approvals(plan.legs, basket.tokens), block
+        )
+        approvals = needs_basket_approvals(missing)
+
+        print(f"{len(missing)} approvals missing")
+
+        # optionally buy the underlyings in calls under the target gas first,
+        # bake then carries the swaps left
+        if chunked:
+            (chunks, swaps) = chunk_bake(swaps, len(basket.tokens), gas_model)
         else:
-            swaps.append(
-                (
-                    True,
-                    encode_single(
-                        "(address,address,address,uint24,uint256,uint256)",
-                        [router_univ3.address, WETH, t, 3000, amt, univ3_in],
-                    ),
-                )
-            )
+            chunks = []
 
-            max_amount_in += univ3_in
+    print(f"{len(chunks)} execSwapsGivenOutPacked calls before bake")
 
-    weth_erc20 = interface.ERC20(WETH)
-    balance_weth_before = weth_erc20.balanceOf(MIGRATOR)
+    with stats.stage("encoding"):
+        deadline = chain.time() + HALF_HOUR
+        receipts = [
+            migrator.execSwapsGivenOutPacked(
+                pack_legs(chunk), deadline, {"from": safe.account}
+            )
+            for chunk in chunks
+        ]
+
+        # @param amountOut Amount to bake.
+        # @param maxAmountIn Maximum amount of WETH to use.
+        # @param deadline A deadline for the bake to occour.
+        # @param approvals Indicates if approvals for underlyings should be done.
+        # @param swaps Packed swaps from WETH to underlyings.
+        receipts.append(
+            migrator.bakePacked(
+                plan.amount_out,
+                sum(limit for (_, limit) in swaps) + 1,
+                deadline,
+                approvals,
+                pack_legs(swaps),
+                {"from": safe.account},
+            )
+        )
 
-    print(f"balance WETH before: {balance_weth_before / 1e18}")
+        print(f"DEFI++ balance: {dpp_basket.balanceOf(MIGRATOR)}")
+        print(f"balance WETH after: {interface.ERC20(WETH).balanceOf(MIGRATOR)}")
+
+    if simulating:
+        with stats.stage("simulation"):
+            # the chunks executed on the fork, then bake's own swaps
+            tokens = [WETH, *basket.tokens]
+            (_, left) = balances_of(tokens, MIGRATOR)
+            simulation = simulate(
+                market,
+                [s for chunk in chunks for s in chunk] + swaps,
+                receipts,
+                MIGRATOR,
+                given_out=True,
+                leftovers={t: b for (t, b) in zip(tokens, left) if b},
+            )
 
-    # @param amountOut Amount to bake.
-    # @param maxAmountIn Maximum amount of WETH to use.
-    # @param deadline A deadline for the bake to occour.
-    # @param approvals Indicates if approvals for underlyings should be done.
-    # @param swaps Swaps from WETH to underlyings.
-    migrator.bake(
-        2000e18,  # is this the correct hardcoding?
-        max_amount_in,
-        chain.time() + HALF_HOUR,
-        True,
-        swaps,
-        {"from": safe.account},
-    )
+        print(report(simulation))
 
-    print(f"DEFI++ balance: {dpp_basket.balanceOf(MIGRATOR)}")
-    print(f"balance WETH after: {weth_erc20.balanceOf(MIGRATOR)}")
+        failures = check(simulation)
+        if failures:
+            print("\n".join(["simulation failed, nothing posted:"] + failures))
+            print(stats.summary())
+            stats.export(export_path("bake"))
+            return
 
     # Ape safe transactions
-    safe_tx = safe.multisend_from_receipts()
-    safe.preview(safe_tx)
-    safe.sign_with_frame(safe_tx)
-    safe.post_transaction(safe_tx)
+    with stats.stage("safe"):
+        post_chunks(safe, receipts, separate=separate)
+
+    print(stats.summary())
+    stats.export(export_path("bake"))
@@ -0,0 +1,132 @@
+"""
+Bake-size solver.
+
+Finds the largest amount of DEFI++ `bake` can mint with a WETH budget. The
+underlyings needed for an amount come from a local copy of
+BasketFacet.calcTokensForAmount, and their WETH cost from the planner on a
+Market, so every step of the search is local math only.
+
+The cost of minting grows with the amount (price impact), so the largest
+affordable amount is bracketed by doubling and then bisected.
+"""
+
+from collections import namedtuple
+
+from scripts.constants import WETH
+from scripts.planner import plan_given_out, plan_tokens
+from scripts.slippage import SlippageModel
+
+# the search stops once the amount is known within PRECISION wei of DEFI++
+PRECISION = 10**12
+
+# State of the basket the calcTokensForAmount copy needs, all at one block.
+Basket = namedtuple(
+    "Basket", ["tokens", "balances", "total_supply", "outstanding_fee", "cap"]
+)
+
+# Arguments of BasketMigrator.bake: `legs` become the swaps, each with its
+# max in `limits`, and `max_amount_in` bounds their sum.
+BakePlan = namedtuple("BakePlan", ["amount_out", "max_amount_in", "legs", "limits"])
+
+
+def tokens_for_amount(basket, amount):
+    """
+    BasketFacet.calcTokensForAmount: the amounts of basket.tokens needed to
+    mint `amount`.
+    """
+    supply = basket.total_supply + basket.outstanding_fee
+    return [b * amount // supply + 1 for b in basket.balances]
+
+
+def plan_bake(basket, market, finder, amount_out, gas_price=0, slippage=None):
+    """
+    Buys the underlyings of `amount_out` with WETH, no two of them through
+    the same pool, each leg's max in from the `slippage` model (a default
+    SlippageModel if None).
+
+    Raises ValueError naming every underlying that can't be bought.
+    """
+    unroutable = []
+
+    def buy(t, amt, exclude):
+        try:
+            return plan_given_out(market, finder, WETH, t, amt, gas_price, exclude)
+        except ValueError as e:
+            unroutable.append(str(e))
+            return []
+
+    amounts = dict(zip(basket.tokens, tokens_for_amount(basket, amount_out)))
+    legs = plan_tokens(amounts, buy)
+
+    if unroutable:
+        raise ValueError("; ".join(unroutable))
+
+    return bake_plan(market, amount_out, sum(legs.values(), []), slippage)
+
+
+def bake_plan(market, amount_out, legs, slippage=None):
+    """
+    BakePlan of `legs`, buying the underlyings of `amount_out`.
+    """
+    limits = (slippage or SlippageModel()).limits(market, legs, given_out=True)
+
+    # bake reverts unless the WETH used is strictly below maxAmountIn
+    return BakePlan(amount_out, sum(limits) + 1, legs, limits)
+
+
+def solve_bake(
+    basket,
+    market,
+    finder,
+    budget,
+    gas_price=0,
+    slippage=None,
+    precision=PRECISION,
+):
+    """
+    Largest bake whose `max_amount_in` fits in `budget` WETH, as a BakePlan.
+    Room left under the basket's cap, once the outstanding fee is minted,
+    bounds the amount too.
+
+    Raises plan_bake's ValueError when even the smallest bake tried has an
+    underlying no route can buy.
+    """
+    errors = []
+
+    def plan(amount):
+        try:
+            plan = plan_bake(basket, market, finder, amount, gas_price, slippage)
+        except ValueError as e:
+            errors.append(e)
+            return None
+        return plan if plan.max_amount_in <= budget else None
+
+    # joinPool mints the outstanding fee before checking the cap
+    best = BakePlan(0, 0, [], [])
+    room = max(basket.cap - (basket.total_supply + basket.outstanding_fee), 0)
+    if room == 0:
+        return best
+
+    # bracket: `lo` fits, `hi` doesn't
+    (lo, hi) = (0, min(10**18, room))
+    while True:
+        found = plan(hi)
+        if found is None:
+            break
+        (best, lo) = (found, hi)
+        if hi == room:
+            return best
+        hi = min(hi * 2, room)
+
+    while hi - lo > precision:
+        mid = (lo + hi) // 2
+        found = plan(mid)
+        if found is None:
+            hi = mid
+        else:
+            (best, lo) = (found, mid)
+
+    if best.amount_out == 0 and errors:
+        raise errors[-1]
+
+    return best
@@ -0,0 +1,115 @@
+"""
+Gas-bounded chunking of the migrator calls.
+
+One execSwaps with every swap of the basket gets close to the block (and
+Safe) gas limits, and a single bad swap reverts them all. Swaps are packed
+in the fewest calls whose estimated gas stays under a target, so each call
+lands predictably and a failed one can be retried alone.
+
+The planners take a mode as positional argument of `brownie run`:
+
+    - "chunked": the calls are bundled in one Safe multisend
+    - "separate": one Safe transaction per call, with consecutive nonces
+"""
+
+from scripts.gas_model import GasModel
+
+TARGET_GAS = 5_000_000
+
+
+def pack(items, gas, budget, base=0):
+    """
+    First-fit decreasing packing of `items` in chunks of at most `budget`
+    gas, each chunk costing `base` plus the gas(item) of its items. Items
+    keep their relative order within a chunk.
+
+    Raises ValueError if an item can't fit in a chunk on its own.
+    """
+    weights = [gas(item) for item in items]
+    chunks = []
+    loads = []
+
+    for i in sorted(range(len(items)), key=lambda i: -weights[i]):
+        if base + weights[i] > budget:
+            raise ValueError(f"{items[i]} needs {weights[i]} gas over {budget - base}")
+
+        for (c, load) in enumerate(loads):
+            if load + weights[i] <= budget:
+                chunks[c].append(i)
+                loads[c] += weights[i]
+                break
+        else:
+            chunks.append([i])
+            loads.append(base + weights[i])
+
+    return [[items[i] for i in sorted(c)] for c in chunks]
+
+
+def chunk_exec_swaps(swaps, gas_model=None, budget=TARGET_GAS):
+    """
+    Splits given-in `swaps`, (Leg, limit) pairs, into execSwaps calls.
+    """
+    gas_model = gas_model or GasModel()
+
+    def gas(swap):
+        return gas_model.leg_gas(swap[0])
+
+    return pack(swaps, gas, budget, gas_model.gas["exec_base"])
+
+
+def chunk_bake(swaps, tokens, gas_model=None, budget=TARGET_GAS):
+    """
+    Splits the given-out `swaps`, (Leg, limit) pairs, of a bake of a
+    `tokens` long basket into execSwapsGivenOut calls run first, and the
+    swaps left to bake itself.
+
+    Returns ([chunk, ...], final_swaps).
+    """
+    gas_model = gas_model or GasModel()
+    bake_gas = gas_model.bake_gas(tokens)
+
+    def gas(swap):
+        return gas_model.leg_gas(swap[0], given_out=True)
+
+    if bake_gas + sum(map(gas, swaps)) <= budget:
+        return ([], list(swaps))
+
+    chunks = pack(swaps, gas, budget, gas_model.gas["exec_base"])
+
+    # the chunk bake can carry along, if any, saves a call
+    fitting = [c for c in chunks if bake_gas + sum(map(gas, c)) <= budget]
+    if not fitting:
+        return (chunks, [])
+
+    final = max(fitting, key=lambda c: sum(map(gas, c)))
+    return ([c for c in chunks if c is not final], final)
+
+
+def chunk_exit_for(users, gas_model=None, budget=TARGET_GAS):
+    """
+    Splits `users` into exitFor calls, in order.
+    """
+    gas_model = gas_model or GasModel()
+
+    def gas(_):
+        return gas_model.gas["exit_user"]
+
+    return pack(users, gas, budget, gas_model.gas["exit_base"])
+
+
+def post_chunks(safe, receipts, separate=False):
+    """
+    Posts the receipts of the chunked calls to `safe`, an ApeSafe: bundled in
+    one multisend or, when `separate`, one Safe transaction each.
+    """
+    if not separate:
+        batches = [(receipts, None)]
+    else:
+        nonce = safe.pending_nonce()
+        batches = [([r], nonce + i) for (i, r) in enumerate(receipts)]
+
+    for (batch, nonce) in batches:
+        safe_tx = safe.multisend_from_receipts(batch, safe_nonce=nonce)
+        safe.preview(safe_tx)
+        safe.sign_with_frame(safe_tx)
+        safe.post_transaction(safe_tx)
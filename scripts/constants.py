@@ -0,0 +1,56 @@
+"""
+Addresses and constants shared by the migration scripts
+"""
+
+import os
+
+# on-disk caches (quotes, pool addresses, ...)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache")
+
+HALF_HOUR = 1800
+MAX_UINT256 = 2**256 - 1
+
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+DEV_SAFE_ADDRESS = "0x6458A23B020f489651f2777Bd849ddEd34DfCcd2"
+
+DPP_ADDR = "0x8D1ce361eb68e9E05573443C407D4A3Bed23B033"
+FACTORY_UNIV2 = "0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f"
+FACTORY_SUSHI = "0xC0AEe478e3658e2610c5F7A4A2E1777cE9e4f2Ac"
+ROUTER_UNIV2 = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+ROUTER_SUSHI = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
+ROUTER_UNIV3 = "0xE592427A0AEce92De3Edee1F18E0157C05861564"
+QUOTER_UNIV3 = "0xb27308f9F90D607463bb33eA1BeBb41C27CE5AB6"
+FACTORY_UNIV3 = "0x1F98431c8aD98523631AE4a59f267346ea31F984"
+MULTICALL2 = "0x5BA1e12693Dc8F9c48aAD8770482f4739bEeD696"
+
+# Uniswap V3 fee tiers, in hundredths of a bip
+FEE_TIERS = (100, 500, 3000, 10000)
+
+# Every (venue, fee) a trade can go through: V2 venues have a single pool per
+# pair, Uniswap V3 one per fee tier.
+ROUTES = [("univ2", 0), ("sushi", 0)] + [("univ3", fee) for fee in FEE_TIERS]
+
+# intermediate tokens multi-hop paths may go through
+USDC = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+DAI = "0x6B175474E89094C44Da98b954EedeAC495271d0F"
+USDT = "0xdAC17F958D2ee523a2206206994597C13D831ec7"
+WBTC = "0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599"
+CONNECTORS = [USDC, DAI, USDT, WBTC]
+
+BDI_ASSETS = [
+    "0x0bc529c00C6401aEF6D220BE8C6Ea1667F6Ad93e",
+    "0xc00e94cb662c3520282e6f5717214004a7f26888",
+    "0xC011a73ee8576Fb46F5E1c5751cA3B9Fe0af2a6F",
+    "0x9f8F72aA9304c8B593d555F12eF6589cC3A579A2",
+    "0x408e41876cCCDC0F92210600ef50372656052a38",
+    "0xdeFA4e8a7bcBA345F687a2f1456F5Edd9CE97202",
+    "0xBBbbCA6A901c926F240b89EacB641d8Aec7AEafD",
+    "0xba100000625a3754423978a60c9317c58a424e3D",
+    "0x1f9840a85d5aF5bf1D1762F925BDADdC4201F984",
+    "0x7Fc66500c84A76Ad7e9c93437bFc5Ac33E2DDaE9",
+    "0x6B3595068778DD592e39A122f4f5a5cF09C90fE2",
+    "0x2ba592F78dB6436527729929AAf6c908497cB200",
+    "0x514910771AF9Ca656af840dff83E8264EcF986CA",
+    "0x9d409a0A012CFbA9B15F6D4B36Ac57A46966Ab9a",
+    "0xE41d2489571d322189246DaFA5ebDe1F4699F498",
+]
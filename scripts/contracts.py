@@ -0,0 +1,42 @@
+"""
+Contract objects built from the vendored ABI store.
+
+`load_contract` replaces Contract.from_explorer: it builds the contract from
+abis/ in-process and only asks the explorer on a miss, writing the answer
+through to the store so the next run is offline.
+
+    $ brownie run scripts/contracts.py main refresh
+
+re-downloads the full ABI of every stored contract.
+"""
+
+from functools import lru_cache
+
+from brownie import Contract
+
+from scripts.abi_store import ABI_STORE
+
+
+@lru_cache(maxsize=None)
+def load_contract(address, store=ABI_STORE):
+    stored = store.get(address)
+    if stored is not None:
+        (name, abi) = stored
+        return Contract.from_abi(name, address, abi, persist=False)
+
+    contract = Contract.from_explorer(address)
+    store.put(address, contract._name, contract.abi)
+
+    return contract
+
+
+def main(command=None):
+    if command != "refresh":
+        for address in ABI_STORE.addresses():
+            print(address, ABI_STORE.get(address)[0])
+        return
+
+    for address in ABI_STORE.addresses():
+        contract = Contract.from_explorer(address)
+        ABI_STORE.put(address, contract._name, contract.abi)
+        print(f"refreshed {address} ({contract._name})")
@@ -0,0 +1,97 @@
+"""
+Pushes DEFI++ to the depositors once the migration is settled, instead of
+each of them sending an exit transaction:
+
+    $ brownie run scripts/distribute.py main [separate|index|merkle]
+
+Depositors come from the migrator's Entry events (scripts/entry_index.py,
+checkpointed in .cache/), their outstanding deposits from `deposits` (users
+who already exited have none left). They are paid through exitFor, in calls
+under the target gas, bundled in one Safe multisend or, with "separate", one
+Safe transaction per call. "index" only updates and checks the index.
+
+"merkle" settles with claims instead (after settle(false)): the tree of the
+deposits at the migrator's rate is exported to .cache/claims-<migrator>.json
+for the frontend, and its root posted with settleMerkle. Users (or anyone on
+their behalf) then claim at a constant gas cost each.
+"""
+
+import os
+
+from ape_safe import ApeSafe
+from brownie import BasketMigrator, chain, web3
+
+from scripts.chunks import chunk_exit_for, post_chunks
+from scripts.constants import CACHE_DIR, DEV_SAFE_ADDRESS
+from scripts.entry_index import EntryIndex, reconcile
+from scripts.gas_model import GasModel, contract_version
+from scripts.merkle import ClaimTree, claims_for
+from scripts.multicall import deposits_of
+
+MIGRATOR = ""
+
+# block the migrator was deployed at, no Entry event before it
+DEPLOY_BLOCK = 0
+
+
+def load_deposits(migrator, from_block=DEPLOY_BLOCK):
+    """
+    Brings the Entry index up to date and checks it against the migrator.
+
+    Returns the outstanding {depositor: deposit}, in order of first deposit.
+    """
+    index = EntryIndex(migrator.address, from_block)
+    index.update(web3.eth.get_logs, chain.height)
+
+    users = index.depositors()
+    (block, deposits) = deposits_of(migrator.address, users, index.block)
+    total = migrator.totalDeposits(block_identifier=block)
+
+    mismatches = reconcile(index, deposits, total)
+    if mismatches:
+        raise ValueError(f"Entry index disagrees with the migrator: {mismatches}")
+
+    return {u: d for (u, d) in zip(users, deposits) if d > 0}
+
+
+def settle_merkle(safe, migrator, deposits):
+    rate = migrator.rate()
+    if rate == 0:
+        raise ValueError("no rate yet, settle(false) first")
+
+    tree = ClaimTree(claims_for(deposits, rate))
+    path = os.path.join(CACHE_DIR, f"claims-{migrator.address.lower()}.json")
+    tree.export(path)
+
+    print(f"claims of {len(tree.claims)} depositors in {path}")
+    print(f"merkle root: 0x{tree.root.hex()}")
+
+    receipt = migrator.settleMerkle(tree.root, {"from": safe.account})
+    post_chunks(safe, [receipt])
+
+
+def main(mode=""):
+    migrator = BasketMigrator(MIGRATOR)
+
+    deposits = load_deposits(migrator)
+    users = list(deposits)
+
+    print(f"{len(users)} depositors to pay, {sum(deposits.values()) / 1e18} BDI")
+
+    if mode == "index":
+        return
+
+    safe = ApeSafe(DEV_SAFE_ADDRESS)
+
+    if mode == "merkle":
+        settle_merkle(safe, migrator, deposits)
+        return
+
+    gas_model = GasModel.load(contract_version(BasketMigrator.bytecode))
+    chunks = chunk_exit_for(users, gas_model)
+
+    print(f"{len(chunks)} exitFor calls")
+
+    receipts = [migrator.exitFor(chunk, {"from": safe.account}) for chunk in chunks]
+
+    post_chunks(safe, receipts, separate=(mode == "separate"))
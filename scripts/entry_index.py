@@ -0,0 +1,171 @@
+"""
+Streaming index of the migrator's Entry events.
+
+`Entry(address indexed who, uint256 amount)` is the only record of who
+deposited. Logs are fetched in block ranges: a range the provider refuses
+(too many results, range too wide, ...) or fails on (a timeout, an HTTP 413
+or 5xx) is halved and retried. Ranges grow
+after each success, but never back to a width the provider refused. Entries
+are decoded lazily and summed per depositor, and the index checkpoints the
+last block scanned to disk after every range, so an interrupted scan resumes
+where it stopped.
+
+`get_logs` is anything taking a log filter and returning its logs, e.g.
+`web3.eth.get_logs`.
+"""
+
+import json
+import os
+from collections import namedtuple
+
+from requests.exceptions import RequestException
+
+from scripts.constants import CACHE_DIR
+
+ENTRY_TOPIC = "0x6badce09299f7f7600a82aeaaf2801e2ea536ed021bb15fde48fdc2b072934eb"
+ENTRY_INDEX_VERSION = 1
+
+# blocks per eth_getLogs: the first range, and how far it may grow
+CHUNK = 10_000
+MAX_CHUNK = 500_000
+
+# errors of a range too costly for the provider: a JSON-RPC error (web3 raises
+# ValueError), or the request timing out / failing over HTTP
+RANGE_ERRORS = (ValueError, TimeoutError, RequestException)
+
+Entry = namedtuple("Entry", ["block", "who", "amount"])
+
+
+def _bytes(value):
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    return bytes(value)
+
+
+def decode_entry(log):
+    return Entry(
+        log["blockNumber"],
+        "0x" + _bytes(log["topics"][1])[-20:].hex(),
+        int.from_bytes(_bytes(log["data"]), "big"),
+    )
+
+
+def iter_ranges(get_logs, address, from_block, to_block, chunk=CHUNK):
+    """
+    Scans [from_block, to_block] and yields (last_block, entries) for each
+    range fetched, in order.
+
+    Raises the provider's error if it refuses a single block.
+    """
+    start = from_block
+    ceiling = MAX_CHUNK
+
+    while start <= to_block:
+        end = min(start + chunk - 1, to_block)
+
+        try:
+            logs = get_logs(
+                {
+                    "address": address,
+                    "topics": [ENTRY_TOPIC],
+                    "fromBlock": start,
+                    "toBlock": end,
+                }
+            )
+        except RANGE_ERRORS:
+            if end == start:
+                raise
+            chunk = ceiling = (end - start + 1) // 2
+            continue
+
+        logs = sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"]))
+        yield (end, (decode_entry(log) for log in logs))
+
+        start = end + 1
+        chunk = min(chunk * 2, ceiling)
+
+
+def iter_entries(get_logs, address, from_block, to_block, chunk=CHUNK):
+    """
+    Every Entry of the migrator at `address` in [from_block, to_block].
+    """
+    for (_, entries) in iter_ranges(get_logs, address, from_block, to_block, chunk):
+        yield from entries
+
+
+class EntryIndex:
+    """
+    Deposits per depositor, summed from the Entry events up to `block`.
+    """
+
+    def __init__(self, address, from_block=0, path=None):
+        self.address = address
+        self.path = path or os.path.join(CACHE_DIR, f"entries-{address.lower()}.json")
+        self.block = from_block - 1
+        self.totals = {}
+
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") == ENTRY_INDEX_VERSION:
+                self.block = data["block"]
+                self.totals = data["totals"]
+
+    def update(self, get_logs, to_block, chunk=CHUNK):
+        """
+        Scans the blocks after the checkpoint up to `to_block`.
+        """
+        ranges = iter_ranges(get_logs, self.address, self.block + 1, to_block, chunk)
+
+        for (last_block, entries) in ranges:
+            for e in entries:
+                self.totals[e.who] = self.totals.get(e.who, 0) + e.amount
+
+            self.block = last_block
+            self.save()
+
+        return self
+
+    def depositors(self):
+        """
+        Depositors, in order of first deposit.
+        """
+        return list(self.totals)
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        # write then rename, a crash mid-write keeps the previous checkpoint
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "version": ENTRY_INDEX_VERSION,
+                    "block": self.block,
+                    "totals": self.totals,
+                },
+                f,
+            )
+        os.replace(tmp, self.path)
+
+
+def reconcile(index, deposits, total_deposits):
+    """
+    Checks the index against the migrator: `deposits` are its `deposits` of
+    index.depositors(), `total_deposits` its totalDeposits, read at the
+    index's block.
+
+    A deposit is either what the index summed, or 0 once exited. Returns the
+    (who, indexed, deposit) that disagree, who being None for the total.
+    """
+    mismatches = [
+        (who, indexed, deposit)
+        for ((who, indexed), deposit) in zip(index.totals.items(), deposits)
+        if deposit not in (0, indexed)
+    ]
+
+    indexed = sum(index.totals.values())
+    if indexed != total_deposits:
+        mismatches.append((None, indexed, total_deposits))
+
+    return mismatches
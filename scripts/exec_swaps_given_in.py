@@ -1,35 +1,31 @@
 from ape_safe import ApeSafe
-from brownie import ZERO_ADDRESS
-from eth_abi import encode_single
-from brownie import interface, chain
-from brownie import Contract, BasketMigrator
-
-HALF_HOUR = 1800
-WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
-DEV_SAFE_ADDRESS = "0x6458A23B020f489651f2777Bd849ddEd34DfCcd2"
+from brownie import interface, chain, network, web3
+from brownie import BasketMigrator
+
+from scripts.chunks import chunk_exec_swaps, post_chunks
+from scripts.constants import (
+    BDI_ASSETS,
+    DEV_SAFE_ADDRESS,
+    HALF_HOUR,
+    WETH,
+)
+from scripts.multicall import balances_of
+from scripts.packed import pack_legs
+from scripts.gas_model import GasModel, contract_version
+from scripts.paths import PathFinder, connector_pairs
+from scripts.planner import plan_given_in, plan_tokens
+from scripts.replan import Replanner
+from scripts.rpc_stats import RpcStats, export_path
+from scripts.simulation import check, report, simulate
+from scripts.slippage import SlippageModel
+from scripts.snapshots import (
+    fetch_market,
+    fetch_univ3_pool,
+    pool_addresses,
+    weth_pairs,
+)
 
 MIGRATOR = ""
-ROUTER_UNIV2 = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
-ROUTER_SUSHI = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
-ROUTER_UNIV3 = "0xE592427A0AEce92De3Edee1F18E0157C05861564"
-QUOTER_UNIV3 = "0xb27308f9F90D607463bb33eA1BeBb41C27CE5AB6"
-FACTORY_UNIV3 = "0x1F98431c8aD98523631AE4a59f267346ea31F984"
-
-
-def quote_univ2(router, token_in, token_out, amount_in):
-    router = interface.IUniswapV2Router01(router)
-    try:
-        return router.getAmountsOut(amount_in, [token_in, token_out])[1]
-    except:
-        return 0
-
-
-def quote_univ2_given_out(router, token_in, token_out, amount_out):
-    router = interface.IUniswapV2Router01(router)
-    try:
-        return router.getAmountsIn(amount_out, [token_in, token_out])[0]
-    except:
-        return 2**256 - 1
 
 
 def swap_univ2(router, token_in, token_out, max_in, amount_out, account):
@@ -47,40 +43,6 @@ def swap_univ2(router, token_in, token_out, max_in, amount_out, account):
     )
 
 
-def quote_univ3(factory, quoter, token_in, token_out, amount_in):
-    factory = interface.IUniswapV3Factory(factory)
-    pool = factory.getPool(token_in, token_out, 3000)
-
-    if pool == ZERO_ADDRESS:
-        return 0
-    else:
-        try:
-            quoter = interface.IQuoter(quoter)
-            quote = quoter.quoteExactInputSingle.call(
-                token_in, token_out, 3000, amount_in, 0
-            )
-            return quote
-        except:
-            return 0
-
-
-def quote_univ3_given_out(factory, quoter, token_in, token_out, amount_out):
-    factory = interface.IUniswapV3Factory(factory)
-    pool = factory.getPool(token_in, token_out, 3000)
-
-    if pool == ZERO_ADDRESS:
-        return 2**256 - 1
-    else:
-        try:
-            quoter = interface.IQuoter(quoter)
-            quote = quoter.quoteExactOutputSingle.call(
-                token_in, token_out, 3000, amount_out, 0
-            )
-            return quote
-        except:
-            return 2**256 - 1
-
-
 def swap_univ3(router, token_in, token_out, max_in, amount_out, account):
     router = interface.ISwapRouter(router)
     interface.ERC20(token_in).approve(router, max_in, {"from": account})
@@ -99,94 +61,131 @@ def swap_univ3(router, token_in, token_out, max_in, amount_out, account):
     )
 
 
-def main():
+def main(mode="", *flags):
+    # "simulate" checks the calls' realized amounts before posting them
+    simulating = "simulate" in (mode, *flags)
+    if simulating and "fork" not in network.show_active():
+        raise ValueError("simulate runs on a fork, e.g. --network mainnet-fork")
+
+    # "refresh" updates the last plan instead of planning from scratch
+    refreshing = "refresh" in (mode, *flags)
+
+    # "chunked" splits the swaps in calls under the target gas, "separate"
+    # also posts each call as its own Safe transaction
+    separate = "separate" in (mode, *flags)
+    chunked = separate or "chunked" in (mode, *flags)
+    replanner = Replanner("exec_swaps_given_in")
+
+    # record every RPC request, by stage of the run
+    stats = RpcStats()
+    stats.install(web3)
+
     # Init the contracts
-    safe = ApeSafe(DEV_SAFE_ADDRESS)
-    migrator = BasketMigrator(MIGRATOR)
-    router_univ2 = Contract.from_explorer(ROUTER_UNIV2)
-    router_univ3 = Contract.from_explorer(ROUTER_UNIV3)
-    router_sushi = Contract.from_explorer(ROUTER_SUSHI)
-    quoter_univ3 = Contract.from_explorer(QUOTER_UNIV3)
-    factory_univ3 = Contract.from_explorer(FACTORY_UNIV3)
-
-    bdi_assets = [
-        "0x0bc529c00C6401aEF6D220BE8C6Ea1667F6Ad93e",
-        "0xc00e94cb662c3520282e6f5717214004a7f26888",
-        "0xC011a73ee8576Fb46F5E1c5751cA3B9Fe0af2a6F",
-        "0x9f8F72aA9304c8B593d555F12eF6589cC3A579A2",
-        "0x408e41876cCCDC0F92210600ef50372656052a38",
-        "0xdeFA4e8a7bcBA345F687a2f1456F5Edd9CE97202",
-        "0xBBbbCA6A901c926F240b89EacB641d8Aec7AEafD",
-        "0xba100000625a3754423978a60c9317c58a424e3D",
-        "0x1f9840a85d5aF5bf1D1762F925BDADdC4201F984",
-        "0x7Fc66500c84A76Ad7e9c93437bFc5Ac33E2DDaE9",
-        "0x6B3595068778DD592e39A122f4f5a5cF09C90fE2",
-        "0x2ba592F78dB6436527729929AAf6c908497cB200",
-        "0x514910771AF9Ca656af840dff83E8264EcF986CA",
-        "0x9d409a0A012CFbA9B15F6D4B36Ac57A46966Ab9a",
-        "0xE41d2489571d322189246DaFA5ebDe1F4699F498",
-    ]
+    with stats.stage("init"):
+        safe = ApeSafe(DEV_SAFE_ADDRESS)
+        migrator = BasketMigrator(MIGRATOR)
 
     # exec bdi swaps to eth
-    swaps = []
-    for t in bdi_assets:
-        token = interface.ERC20(t)
-        bal = token.balanceOf(migrator)
-
-        # Fetch quotes to convert each token to WETH, for a given balance
-        univ2_out = quote_univ2(router_univ2, t, WETH, bal)
-        sushi_out = quote_univ2(router_sushi, t, WETH, bal)
-        univ3_out = quote_univ3(factory_univ3, quoter_univ3, t, WETH, bal)
-
-        # Get best rate (highest price)
-        if univ2_out >= sushi_out and univ2_out >= univ3_out:
-            swaps.append(
-                (
-                    False,
-                    encode_single(
-                        "(address,address[],uint256,uint256)",
-                        [router_univ2.address, [t, WETH], bal, univ2_out],
-                    ),
-                )
-            )
-        elif sushi_out >= univ2_out and sushi_out >= univ3_out:
-            swaps.append(
-                (
-                    False,
-                    encode_single(
-                        "(address,address[],uint256,uint256)",
-                        [router_sushi.address, [t, WETH], bal, sushi_out],
-                    ),
-                )
+    with stats.stage("quoting"):
+        (block, balances) = balances_of(BDI_ASSETS, migrator.address)
+        amounts = dict(zip(BDI_ASSETS, balances))
+
+        if refreshing and replanner.usable(block):
+            # The pools of the last plan's Market, brought to this block
+            traded = replanner.refresh(
+                web3.eth.get_logs, block, pool_addresses, fetch_univ3_pool
             )
+            market = replanner.market
         else:
-            swaps.append(
-                (
-                    True,
-                    encode_single(
-                        "(address,address,address,uint24,uint256,uint256)",
-                        [
-                            router_univ3.address,
-                            t,
-                            WETH,
-                            3000,
-                            bal,
-                            univ3_out,
-                        ],
-                    ),
-                )
+            # Load every pool of the tokens against WETH, and the pairs of the
+            # connector tokens, once. Then route each balance locally
+            traded = None
+            market = fetch_market(
+                weth_pairs(BDI_ASSETS),
+                block_identifier=block,
+                v2_pairs=connector_pairs(BDI_ASSETS, WETH),
             )
 
-    # Execute the batch of swaps within half an hour
-    migrator.execSwaps(swaps, chain.time() + HALF_HOUR, {"from": safe})
+    print(f"pools loaded at block {market.block}")
+
+    with stats.stage("planning"):
+        # compare routes on their proceeds net of gas, at the current gas price
+        gas_model = GasModel.load(contract_version(BasketMigrator.bytecode))
+        gas_price = web3.eth.gas_price
+        finder = PathFinder(market, gas_model=gas_model)
+
+        # Get best rate (highest total out, net of gas): split across venues
+        # and fee tiers, or a multi-hop path. Dust not worth its gas is kept,
+        # and so is a token no route can take, the others are still planned
+        unroutable = []
+
+        # no two tokens swap through the same pool, each is quoted on the
+        # reserves of the snapshot
+        def plan_token(t, bal, exclude):
+            try:
+                return plan_given_in(market, finder, t, WETH, bal, gas_price, exclude)
+            except ValueError as e:
+                unroutable.append(str(e))
+                return []
+
+        if traded is None:
+            replanner.record(market, amounts, plan_tokens(amounts, plan_token))
+        else:
+            tokens = replanner.replan(traded, amounts, plan_token)
+            print(f"{len(traded)} pools traded, {len(tokens)} tokens re-planned")
+
+        for reason in unroutable:
+            print(f"skipped: {reason}")
+
+        # min out of every leg, from its pools' depth over the signing delay
+        legs = replanner.plan()
+        swaps = list(zip(legs, SlippageModel().limits(market, legs)))
+
+        # Optionally pack the swaps in several calls under the target gas
+        if chunked:
+            chunks = chunk_exec_swaps(swaps, gas_model)
+        else:
+            chunks = [swaps]
+
+    print(f"{len(swaps)} swaps in {len(chunks)} execSwapsPacked calls")
 
-    weth_erc20 = interface.ERC20(WETH)
-    weth_balance_migrator = weth_erc20.balanceOf(DEV_SAFE_ADDRESS)
+    # Execute the batches of swaps within half an hour
+    with stats.stage("encoding"):
+        deadline = chain.time() + HALF_HOUR
+        receipts = [
+            migrator.execSwapsPacked(pack_legs(chunk), deadline, {"from": safe})
+            for chunk in chunks
+        ]
+
+        weth_erc20 = interface.ERC20(WETH)
+        weth_balance_migrator = weth_erc20.balanceOf(DEV_SAFE_ADDRESS)
 
     print(f"weth balance of migrator: {weth_balance_migrator / 1e18}")
 
-    safe_tx = safe.multisend_from_receipts()
+    if simulating:
+        with stats.stage("simulation"):
+            # the calls executed on the fork, in the order of their chunks
+            tokens = [*BDI_ASSETS, WETH]
+            (_, left) = balances_of(tokens, migrator.address)
+            simulation = simulate(
+                market,
+                [s for chunk in chunks for s in chunk],
+                receipts,
+                migrator.address,
+                leftovers={t: b for (t, b) in zip(tokens, left) if b},
+            )
+
+        print(report(simulation))
+
+        failures = check(simulation)
+        if failures:
+            print("\n".join(["simulation failed, nothing posted:"] + failures))
+            print(stats.summary())
+            stats.export(export_path("exec_swaps_given_in"))
+            return
+
+    with stats.stage("safe"):
+        post_chunks(safe, receipts, separate=separate)
 
-    safe.preview(safe_tx)
-    safe.sign_with_frame(safe_tx)
-    safe.post_transaction(safe_tx)
+    print(stats.summary())
+    stats.export(export_path("exec_swaps_given_in"))
@@ -0,0 +1,94 @@
+"""
+Gas cost of the migrator's calls.
+
+Each swap of execSwaps / bake (and their packed variants) costs the gas of
+its swap type, plus `v2_hop` per extra hop of a V2 path. The calls themselves
+cost `exec_base` (execSwaps / execSwapsGivenOut with no swap) and, for
+bake, `bake_base` (joinPool, the approvals given) plus `bake_token` per
+basket token when bake gives the approvals. exitFor costs `exit_base` plus
+`exit_user` per user paid, a user holding no DEFI++ yet (a new balance slot).
+
+Costs are measured on a fork by scripts/measure_gas.py and cached per
+BasketMigrator version (a hash of its bytecode) in .cache/gas.json. Versions
+never measured use DEFAULT_GAS.
+"""
+
+import hashlib
+import json
+import os
+
+from scripts.constants import CACHE_DIR
+
+GAS_MODEL_PATH = os.path.join(CACHE_DIR, "gas.json")
+
+# rough figures, on par with mainnet swaps through the migrator
+DEFAULT_GAS = {
+    "v2_in": 100_000,
+    "v2_out": 105_000,
+    "v3_in": 115_000,
+    "v3_out": 120_000,
+    "v2_hop": 60_000,
+    "exec_base": 35_000,
+    "bake_base": 80_000,
+    "bake_token": 90_000,
+    "exit_base": 30_000,
+    "exit_user": 60_000,
+}
+
+
+def contract_version(bytecode):
+    """
+    Version of a BasketMigrator build, from its (hex) bytecode.
+    """
+    if bytecode.startswith("0x"):
+        bytecode = bytecode[2:]
+    return hashlib.sha256(bytes.fromhex(bytecode)).hexdigest()[:16]
+
+
+class GasModel:
+    def __init__(self, gas=DEFAULT_GAS, version=None):
+        self.gas = dict(gas)
+        self.version = version
+
+    def swap_gas(self, venue, hops=1, given_out=False):
+        kind = "v3" if venue == "univ3" else "v2"
+        gas = self.gas[f"{kind}_{'out' if given_out else 'in'}"]
+
+        if kind == "v2":
+            gas += self.gas["v2_hop"] * (hops - 1)
+
+        return gas
+
+    def leg_gas(self, leg, given_out=False):
+        return self.swap_gas(leg.venue, len(leg.path) - 1, given_out)
+
+    def bake_gas(self, tokens):
+        return self.gas["bake_base"] + self.gas["bake_token"] * tokens
+
+    def exit_gas(self, users):
+        return self.gas["exit_base"] + self.gas["exit_user"] * users
+
+    @classmethod
+    def load(cls, version, path=GAS_MODEL_PATH):
+        """
+        Model measured for `version`, the default one if there is none.
+        """
+        if os.path.exists(path):
+            with open(path) as f:
+                measured = json.load(f)
+            if version in measured:
+                return cls({**DEFAULT_GAS, **measured[version]}, version)
+
+        return cls(DEFAULT_GAS, version)
+
+    def save(self, path=GAS_MODEL_PATH):
+        measured = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                measured = json.load(f)
+
+        measured[self.version] = self.gas
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(measured, f, indent=1)
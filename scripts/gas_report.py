@@ -0,0 +1,134 @@
+"""
+Gas benchmark report of the BasketMigrator entry points.
+
+tests/gas records the gas used by each benchmark under a name and compares it
+to the committed baseline, tests/gas/baseline.json:
+
+    {"block": 14800000, "threshold": 0.02, "gas": {"enter": 51234, ...}}
+
+The figures depend on the state of mainnet the fork starts from, so they are
+only compared on a fork of `block`. A benchmark more than `threshold`
+(relative) over its baseline fails, and so does a benchmark missing from the
+baseline once it holds any figure: a baseline with none has yet to be
+measured, and the benchmarks are skipped until it is. The report of the last run goes to .cache/gas_report.json: copying
+its figures to the baseline's "gas" (or running with GAS_BASELINE=update)
+accepts them.
+"""
+
+import json
+import os
+
+from scripts.constants import CACHE_DIR
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "tests", "gas", "baseline.json"
+)
+REPORT_PATH = os.path.join(CACHE_DIR, "gas_report.json")
+
+THRESHOLD = 0.02
+
+# fork block of the baseline, and how far a fork may have mined past it
+FORK_BLOCK = 14_800_000
+MAX_DRIFT = 1000
+
+
+class GasReport:
+    def __init__(self, baseline_path=BASELINE_PATH):
+        self.baseline_path = baseline_path
+        self.threshold = THRESHOLD
+        self.block = FORK_BLOCK
+        self.baseline = {}
+        self.gas = {}
+
+        if os.path.exists(baseline_path):
+            with open(baseline_path) as f:
+                data = json.load(f)
+            self.threshold = data.get("threshold", THRESHOLD)
+            self.block = data.get("block", FORK_BLOCK)
+            self.baseline = data.get("gas", {})
+
+    def check_block(self, block):
+        """
+        Returns a message if a fork at `block` can't be compared to the
+        baseline, None if it can.
+        """
+        if self.block <= block <= self.block + MAX_DRIFT:
+            return None
+
+        return (
+            f"the gas baseline is measured on a fork of block {self.block}, "
+            f"this chain is at block {block}"
+        )
+
+    def check_measured(self):
+        """
+        Returns a message if the baseline holds no figure yet, None if it
+        does.
+        """
+        if self.baseline:
+            return None
+
+        return (
+            f"no gas baseline measured yet: run GAS_BASELINE=update on a fork "
+            f"of block {self.block} and commit tests/gas/baseline.json"
+        )
+
+    def record(self, name, gas):
+        """
+        Records `gas` for the `name` benchmark.
+
+        Returns a message if it regressed beyond the threshold or has no
+        baseline, None if not.
+        """
+        self.gas[name] = gas
+
+        baseline = self.baseline.get(name)
+        if baseline is None:
+            return f"{name}: {gas} gas, no baseline (GAS_BASELINE=update adds it)"
+        if gas > baseline * (1 + self.threshold):
+            return (
+                f"{name}: {gas} gas, {gas / baseline - 1:+.2%} over the "
+                f"baseline of {baseline} (threshold {self.threshold:.2%})"
+            )
+
+        return None
+
+    def report(self):
+        """
+        {name: {"gas", "baseline", "delta"}}, baseline and delta None for new
+        benchmarks.
+        """
+        report = {}
+
+        for (name, gas) in sorted(self.gas.items()):
+            baseline = self.baseline.get(name)
+            report[name] = {
+                "gas": gas,
+                "baseline": baseline,
+                "delta": None if baseline is None else gas - baseline,
+            }
+
+        return report
+
+    def save(self, path=REPORT_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {"threshold": self.threshold, "benchmarks": self.report()}, f, indent=1
+            )
+
+    def update_baseline(self):
+        """
+        Accepts the recorded figures as the new baseline.
+        """
+        with open(self.baseline_path, "w") as f:
+            json.dump(
+                {
+                    "block": self.block,
+                    "threshold": self.threshold,
+                    "gas": {**self.baseline, **self.gas},
+                },
+                f,
+                indent=1,
+                sort_keys=True,
+            )
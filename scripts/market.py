@@ -0,0 +1,31 @@
+"""
+Local view of every route of a block: the Uniswap V2 / Sushiswap reserves and
+the Uniswap V3 pools behind the same (venue, fee) routes as scripts.quotes.
+"""
+
+from scripts.constants import ROUTES
+
+
+class Market:
+    def __init__(self, v2, v3):
+        self.block = v2.block
+        self.v2 = v2
+        self.v3 = v3
+
+    def quote(self, route, token_in, token_out, amount, given_out=False):
+        """
+        Quotes `amount` on `route` with the 0 / 2**256 - 1 sentinels.
+        """
+        (venue, fee) = route
+
+        if venue == "univ3":
+            return self.v3.quote(token_in, token_out, amount, given_out, fee)
+        return self.v2.quote(venue, token_in, token_out, amount, given_out)
+
+    def quote_routes(self, token_in, token_out, amount, given_out=False, routes=ROUTES):
+        """
+        {(venue, fee): amount} of a single trade on every route of `routes`.
+        """
+        return {
+            r: self.quote(r, token_in, token_out, amount, given_out) for r in routes
+        }
@@ -0,0 +1,177 @@
+"""
+Measures the GasModel of the current BasketMigrator build on a fork:
+
+    $ brownie run scripts/measure_gas.py --network mainnet-fork
+
+Given-in swaps are measured through execSwapsPacked on a fresh migrator, as
+the extra gas of one more packed swap (the format the planners send). Given-
+out swaps are measured on the routers directly and get the migrator's
+overhead measured on given-in.
+
+bake runs with no swap, the underlyings minted to the migrator: `bake_base`
+is a bake once the basket's approvals are given, `bake_token` what each
+basket token adds when bake gives them. exitFor pays users holding no DEFI++
+yet, the costly case (a new balance slot for each): `exit_base` is exitFor
+of no user, `exit_user` what each user paid adds.
+"""
+
+from brownie import BasketMigrator, accounts, chain, interface
+from brownie_tokens import MintableForkToken
+
+from scripts.constants import (
+    DAI,
+    DEV_SAFE_ADDRESS,
+    DPP_ADDR,
+    HALF_HOUR,
+    MAX_UINT256,
+    ROUTER_UNIV2,
+    ROUTER_UNIV3,
+    USDC,
+    WETH,
+)
+from scripts.gas_model import GasModel, contract_version
+from scripts.planner import Leg
+from scripts.packed import pack_leg
+
+BDI = "0x0309c98B1bffA350bcb3F9fB9780970CA32a5060"
+
+AMOUNT = 10**17
+FEE = 500
+
+# DEFI++ baked by each bake measured
+BAKE_AMOUNT = 10**17
+
+# users paid by the exitFor measured
+EXIT_USERS = 5
+
+
+def _exec_gas(migrator, swaps, account):
+    deadline = chain.time() + HALF_HOUR
+    tx = migrator.execSwapsPacked(swaps, deadline, {"from": account})
+    return tx.gas_used
+
+
+def _swap_gas(migrator, leg, base, account):
+    swap = pack_leg(leg, 0)
+
+    # the first swap pays for the router approval, measure the next one
+    _exec_gas(migrator, swap, account)
+    return _exec_gas(migrator, swap, account) - base
+
+
+def _router_gas(account):
+    deadline = chain.time() + HALF_HOUR
+    router_univ2 = interface.IUniswapV2Router01(ROUTER_UNIV2)
+    router_univ3 = interface.ISwapRouter(ROUTER_UNIV3)
+    weth = interface.ERC20(WETH)
+
+    weth.approve(router_univ2, MAX_UINT256, {"from": account})
+    weth.approve(router_univ3, MAX_UINT256, {"from": account})
+
+    v2_in = router_univ2.swapExactTokensForTokens(
+        AMOUNT, 0, [WETH, USDC], account, deadline, {"from": account}
+    )
+    v2_out = router_univ2.swapTokensForExactTokens(
+        100 * 10**6, AMOUNT * 10, [WETH, USDC], account, deadline, {"from": account}
+    )
+    v3_in = router_univ3.exactInputSingle(
+        [WETH, USDC, FEE, account, deadline, AMOUNT, 0, 0], {"from": account}
+    )
+    v3_out = router_univ3.exactOutputSingle(
+        [WETH, USDC, FEE, account, deadline, 100 * 10**6, AMOUNT * 10, 0],
+        {"from": account},
+    )
+
+    return {
+        "v2_in": v2_in.gas_used,
+        "v2_out": v2_out.gas_used,
+        "v3_in": v3_in.gas_used,
+        "v3_out": v3_out.gas_used,
+    }
+
+
+def _bake_gas(migrator, account):
+    """
+    (bake_base, bake_token) of `migrator`, in the baking state.
+    """
+    dpp = interface.IBasketFacet(DPP_ADDR)
+    dpp.setLock(chain.height, {"from": DEV_SAFE_ADDRESS})
+    dpp.setCap(100000000e18, {"from": DEV_SAFE_ADDRESS})
+
+    # the underlyings of both bakes, with room for joinPool's rounding
+    (tokens, amounts) = dpp.calcTokensForAmount(4 * BAKE_AMOUNT)
+    for (t, amount) in zip(tokens, amounts):
+        MintableForkToken(t)._mint_for_testing(migrator, amount)
+
+    deadline = chain.time() + HALF_HOUR
+    first = migrator.bake(BAKE_AMOUNT, 1, deadline, True, [], {"from": account})
+    again = migrator.bake(BAKE_AMOUNT, 1, deadline, False, [], {"from": account})
+
+    approvals = first.gas_used - again.gas_used
+    return (again.gas_used, -(-approvals // len(tokens)))
+
+
+def _exit_gas(account, users):
+    """
+    (exit_base, exit_user) of a migration settled for `users`.
+    """
+    migrator = BasketMigrator.deploy(account, {"from": account})
+    bdi = MintableForkToken(BDI)
+
+    for user in users:
+        bdi._mint_for_testing(user, AMOUNT)
+        bdi.approve(migrator, AMOUNT, {"from": user})
+        migrator.enter(AMOUNT, {"from": user})
+
+    migrator.closeEntry({"from": account})
+    migrator.burnAndUnwrap({"from": account})
+    MintableForkToken(DPP_ADDR)._mint_for_testing(migrator, len(users) * AMOUNT)
+    migrator.settle(True, {"from": account})
+
+    base = migrator.exitFor([], {"from": account}).gas_used
+    paid = migrator.exitFor(users, {"from": account}).gas_used
+
+    return (base, -(-(paid - base) // len(users)))
+
+
+def measure(account):
+    migrator = BasketMigrator.deploy(account, {"from": account})
+    migrator.closeEntry({"from": account})
+
+    # wrap some ETH for the migrator and for the direct router swaps
+    account.transfer(WETH, 10 * AMOUNT)
+    interface.ERC20(WETH).transfer(migrator, 5 * AMOUNT, {"from": account})
+
+    base = _exec_gas(migrator, b"", account)
+
+    gas = {
+        "exec_base": base,
+        "v2_in": _swap_gas(
+            migrator, Leg("univ2", 0, [WETH, USDC], AMOUNT, 0), base, account
+        ),
+        "v3_in": _swap_gas(
+            migrator, Leg("univ3", FEE, [WETH, USDC], AMOUNT, 0), base, account
+        ),
+    }
+    two_hops = Leg("univ2", 0, [WETH, USDC, DAI], AMOUNT, 0)
+    gas["v2_hop"] = _swap_gas(migrator, two_hops, base, account) - gas["v2_in"]
+
+    direct = _router_gas(account)
+    for kind in ("v2", "v3"):
+        overhead = gas[f"{kind}_in"] - direct[f"{kind}_in"]
+        gas[f"{kind}_out"] = direct[f"{kind}_out"] + overhead
+
+    (gas["bake_base"], gas["bake_token"]) = _bake_gas(migrator, account)
+
+    # fresh accounts, holding no DEFI++
+    users = accounts[1 : 1 + EXIT_USERS]
+    (gas["exit_base"], gas["exit_user"]) = _exit_gas(account, users)
+
+    return GasModel(gas, contract_version(BasketMigrator.bytecode))
+
+
+def main():
+    model = measure(accounts[0])
+    model.save()
+
+    print(f"gas model of BasketMigrator {model.version}: {model.gas}")
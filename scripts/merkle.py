@@ -0,0 +1,114 @@
+"""
+Merkle tree of the DEFI++ claims of BasketMigrator.settleMerkle / claim.
+
+Leaves are keccak256(abi.encodePacked(index, account, amount)) and nodes
+hash their two children in sorted order, like OpenZeppelin's MerkleProof. A
+node without a sibling moves up a level as is.
+
+The tree is built a level at a time and every proof comes out of one walk up
+the levels, so tens of thousands of claims take well under a second.
+"""
+
+import json
+import os
+from collections import namedtuple
+
+# eth-hash's backend, called directly to skip its per-call dispatch
+from Crypto.Hash import keccak
+
+Claim = namedtuple("Claim", ["index", "account", "amount"])
+
+
+def _keccak(data):
+    return keccak.new(data=data, digest_bits=256).digest()
+
+
+def _hash_pairs(level):
+    pairs = [
+        _keccak(a + b if a <= b else b + a) for (a, b) in zip(level[::2], level[1::2])
+    ]
+    if len(level) % 2:
+        pairs.append(level[-1])
+    return pairs
+
+
+def leaf(claim):
+    account = bytes.fromhex(claim.account[2:])
+    return _keccak(
+        claim.index.to_bytes(32, "big") + account + claim.amount.to_bytes(32, "big")
+    )
+
+
+def claims_for(deposits, rate):
+    """
+    Claims of {account: deposit}, for the amounts exit would send at `rate`.
+    """
+    return [
+        Claim(i, account, rate * deposit // 10**18)
+        for (i, (account, deposit)) in enumerate(deposits.items())
+    ]
+
+
+class ClaimTree:
+    def __init__(self, claims):
+        if not claims:
+            raise ValueError("no claims")
+
+        self.claims = list(claims)
+        self.levels = [[leaf(c) for c in self.claims]]
+        while len(self.levels[-1]) > 1:
+            self.levels.append(_hash_pairs(self.levels[-1]))
+
+    @property
+    def root(self):
+        return self.levels[-1][0]
+
+    def proofs(self):
+        """
+        The proof of every claim, in claim order.
+        """
+        proofs = [[] for _ in self.claims]
+        positions = list(range(len(self.claims)))
+
+        for level in self.levels[:-1]:
+            for (i, pos) in enumerate(positions):
+                sibling = pos ^ 1
+                if sibling < len(level):
+                    proofs[i].append(level[sibling])
+                positions[i] = pos >> 1
+
+        return proofs
+
+    def export(self, path):
+        """
+        Writes the root and every claim with its proof as JSON, by account.
+        """
+        claims = {
+            c.account: {
+                "index": c.index,
+                "amount": str(c.amount),
+                "proof": ["0x" + p.hex() for p in proof],
+            }
+            for (c, proof) in zip(self.claims, self.proofs())
+        }
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "merkleRoot": "0x" + self.root.hex(),
+                    "total": str(sum(c.amount for c in self.claims)),
+                    "claims": claims,
+                },
+                f,
+            )
+
+
+def verify(proof, root, claim):
+    """
+    MerkleProof.verify of `claim`.
+    """
+    node = leaf(claim)
+    for p in proof:
+        node = _keccak(node + p if node <= p else p + node)
+    return node == root
@@ -4,7 +4,9 @@ This appears to be unrelated to BDI and is a script for the DEFI+S/L -> DEFI++ M
 
 from ape_safe import ApeSafe
 from brownie import chain, interface
-from brownie import Contract, ZERO_ADDRESS
+from brownie import ZERO_ADDRESS
+
+from scripts.contracts import load_contract
 
 
 DPP_ADDR = "0x8D1ce361eb68e9E05573443C407D4A3Bed23B033"
@@ -35,8 +37,8 @@ def unlend_assets_defi_pl(safe):
 # convert defi++ to ExperiPie
 def experinate_defi_pp(safe):
     dpp_proxy = interface.IProxy(DPP_ADDR)
-    experinator = Contract.from_explorer(EXPERINATOR)
-    dpp_balancer_pool = Contract.from_explorer(DPP_ADDR)
+    experinator = load_contract(EXPERINATOR)
+    dpp_balancer_pool = load_contract(DPP_ADDR)
 
     dpp_proxy.setProxyOwner(EXPERINATOR, {"from": safe.account})
     dpp_balancer_pool.setController(EXPERINATOR, {"from": safe.account})
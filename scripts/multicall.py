@@ -0,0 +1,99 @@
+"""
+Batches read-only calls through Multicall2, so a full round of quotes costs
+one eth_call per batch and every answer comes from the same block.
+"""
+
+from brownie import interface
+from eth_abi import decode_single, encode_abi, encode_single
+
+from scripts.constants import MULTICALL2
+
+BATCH_SIZE = 100
+
+# balanceOf(address)
+BALANCE_OF = "0x70a08231"
+
+# BasketMigrator.approved(address,address)
+APPROVED = "0xf4b16045"
+
+# BasketMigrator.deposits(address)
+DEPOSITS = "0xfc7e286d"
+
+
+def aggregate(calls, block_identifier=None, batch_size=BATCH_SIZE):
+    """
+    Executes `calls`, a list of (target, calldata), using tryBlockAndAggregate.
+
+    A failing call does not revert the batch, it is returned as
+    (False, return_data) instead. When `block_identifier` is None the first
+    batch runs on the latest block and the following ones are pinned to it.
+
+    Returns (block_number, [(success, return_data), ...]).
+    """
+    multicall = interface.IMulticall2(MULTICALL2)
+    results = []
+
+    for i in range(0, len(calls), batch_size):
+        (block_number, _, batch) = multicall.tryBlockAndAggregate.call(
+            False, calls[i : i + batch_size], block_identifier=block_identifier
+        )
+
+        if block_identifier is None:
+            block_identifier = block_number
+
+        results.extend(batch)
+
+    return (block_identifier, results)
+
+
+def balances_of(tokens, owner, block_identifier=None):
+    """
+    Reads the ERC20 balances of `owner` for all `tokens` in one batch.
+
+    Returns (block_number, [balance, ...]).
+    """
+    calldata = BALANCE_OF + encode_single("address", owner).hex()
+    calls = [(t, calldata) for t in tokens]
+    (block_number, results) = aggregate(calls, block_identifier)
+
+    balances = [
+        decode_single("uint256", bytes(data)) if success else 0
+        for (success, data) in results
+    ]
+
+    return (block_number, balances)
+
+
+def deposits_of(migrator, users, block_identifier=None):
+    """
+    Reads the outstanding migrator deposits of all `users` in one batch.
+
+    Returns (block_number, [deposit, ...]).
+    """
+    calls = [(migrator, DEPOSITS + encode_single("address", u).hex()) for u in users]
+    (block_number, results) = aggregate(calls, block_identifier)
+
+    deposits = [
+        decode_single("uint256", bytes(data)) if success else 0
+        for (success, data) in results
+    ]
+
+    return (block_number, deposits)
+
+
+def missing_approvals(migrator, pairs, block_identifier=None):
+    """
+    The (token, spender) `pairs` the migrator has not max-approved yet, read
+    from its `approved` mapping in one batch.
+    """
+    calls = [
+        (migrator, APPROVED + encode_abi(["address", "address"], pair).hex())
+        for pair in pairs
+    ]
+    (_, results) = aggregate(calls, block_identifier)
+
+    return [
+        pair
+        for (pair, (success, data)) in zip(pairs, results)
+        if not (success and decode_single("bool", bytes(data)))
+    ]
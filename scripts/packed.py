@@ -0,0 +1,104 @@
+"""
+Packed encoding of the swaps passed to execSwapsPacked,
+execSwapsGivenOutPacked and bakePacked.
+
+Swaps are concatenated, each one being:
+
+    router   uint8    index in ROUTER_INDEX
+    V2:      uint8    path length, then the path as 20 bytes addresses
+    V3:      20 + 20  token_in, token_out, then the fee as an uint24
+    amount   uint128
+    limit    uint128
+
+A two tokens V2 swap takes 74 bytes and a V3 one 76, where an ABI encoded
+Swap takes 352 and 320.
+"""
+
+from collections import namedtuple
+
+ROUTER_INDEX = {"univ2": 0, "sushi": 1, "univ3": 2}
+VENUES = {index: venue for (venue, index) in ROUTER_INDEX.items()}
+
+# what a packed swap decodes to, `path` being (token_in, token_out) on V3
+PackedSwap = namedtuple("PackedSwap", ["venue", "fee", "path", "amount", "limit"])
+
+
+def _address(address):
+    raw = bytes.fromhex(address[2:] if address.startswith("0x") else address)
+    if len(raw) != 20:
+        raise ValueError(f"not an address: {address}")
+    return raw
+
+
+def _uint(value, size):
+    if not 0 <= value < 2 ** (8 * size):
+        raise ValueError(f"{value} doesn't fit in uint{8 * size}")
+    return int(value).to_bytes(size, "big")
+
+
+def pack_swap(venue, fee, path, amount, limit):
+    """
+    One packed swap of `amount` along `path` on the (venue, fee) route.
+    `amount` and `limit` follow the migrator's meaning: exact in / min out
+    given in, exact out / max in given out.
+    """
+    packed = _uint(ROUTER_INDEX[venue], 1)
+
+    if venue == "univ3":
+        if len(path) != 2:
+            raise ValueError("univ3 swaps are single pool")
+        packed += _address(path[0]) + _address(path[1]) + _uint(fee, 3)
+    else:
+        packed += _uint(len(path), 1) + b"".join(_address(t) for t in path)
+
+    return packed + _uint(amount, 16) + _uint(limit, 16)
+
+
+def pack_leg(leg, limit):
+    """
+    pack_swap for a scripts.planner.Leg.
+    """
+    return pack_swap(leg.venue, leg.fee, leg.path, leg.amount, limit)
+
+
+def pack_legs(swaps):
+    """
+    The `bytes` argument for (Leg, limit) `swaps`.
+    """
+    return b"".join(pack_leg(leg, limit) for (leg, limit) in swaps)
+
+
+def unpack(data):
+    """
+    Decodes packed swaps to a list of PackedSwap, addresses lowercase.
+    """
+    swaps = []
+    i = 0
+
+    def take(size):
+        nonlocal i
+        if i + size > len(data):
+            raise ValueError("truncated packed swaps")
+        (chunk, i) = (data[i : i + size], i + size)
+        return chunk
+
+    def address():
+        return "0x" + take(20).hex()
+
+    while i < len(data):
+        venue = VENUES.get(take(1)[0])
+        if venue is None:
+            raise ValueError("unknown router index")
+
+        if venue == "univ3":
+            path = [address(), address()]
+            fee = int.from_bytes(take(3), "big")
+        else:
+            path = [address() for _ in range(take(1)[0])]
+            fee = 0
+
+        amount = int.from_bytes(take(16), "big")
+        limit = int.from_bytes(take(16), "big")
+        swaps.append(PackedSwap(venue, fee, path, amount, limit))
+
+    return swaps
@@ -0,0 +1,159 @@
+"""
+Multi-hop path finder.
+
+The pairs of a Market's V2 snapshot form one graph per venue (a router only
+swaps through pairs of its own factory). Paths from token_in to token_out
+may go through up to `max_hops - 1` CONNECTORS and are priced with the local
+constant product math, so the graph is built once per block and queried for
+every token of the basket in one pass.
+
+Only Uniswap V2 / Sushiswap paths are searched: the migrator swaps on
+Uniswap V3 through exactInputSingle / exactOutputSingle, single pool only.
+
+Comparisons are net of gas. One side of every trade we plan is WETH, so the
+gas of a path (from the GasModel) times `gas_price` is in the same unit as
+the amounts.
+
+Every path is priced on the snapshot's reserves, as if it had its pools to
+itself: the planners keep the paths of different tokens off each other's
+pools with `exclude`.
+"""
+
+from collections import defaultdict
+
+from scripts.constants import CONNECTORS, MAX_UINT256
+from scripts.gas_model import GasModel
+from scripts.univ2_math import sort_tokens
+
+MAX_HOPS = 3
+
+
+def path_pools(venue, path):
+    """
+    Pairs `path` swaps through on `venue`, as (venue, token0, token1).
+    """
+    return [(venue, *sort_tokens(a, b)) for (a, b) in zip(path, path[1:])]
+
+
+def connector_pairs(tokens, token_out, connectors=CONNECTORS):
+    """
+    Every pair a path from one of `tokens` to `token_out` may go through.
+    """
+    nodes = [c for c in connectors if c.lower() != token_out.lower()]
+    pairs = set()
+
+    for t in tokens:
+        pairs.add(sort_tokens(t, token_out))
+        for c in nodes:
+            if c.lower() != t.lower():
+                pairs.add(sort_tokens(t, c))
+
+    for (i, c) in enumerate(nodes):
+        pairs.add(sort_tokens(c, token_out))
+        for d in nodes[i + 1 :]:
+            pairs.add(sort_tokens(c, d))
+
+    return sorted(pairs)
+
+
+class PathFinder:
+    def __init__(
+        self, market, connectors=CONNECTORS, max_hops=MAX_HOPS, gas_model=None
+    ):
+        self.market = market
+        self.gas_model = gas_model or GasModel()
+        self.connectors = {c.lower() for c in connectors}
+        self.max_hops = max_hops
+        self._paths = {}
+
+        self.graph = defaultdict(lambda: defaultdict(set))
+        for ((venue, token0, token1), (r0, r1)) in market.v2.reserves.items():
+            if r0 and r1:
+                self.graph[venue][token0].add(token1)
+                self.graph[venue][token1].add(token0)
+
+    def paths(self, venue, token_in, token_out):
+        """
+        All the simple paths, lowercase, through connectors only.
+        """
+        key = (venue, token_in.lower(), token_out.lower())
+        if key in self._paths:
+            return self._paths[key]
+
+        (start, end) = key[1:]
+        graph = self.graph[venue]
+        found = []
+
+        def walk(path):
+            for nxt in sorted(graph[path[-1]]):
+                if nxt == end:
+                    found.append(path + [nxt])
+                elif (
+                    nxt in self.connectors
+                    and nxt not in path
+                    and len(path) < self.max_hops
+                ):
+                    walk(path + [nxt])
+
+        walk([start])
+
+        self._paths[key] = found
+        return found
+
+    def path_gas(self, venue, path, given_out=False):
+        return self.gas_model.swap_gas(venue, len(path) - 1, given_out)
+
+    def best(
+        self,
+        token_in,
+        token_out,
+        amount,
+        given_out=False,
+        gas_price=0,
+        exclude=frozenset(),
+    ):
+        """
+        Best path net of gas for `amount` (exact in, or exact out), through
+        none of the pairs of `exclude`.
+
+        Returns (venue, path, amount_quoted), None if no path exists.
+        """
+        best = None
+
+        for venue in sorted(self.graph):
+            for path in self.paths(venue, token_in, token_out):
+                if not exclude.isdisjoint(path_pools(venue, path)):
+                    continue
+
+                quoted = self.market.v2.quote_path(venue, path, amount, given_out)
+                gas = self.path_gas(venue, path, given_out) * gas_price
+
+                if given_out:
+                    if quoted == MAX_UINT256:
+                        continue
+                    score = -(quoted + gas)
+                else:
+                    if quoted == 0:
+                        continue
+                    score = quoted - gas
+
+                if best is None or score > best[0]:
+                    best = (score, venue, path, quoted)
+
+        return best[1:] if best else None
+
+    def best_all(self, trades, given_out=False, gas_price=0):
+        """
+        best() of every (token_in, token_out, amount) of `trades`, in order,
+        none through a pair the path of an earlier trade swaps through.
+        """
+        claimed = set()
+        found = []
+
+        for (token_in, token_out, amount) in trades:
+            best = self.best(token_in, token_out, amount, given_out, gas_price, claimed)
+            if best is not None:
+                claimed.update(path_pools(best[0], best[1]))
+            found.append(best)
+
+        return found
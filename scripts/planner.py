@@ -0,0 +1,173 @@
+"""
+Per-token routing decisions on a Market.
+
+A token amount is either split across the single-pool routes (scripts.splits)
+or sent whole through the best multi-hop V2 path (scripts.paths), whichever
+is better net of gas. Either way the plan is a list of Leg, one per Swap
+entry of the migrator.
+
+Gas is priced with the PathFinder's GasModel at `gas_price`, which needs the
+WETH side of the trade to be the one we optimize: token_out when selling,
+token_in when buying.
+
+Every token is quoted on the snapshot's reserves, so two tokens must not swap
+through the same pool: the second one would get less than quoted (a shared
+connector pair, e.g. USDC/WETH for DAI -> USDC -> WETH and USDC -> WETH).
+plan_tokens keeps every token off the pools of the others, so the quotes hold
+whatever order the calls then run in. A token's direct pools against WETH are
+its own, the multi-hop paths of the other tokens only get the rest.
+"""
+
+from collections import namedtuple
+
+from scripts.constants import ROUTES, WETH
+from scripts.paths import path_pools
+from scripts.splits import split_given_in, split_given_out
+from scripts.univ2_math import sort_tokens
+
+# A single swap. `path` is [token_in, ..., token_out] (two tokens on V3),
+# `amount` is the exact side of the swap and `quoted` the other one.
+Leg = namedtuple("Leg", ["venue", "fee", "path", "amount", "quoted"])
+
+
+def leg_pools(leg):
+    """
+    Pools `leg` swaps through: (venue, token0, token1) on the V2 venues,
+    ("univ3", token0, token1, fee) on Uniswap V3.
+    """
+    if leg.venue == "univ3":
+        return [("univ3", *sort_tokens(leg.path[0], leg.path[-1]), leg.fee)]
+    return path_pools(leg.venue, leg.path)
+
+
+def _route_pool(route, token_in, token_out):
+    return leg_pools(Leg(*route, [token_in, token_out], 0, 0))[0]
+
+
+def plan_tokens(amounts, plan_token, kept=None):
+    """
+    {token: [Leg]} of plan_token(token, amount, exclude) for every token of
+    `amounts`, in order.
+
+    `exclude` holds the pools the token's legs must not swap through: those
+    of the tokens planned before it and of the `kept` plans, {token: [Leg]},
+    and the direct pools against WETH of every other token.
+    """
+    kept = kept or {}
+    claimed = {
+        pool for legs in kept.values() for leg in legs for pool in leg_pools(leg)
+    }
+    direct = {t: {_route_pool(r, t, WETH) for r in ROUTES} for t in [*amounts, *kept]}
+    legs = {}
+
+    for (token, amount) in amounts.items():
+        others = [pools for (t, pools) in direct.items() if t != token]
+        legs[token] = plan_token(token, amount, frozenset(claimed.union(*others)))
+        claimed.update(pool for leg in legs[token] for pool in leg_pools(leg))
+
+    return legs
+
+
+def _routes(token_in, token_out, exclude):
+    """
+    The single-pool routes between the tokens whose pool isn't in `exclude`.
+    """
+    return [r for r in ROUTES if _route_pool(r, token_in, token_out) not in exclude]
+
+
+def _split_legs(split, token_in, token_out):
+    return [
+        Leg(venue, fee, [token_in, token_out], amount, quoted)
+        for ((venue, fee), amount, quoted) in split
+    ]
+
+
+def _costs(finder, given_out, gas_price):
+    gas_model = finder.gas_model
+    return {
+        (venue, fee): gas_model.swap_gas(venue, 1, given_out) * gas_price
+        for (venue, fee) in ROUTES
+    }
+
+
+def _gas(finder, legs, given_out, gas_price):
+    gas_model = finder.gas_model
+    return sum(gas_model.leg_gas(leg, given_out) for leg in legs) * gas_price
+
+
+def plan_given_in(
+    market, finder, token_in, token_out, amount, gas_price=0, exclude=frozenset()
+):
+    """
+    Legs selling exactly `amount` of token_in for the most token_out, net of
+    gas, through none of the pools of `exclude`. Empty when the proceeds
+    don't even pay for the gas: dust is left where it is.
+    """
+    if amount == 0:
+        return []
+
+    try:
+        split = split_given_in(
+            market,
+            token_in,
+            token_out,
+            amount,
+            routes=_routes(token_in, token_out, exclude),
+            costs=_costs(finder, False, gas_price),
+        )
+        legs = _split_legs(split, token_in, token_out)
+        net = sum(leg.quoted for leg in legs) - _gas(finder, legs, False, gas_price)
+    except ValueError:
+        (legs, net) = ([], None)
+
+    best = finder.best(token_in, token_out, amount, False, gas_price, exclude)
+    if best is not None and len(best[1]) > 2:
+        (venue, path, quoted) = best
+        path_net = quoted - finder.path_gas(venue, path) * gas_price
+        if net is None or path_net > net:
+            (legs, net) = ([Leg(venue, 0, path, amount, quoted)], path_net)
+
+    if not legs:
+        raise ValueError(f"no route can take {amount} of {token_in}")
+
+    if net <= 0:
+        return []
+
+    return legs
+
+
+def plan_given_out(
+    market, finder, token_in, token_out, amount, gas_price=0, exclude=frozenset()
+):
+    """
+    Legs buying exactly `amount` of token_out for the least token_in, gas
+    included, through none of the pools of `exclude`.
+    """
+    if amount == 0:
+        return []
+
+    try:
+        split = split_given_out(
+            market,
+            token_in,
+            token_out,
+            amount,
+            routes=_routes(token_in, token_out, exclude),
+            costs=_costs(finder, True, gas_price),
+        )
+        legs = _split_legs(split, token_in, token_out)
+        cost = sum(leg.quoted for leg in legs) + _gas(finder, legs, True, gas_price)
+    except ValueError:
+        (legs, cost) = ([], None)
+
+    best = finder.best(token_in, token_out, amount, True, gas_price, exclude)
+    if best is not None and len(best[1]) > 2:
+        (venue, path, quoted) = best
+        path_cost = quoted + finder.path_gas(venue, path, True) * gas_price
+        if cost is None or path_cost < cost:
+            return [Leg(venue, 0, path, amount, quoted)]
+
+    if not legs:
+        raise ValueError(f"no route can fill {amount} of {token_out}")
+
+    return legs
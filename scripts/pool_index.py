@@ -0,0 +1,73 @@
+"""
+Persistent index of pool addresses.
+
+A pool address never changes once the factory created it, so it is stored
+forever. A missing pool may still be created later: those answers are kept
+for `negative_ttl` blocks only.
+"""
+
+import json
+import os
+
+from scripts.constants import CACHE_DIR
+
+ZERO_ADDRESS = "0x" + "00" * 20
+
+# ~1 day of blocks
+NEGATIVE_TTL = 7200
+
+
+class PoolIndex:
+    def __init__(self, path=None, negative_ttl=NEGATIVE_TTL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.pools = {}
+        self.missing = {}
+        self.dirty = False
+
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.pools = data.get("pools", {})
+            self.missing = data.get("missing", {})
+
+    @staticmethod
+    def key(factory, token0, token1, fee=0):
+        return f"{factory.lower()}:{token0.lower()}:{token1.lower()}:{fee}"
+
+    def get(self, key, block=None):
+        """
+        Returns the pool address, ZERO_ADDRESS if the pool is known not to
+        exist as of `block`, or None if the index can't tell.
+        """
+        if key in self.pools:
+            return self.pools[key]
+
+        checked = self.missing.get(key)
+        if checked is not None and isinstance(block, int):
+            if block - self.negative_ttl <= checked <= block:
+                return ZERO_ADDRESS
+
+        return None
+
+    def put(self, key, pool, block):
+        if pool.lower() == ZERO_ADDRESS:
+            self.missing[key] = block
+        else:
+            self.pools[key] = pool
+            self.missing.pop(key, None)
+
+        self.dirty = True
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({"pools": self.pools, "missing": self.missing}, f, indent=1)
+
+        self.dirty = False
+
+
+POOL_INDEX = PoolIndex(os.path.join(CACHE_DIR, "pools.json"))
@@ -0,0 +1,81 @@
+"""
+Quotes from Uniswap V2, Sushiswap and Uniswap V3.
+
+Failed quotes are reported with sentinels so that the planners never pick
+them: 0 for a given-in quote and 2**256 - 1 for a given-out one.
+"""
+
+from collections import namedtuple
+
+from brownie import ZERO_ADDRESS, interface
+
+from scripts.constants import MAX_UINT256, ROUTER_SUSHI, ROUTER_UNIV2, ROUTES
+
+FEE_UNIV3 = 3000
+
+VENUES = ("univ2", "sushi", "univ3")
+ROUTERS_UNIV2 = {"univ2": ROUTER_UNIV2, "sushi": ROUTER_SUSHI}
+
+# A single quote request. `venue` is one of VENUES, `given_out` tells if
+# `amount` is the exact amount out (getAmountsIn / quoteExactOutputSingle).
+Quote = namedtuple(
+    "Quote",
+    ["venue", "token_in", "token_out", "amount", "given_out", "fee"],
+    defaults=[False, FEE_UNIV3],
+)
+
+
+def failed_quote(given_out):
+    return MAX_UINT256 if given_out else 0
+
+
+def quote_univ2(router, token_in, token_out, amount_in):
+    router = interface.IUniswapV2Router01(router)
+    try:
+        return router.getAmountsOut(amount_in, [token_in, token_out])[1]
+    except:
+        return 0
+
+
+def quote_univ2_given_out(router, token_in, token_out, amount_out):
+    router = interface.IUniswapV2Router01(router)
+    try:
+        return router.getAmountsIn(amount_out, [token_in, token_out])[0]
+    except:
+        return 2**256 - 1
+
+
+def quote_univ3(factory, quoter, token_in, token_out, amount_in, fee=FEE_UNIV3):
+    factory = interface.IUniswapV3Factory(factory)
+    pool = factory.getPool(token_in, token_out, fee)
+
+    if pool == ZERO_ADDRESS:
+        return 0
+    else:
+        try:
+            quoter = interface.IQuoter(quoter)
+            quote = quoter.quoteExactInputSingle.call(
+                token_in, token_out, fee, amount_in, 0
+            )
+            return quote
+        except:
+            return 0
+
+
+def quote_univ3_given_out(
+    factory, quoter, token_in, token_out, amount_out, fee=FEE_UNIV3
+):
+    factory = interface.IUniswapV3Factory(factory)
+    pool = factory.getPool(token_in, token_out, fee)
+
+    if pool == ZERO_ADDRESS:
+        return 2**256 - 1
+    else:
+        try:
+            quoter = interface.IQuoter(quoter)
+            quote = quoter.quoteExactOutputSingle.call(
+                token_in, token_out, fee, amount_out, 0
+            )
+            return quote
+        except:
+            return 2**256 - 1
@@ -0,0 +1,104 @@
+"""
+Records Uniswap V3 pools with their quoter answers, the fixtures the offline
+univ3_math tests check the simulator against:
+
+    $ brownie run scripts/record_univ3_quotes.py --network mainnet-fork-archive
+
+Each pool is stored as fetch_univ3_snapshot loads it, next to the
+quoteExactInputSingle / quoteExactOutputSingle answers at the same block for
+a range of amounts both ways, null when the quoter reverts.
+"""
+
+import json
+import os
+
+from brownie import interface
+
+from scripts.constants import QUOTER_UNIV3, USDC, WETH, WBTC
+from scripts.snapshots import fetch_univ3_snapshot
+
+FIXTURES = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)),
+    "tests",
+    "unit",
+    "data",
+    "univ3_quotes.json",
+)
+
+UNI = "0x1f9840a85d5aF5bf1D1762F925BDADdC4201F984"
+YFI = "0x0bc529c00C6401aEF6D220BE8C6Ea1667F6Ad93e"
+
+# (name, token_a, token_b, fee, amounts of token_a, amounts of token_b)
+POOLS = [
+    ("usdc_weth_500", USDC, WETH, 500, [10**k for k in (6, 9, 11, 13)], None),
+    ("uni_weth_3000", UNI, WETH, 3000, None, None),
+    ("yfi_weth_10000", YFI, WETH, 10000, None, None),
+    ("wbtc_weth_3000", WBTC, WETH, 3000, [10**k for k in (4, 6, 8, 10)], None),
+]
+
+AMOUNTS = [10**15, 10**17, 10**19, 10**21]
+
+
+def _quote(fn, token_in, token_out, fee, amount, block):
+    try:
+        return str(fn.call(token_in, token_out, fee, amount, 0, block_identifier=block))
+    except:
+        return None
+
+
+def record(token_a, token_b, fee, amounts_a, amounts_b, block=None):
+    snapshot = fetch_univ3_snapshot(
+        [(token_a, token_b)], fees=(fee,), block_identifier=block
+    )
+    pool = snapshot.get_pool(token_a, token_b, fee)
+    quoter = interface.IQuoter(QUOTER_UNIV3)
+
+    quotes = []
+    for (token_in, token_out, amounts) in (
+        (token_a, token_b, amounts_a or AMOUNTS),
+        (token_b, token_a, amounts_b or AMOUNTS),
+    ):
+        for amount in amounts:
+            quotes.append(
+                {
+                    "token_in": token_in.lower(),
+                    "token_out": token_out.lower(),
+                    "amount": str(amount),
+                    "exact_input": _quote(
+                        quoter.quoteExactInputSingle,
+                        token_in,
+                        token_out,
+                        fee,
+                        amount,
+                        snapshot.block,
+                    ),
+                    "exact_output": _quote(
+                        quoter.quoteExactOutputSingle,
+                        token_in,
+                        token_out,
+                        fee,
+                        amount,
+                        snapshot.block,
+                    ),
+                }
+            )
+
+    return {
+        "source": f"mainnet block {snapshot.block}",
+        "pool": pool.to_dict(),
+        "quotes": quotes,
+    }
+
+
+def main():
+    fixtures = {}
+    if os.path.exists(FIXTURES):
+        with open(FIXTURES) as f:
+            fixtures = json.load(f)
+
+    for (name, *args) in POOLS:
+        fixtures[name] = record(*args)
+        print(f"{name}: {len(fixtures[name]['quotes'])} quotes")
+
+    with open(FIXTURES, "w") as f:
+        json.dump(fixtures, f, indent=1, sort_keys=True)
@@ -0,0 +1,273 @@
+"""
+Incremental re-planning of a plan waiting for its signatures.
+
+A planner run loads every pool of every token, then plans each token on that
+Market. While the Safe transaction waits for signatures, most of those pools
+don't trade. The Replanner keeps the last plan on disk: its block, its
+Market, the amount planned for each token and the token's legs.
+
+A refresh scans the Sync (V2) and Swap (V3) logs of every pool of the Market
+since the plan's block, in one eth_getLogs: a re-planned token may move to
+pools the plan doesn't use, so they are brought to the same block. The logs
+carry the new state: Sync the reserves, Swap the price, tick and liquidity.
+Only a V3 pool whose liquidity moved (Mint / Burn) or whose price left its
+loaded ticks is read again. Then only the tokens whose plan pools traded, or
+whose amount changed, are re-planned.
+
+The logs of a refresh grow with the plan's age, and pools created since it
+was loaded are missing from its Market, so a plan loaded more than MAX_AGE
+blocks before is planned from scratch instead.
+
+`get_logs` is anything taking a log filter and returning its logs, e.g.
+`web3.eth.get_logs`.
+"""
+
+import json
+import os
+
+from scripts.constants import CACHE_DIR
+from scripts.market import Market
+from scripts.planner import Leg, leg_pools, plan_tokens
+from scripts.univ2_math import V2Snapshot
+from scripts.univ3_math import V3Pool, V3Snapshot
+
+SYNC_TOPIC = "0x1c411e9a96e071241c2f21f7726b17ae89e3cab4c78be50e062b03a9fffbbad1"
+SWAP_TOPIC = "0xc42079f94a6350d7e6235f29174924f928cc2ac818eb64fed8004e115fbcca67"
+MINT_TOPIC = "0x7a53080ba414158be7ec69b987b5fb7d07dee101fe85488f0853ae16239d0bde"
+BURN_TOPIC = "0x0c396cd989a39f4459b5fa1aed6a9a8dcdbc45908acfd67e028cd568da98982c"
+
+REPLAN_VERSION = 1
+
+# ~1 day of blocks
+MAX_AGE = 7200
+
+
+def _bytes(value):
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    return bytes(value)
+
+
+def _words(data):
+    data = _bytes(data)
+    return [data[i : i + 32] for i in range(0, len(data), 32)]
+
+
+def market_pools(market):
+    """
+    Every pool of `market`, (venue, token0, token1) on the V2 venues and
+    ("univ3", token0, token1, fee).
+    """
+    return [*market.v2.reserves, *(("univ3", *key) for key in market.v3.pools)]
+
+
+def plan_pools(legs):
+    """
+    {pool: tokens} of the pools of `legs`, {token: [Leg]}.
+    """
+    pools = {}
+    for (token, token_legs) in legs.items():
+        for leg in token_legs:
+            for key in leg_pools(leg):
+                pools.setdefault(key, set()).add(token)
+    return pools
+
+
+def apply_logs(market, logs, addresses):
+    """
+    Applies the Sync and Swap `logs` of the pools at `addresses`, {address:
+    pool}, to `market` in place.
+
+    Returns (traded, stale): the pools whose state changed, and the V3 pools
+    the logs can't update and that have to be read again.
+    """
+    (traded, stale) = (set(), set())
+    logs = sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"]))
+
+    for log in logs:
+        key = addresses.get(log["address"].lower())
+        if key is None or not log["topics"]:
+            continue
+
+        topic = "0x" + _bytes(log["topics"][0]).hex()
+        words = _words(log["data"])
+
+        if topic == SYNC_TOPIC and key[0] != "univ3":
+            market.v2.reserves[key] = tuple(int.from_bytes(w, "big") for w in words)
+        elif topic == SWAP_TOPIC and key[0] == "univ3":
+            pool = market.v3.pools.get(key[1:])
+            if pool is None:
+                stale.add(key)
+            else:
+                pool.sqrt_price_x96 = int.from_bytes(words[2], "big")
+                pool.liquidity = int.from_bytes(words[3], "big")
+                pool.tick = int.from_bytes(words[4], "big", signed=True)
+
+                # the ticks past the loaded bitmap words are unknown
+                word = (pool.tick // pool.tick_spacing) >> 8
+                if not pool.min_word <= word <= pool.max_word:
+                    stale.add(key)
+        elif topic in (MINT_TOPIC, BURN_TOPIC) and key[0] == "univ3":
+            stale.add(key)
+        else:
+            continue
+
+        traded.add(key)
+
+    return (traded, stale)
+
+
+def _dump_leg(leg):
+    return [leg.venue, leg.fee, list(leg.path), leg.amount, leg.quoted]
+
+
+def _dump_market(market):
+    return {
+        "block": market.block,
+        "v2": [[*key, r0, r1] for (key, (r0, r1)) in market.v2.reserves.items()],
+        "v3": [pool.to_dict() for pool in market.v3.pools.values()],
+    }
+
+
+def _load_market(data):
+    v2 = V2Snapshot(
+        data["block"], {tuple(row[:3]): (row[3], row[4]) for row in data["v2"]}
+    )
+    pools = [V3Pool.from_dict(d) for d in data["v3"]]
+    v3 = V3Snapshot(data["block"], {(p.token0, p.token1, p.fee): p for p in pools})
+    return Market(v2, v3)
+
+
+class Replanner:
+    """
+    The last plan of a planner, `name`, and the Market it was made on.
+    """
+
+    def __init__(self, name, path=None):
+        self.path = path or os.path.join(CACHE_DIR, "plans", f"{name}.json")
+        self.block = None
+        self.loaded = None
+        self.market = None
+        self.amounts = {}
+        self.legs = {}
+        self.meta = {}
+
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") == REPLAN_VERSION:
+                self.market = _load_market(data["market"])
+                self.block = self.market.block
+                self.loaded = data["loaded"]
+                self.amounts = data["amounts"]
+                self.legs = {
+                    t: [Leg(*leg) for leg in legs] for (t, legs) in data["legs"].items()
+                }
+                self.meta = data["meta"]
+
+    def usable(self, block):
+        """
+        Whether the plan can be refreshed up to `block`: its Market was loaded
+        at most MAX_AGE blocks before.
+        """
+        if self.market is None or block < self.block:
+            return False
+        return block - self.loaded <= MAX_AGE
+
+    def record(self, market, amounts, legs, **meta):
+        """
+        Remembers a plan made from scratch on `market`: the legs of every
+        token, {token: [Leg]}, for its amount in `amounts`.
+        """
+        self.market = market
+        self.block = self.loaded = market.block
+        self.amounts = dict(amounts)
+        self.legs = {t: list(legs.get(t, [])) for t in amounts}
+        self.meta = meta
+        self.save()
+
+    def plan(self):
+        """
+        Legs of every token, in the order of `amounts`.
+        """
+        return [leg for t in self.amounts for leg in self.legs[t]]
+
+    def refresh(self, get_logs, to_block, resolve, fetch_pool):
+        """
+        Brings every pool of the Market to `to_block`.
+
+        `resolve` maps pools to their {address: pool}, `fetch_pool` reads a V3
+        pool, (token0, token1, fee), at a block. Returns the pools that traded.
+        """
+        addresses = resolve(sorted(market_pools(self.market)))
+        logs = []
+        if addresses and to_block > self.block:
+            logs = get_logs(
+                {
+                    "address": sorted(addresses),
+                    "topics": [[SYNC_TOPIC, SWAP_TOPIC, MINT_TOPIC, BURN_TOPIC]],
+                    "fromBlock": self.block + 1,
+                    "toBlock": to_block,
+                }
+            )
+
+        (traded, stale) = apply_logs(self.market, logs, addresses)
+
+        for key in sorted(stale):
+            pool = fetch_pool(key[1:], to_block)
+            if pool is None:
+                self.market.v3.pools.pop(key[1:], None)
+            else:
+                self.market.v3.pools[key[1:]] = pool
+
+        self.block = self.market.block = to_block
+        (self.market.v2.block, self.market.v3.block) = (to_block, to_block)
+
+        return traded
+
+    def replan(self, traded, amounts, plan_token):
+        """
+        Re-plans the tokens whose pools `traded` or whose amount changed,
+        `plan_token(token, amount, exclude)` giving their new legs off the
+        pools of `exclude`, those of the other tokens, which keep their legs
+        (see scripts.planner.plan_tokens). Returns the tokens re-planned.
+        """
+        pools = plan_pools(self.legs)
+        touched = {t for key in traded for t in pools.get(key, ())}
+
+        tokens = [
+            t
+            for (t, amount) in amounts.items()
+            if t in touched or self.amounts.get(t) != amount or t not in self.legs
+        ]
+
+        kept = {t: self.legs[t] for t in amounts if t not in tokens}
+        planned = plan_tokens({t: amounts[t] for t in tokens}, plan_token, kept)
+
+        self.amounts = dict(amounts)
+        self.legs = {t: planned[t] if t in planned else kept[t] for t in amounts}
+        self.save()
+
+        return tokens
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        # write then rename, a crash mid-write keeps the previous plan
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "version": REPLAN_VERSION,
+                    "loaded": self.loaded,
+                    "market": _dump_market(self.market),
+                    "amounts": self.amounts,
+                    "legs": {
+                        t: [_dump_leg(leg) for leg in legs]
+                        for (t, legs) in self.legs.items()
+                    },
+                    "meta": self.meta,
+                },
+                f,
+            )
+        os.replace(tmp, self.path)
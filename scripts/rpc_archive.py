@@ -0,0 +1,261 @@
+"""
+Record / replay archive of the upstream reads of a mainnet fork.
+
+The fork node (ganache, hardhat...) reads mainnet state lazily from its
+upstream RPC: code, storage slots, balances, nonces, blocks... RpcProxy sits
+in between. In "record" mode it forwards every request upstream and archives
+the answers with a result, in "replay" mode it answers from the archive only, so a fork
+pinned to an archived block runs offline:
+
+    $ python -m scripts.rpc_archive record --upstream $MAINNET_RPC
+    $ python -m scripts.rpc_archive replay
+
+with the fork node forking from http://127.0.0.1:8645@<block>. One proxy
+serves any number of fork nodes, e.g. those of parallel test workers.
+
+The archive is content-addressed: each answer is stored once, zlib
+compressed, under blobs/ by its sha256, whatever the requests it answers.
+Requests are indexed by the block they read (blocks/<block>.json, "none"
+for requests without one), mapping the sha256 of the request to its answer.
+
+Upstream errors are passed on but never archived: a rate limit or a timeout
+says nothing of the state at the block, so the request is forwarded again the
+next time it is made.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import urllib.request
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scripts.constants import CACHE_DIR
+
+ARCHIVE_DIR = os.path.join(CACHE_DIR, "rpc_archive")
+
+# clear of the fork ports, 8545 + the xdist worker's number
+PORT = 8645
+
+# position of the block parameter of the methods reading state at a block
+BLOCK_PARAM = {
+    "eth_call": 1,
+    "eth_estimateGas": 1,
+    "eth_getBalance": 1,
+    "eth_getBlockByNumber": 0,
+    "eth_getCode": 1,
+    "eth_getProof": 2,
+    "eth_getStorageAt": 2,
+    "eth_getTransactionCount": 1,
+}
+
+# index writes are batched, the rest is flushed on close
+FLUSH_EVERY = 256
+
+
+class ArchiveMiss(KeyError):
+    """The request isn't in the archive."""
+
+
+def request_key(method, params):
+    payload = json.dumps([method, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def request_block(method, params):
+    """
+    The block `params` read at: a number, a tag ("latest", ...) or "none".
+    """
+    i = BLOCK_PARAM.get(method)
+    if i is None or len(params) <= i:
+        return "none"
+
+    block = params[i]
+    if isinstance(block, dict):
+        block = block.get("blockNumber", block.get("blockHash", "none"))
+    if isinstance(block, str) and block.startswith("0x") and len(block) < 66:
+        return str(int(block, 16))
+    return str(block)
+
+
+class RpcArchive:
+    def __init__(self, path=ARCHIVE_DIR):
+        self.path = path
+        self.index = {}
+        self._dirty = set()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        blocks = os.path.join(path, "blocks")
+        if os.path.isdir(blocks):
+            for name in os.listdir(blocks):
+                if name.endswith(".json"):
+                    with open(os.path.join(blocks, name)) as f:
+                        self.index[name[: -len(".json")]] = json.load(f)
+
+    def _blob(self, digest):
+        return os.path.join(self.path, "blobs", digest[:2], digest)
+
+    def get(self, method, params):
+        """
+        The archived answer, {"result": ...} or {"error": ...}.
+
+        Raises ArchiveMiss if the request was never recorded.
+        """
+        block = request_block(method, params)
+        digest = self.index.get(block, {}).get(request_key(method, params))
+        if digest is None:
+            raise ArchiveMiss(f"{method} {params}")
+
+        with open(self._blob(digest), "rb") as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    def put(self, method, params, answer):
+        data = json.dumps(answer, sort_keys=True, separators=(",", ":")).encode()
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self._blob(digest)
+
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            tmp = f"{blob}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(zlib.compress(data))
+            os.replace(tmp, blob)
+
+        block = request_block(method, params)
+        with self._lock:
+            self.index.setdefault(block, {})[request_key(method, params)] = digest
+            self._dirty.add(block)
+            self._writes += 1
+            flush = self._writes % FLUSH_EVERY == 0
+
+        if flush:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            (dirty, self._dirty) = (self._dirty, set())
+            index = {block: dict(self.index[block]) for block in dirty}
+
+        os.makedirs(os.path.join(self.path, "blocks"), exist_ok=True)
+        for (block, requests) in index.items():
+            path = os.path.join(self.path, "blocks", f"{block}.json")
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(requests, f, sort_keys=True)
+            os.replace(f"{path}.tmp", path)
+
+
+class RpcProxy:
+    """
+    JSON-RPC server over an RpcArchive, recording from `upstream` when set
+    and replaying only otherwise. Misses in replay are JSON-RPC errors.
+    """
+
+    def __init__(self, archive, upstream=None, host="127.0.0.1", port=PORT):
+        self.archive = archive
+        self.upstream = upstream
+        self.misses = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+
+    @property
+    def url(self):
+        (host, port) = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _forward(self, request):
+        body = json.dumps(request).encode()
+        upstream = urllib.request.Request(
+            self.upstream, body, {"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(upstream, timeout=60) as resp:
+            return json.loads(resp.read())
+
+    def answer(self, request):
+        (method, params) = (request["method"], request.get("params", []))
+
+        try:
+            answer = self.archive.get(method, params)
+        except ArchiveMiss:
+            if self.upstream is None:
+                self.misses += 1
+                answer = {
+                    "error": {"code": -32000, "message": f"not archived: {method}"}
+                }
+            else:
+                response = self._forward(request)
+                answer = {k: response[k] for k in ("result", "error") if k in response}
+                if "result" in answer:
+                    self.archive.put(method, params, answer)
+
+        return {"jsonrpc": "2.0", "id": request.get("id"), **answer}
+
+    def _handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                request = json.loads(self.rfile.read(length))
+
+                if isinstance(request, list):
+                    response = [proxy.answer(r) for r in request]
+                else:
+                    response = proxy.answer(request)
+
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def serve_forever(self):
+        try:
+            self.server.serve_forever()
+        finally:
+            self.archive.flush()
+
+    def start(self):
+        """
+        Serves from a background thread, for tests.
+        """
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.archive.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--upstream", help="upstream RPC, to record")
+    parser.add_argument("--archive", default=ARCHIVE_DIR)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    if args.mode == "record" and not args.upstream:
+        parser.error("record needs --upstream")
+
+    upstream = args.upstream if args.mode == "record" else None
+    proxy = RpcProxy(RpcArchive(args.archive), upstream, port=args.port)
+
+    print(f"{args.mode}ing {args.archive} on {proxy.url}")
+    try:
+        proxy.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+JSON-RPC instrumentation of the planning scripts.
+
+RpcStats records every request going through a web3 provider (as a
+middleware) or the AsyncQuoteEngine: method, target contract, called
+function (from its selector), latency and payload sizes. Requests are
+attributed to the pipeline stage running when they are sent:
+
+    stats = RpcStats()
+    stats.install(web3)
+
+    with stats.stage("quoting"):
+        ...
+
+    print(stats.summary())
+    stats.export(path)
+
+Stages also record their wall time, so time spent off the wire (local math,
+signing) shows up next to the RPC time.
+"""
+
+import json
+import os
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+# eth-hash's backend
+from Crypto.Hash import keccak
+
+from scripts.constants import CACHE_DIR
+
+# functions the scripts call, named in the stats instead of their selector
+SIGNATURES = [
+    "getAmountsOut(uint256,address[])",
+    "getAmountsIn(uint256,address[])",
+    "quoteExactInputSingle(address,address,uint24,uint256,uint160)",
+    "quoteExactOutputSingle(address,address,uint24,uint256,uint160)",
+    "getPool(address,address,uint24)",
+    "getPair(address,address)",
+    "getReserves()",
+    "slot0()",
+    "liquidity()",
+    "tickSpacing()",
+    "tickBitmap(int16)",
+    "ticks(int24)",
+    "tryBlockAndAggregate(bool,(address,bytes)[])",
+    "balanceOf(address)",
+    "balance(address)",
+    "totalSupply()",
+    "getTokens()",
+    "getCap()",
+    "calcOutStandingAnnualizedFee()",
+    "calcTokensForAmount(uint256)",
+    "approved(address,address)",
+    "deposits(address)",
+    "totalDeposits()",
+    "rate()",
+    "nonce()",
+    "execSwaps((bool,bytes)[],uint256)",
+    "execSwapsPacked(bytes,uint256)",
+    "execSwapsGivenOut((bool,bytes)[],uint256)",
+    "execSwapsGivenOutPacked(bytes,uint256)",
+    "bake(uint256,uint256,uint256,bool,(bool,bytes)[])",
+    "bakePacked(uint256,uint256,uint256,bool,bytes)",
+    "exitFor(address[])",
+    "settleMerkle(bytes32)",
+]
+
+# latency histogram buckets, upper bounds in ms (the last one is open)
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+RPC_STATS_DIR = os.path.join(CACHE_DIR, "rpc_stats")
+
+
+def _selector(signature):
+    return "0x" + keccak.new(data=signature.encode(), digest_bits=256).hexdigest()[:8]
+
+
+FUNCTIONS = {_selector(s): s.split("(")[0] for s in SIGNATURES}
+
+
+def _hex(data):
+    if isinstance(data, (bytes, bytearray)):
+        return "0x" + bytes(data).hex()
+    return data or ""
+
+
+def describe(method, params):
+    """
+    (target, function) of a request, None when they don't apply.
+    """
+    if not params:
+        return (None, None)
+
+    first = params[0]
+    if isinstance(first, dict):
+        data = _hex(first.get("data") or first.get("input"))
+        function = None
+        if len(data) >= 10:
+            function = FUNCTIONS.get(data[:10].lower(), data[:10].lower())
+        return (first.get("to") or first.get("address"), function)
+
+    if method in ("eth_getCode", "eth_getBalance", "eth_getStorageAt"):
+        return (first, None)
+
+    return (None, None)
+
+
+def _size(payload):
+    return len(json.dumps(payload, default=str))
+
+
+class RpcStats:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.calls = []
+        self.stages = defaultdict(float)
+        self._stage = "other"
+
+    @contextmanager
+    def stage(self, name):
+        (previous, self._stage) = (self._stage, name)
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.stages[name] += self.clock() - start
+            self._stage = previous
+
+    def record(self, method, params, latency, response):
+        (target, function) = describe(method, params)
+        self.calls.append(
+            (
+                self._stage,
+                method,
+                target.lower() if isinstance(target, str) else target,
+                function,
+                latency,
+                _size(params),
+                _size(response),
+            )
+        )
+
+    def middleware(self, make_request, w3):
+        """
+        web3 middleware, see install().
+        """
+
+        def middleware(method, params):
+            start = self.clock()
+            response = make_request(method, params)
+            self.record(method, params, self.clock() - start, response)
+            return response
+
+        return middleware
+
+    def install(self, w3):
+        if "rpc_stats" not in w3.middleware_onion:
+            w3.middleware_onion.add(self.middleware, "rpc_stats")
+
+    def groups(self):
+        """
+        Stats per (stage, method, function): count, total and max latency
+        (seconds), request and response bytes, latency histogram.
+        """
+        groups = {}
+
+        for (stage, method, _, function, latency, req, resp) in self.calls:
+            key = (stage, method, function)
+            if key not in groups:
+                groups[key] = {
+                    "count": 0,
+                    "latency": 0.0,
+                    "max_latency": 0.0,
+                    "request_bytes": 0,
+                    "response_bytes": 0,
+                    "histogram": [0] * (len(BUCKETS_MS) + 1),
+                }
+
+            g = groups[key]
+            g["count"] += 1
+            g["latency"] += latency
+            g["max_latency"] = max(g["max_latency"], latency)
+            g["request_bytes"] += req
+            g["response_bytes"] += resp
+            g["histogram"][bisect_left(BUCKETS_MS, latency * 1000)] += 1
+
+        return groups
+
+    def summary(self):
+        """
+        Table of the groups, then the time of every stage.
+        """
+        lines = [
+            f"{'stage':<12} {'method':<22} {'function':<24} {'calls':>6} "
+            f"{'total ms':>9} {'max ms':>8} {'kB out':>7} {'kB in':>7}"
+        ]
+
+        for ((stage, method, function), g) in sorted(self.groups().items(), key=str):
+            lines.append(
+                f"{stage:<12} {method:<22} {function or '':<24} {g['count']:>6} "
+                f"{g['latency'] * 1000:>9.1f} {g['max_latency'] * 1000:>8.1f} "
+                f"{g['request_bytes'] / 1000:>7.1f} {g['response_bytes'] / 1000:>7.1f}"
+            )
+
+        rpc = defaultdict(float)
+        for call in self.calls:
+            rpc[call[0]] += call[4]
+
+        lines.append("")
+        for (stage, elapsed) in self.stages.items():
+            lines.append(
+                f"{stage:<12} {elapsed * 1000:>9.1f} ms, "
+                f"{rpc[stage] * 1000:.1f} ms in RPC"
+            )
+
+        return "\n".join(lines)
+
+    def export(self, path):
+        groups = [
+            {"stage": stage, "method": method, "function": function, **g}
+            for ((stage, method, function), g) in self.groups().items()
+        ]
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "buckets_ms": list(BUCKETS_MS),
+                    "stages": dict(self.stages),
+                    "groups": groups,
+                },
+                f,
+                indent=1,
+            )
+
+
+def export_path(script):
+    """
+    Where `script` exports the stats of its run, one file per run.
+    """
+    return os.path.join(RPC_STATS_DIR, f"{script}-{int(time.time())}.json")
@@ -0,0 +1,211 @@
+"""
+Pre-flight check of a planned call sequence, before it goes to the Safe.
+
+The planners execute their calls from the Safe on a fork at the latest block
+to get the receipts of the multisend. In simulate mode these receipts are
+also checked against the plan: every leg is matched to the token transfers
+it made from / to the migrator, which gives its realized amount (amount out
+of an exact-in swap, amount in of an exact-out one) next to its quote.
+
+A leg that realized more than MAX_DEVIATION_BPS worse than quoted fails the
+check, and the planner then stops short of the Safe payload. The report also
+shows each leg's price impact against the market's spot price, the gas used
+by each call and what the migrator is left with.
+"""
+
+from collections import namedtuple
+
+from scripts.constants import MAX_UINT256
+
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+# realized over quoted, in basis points, worse than which a leg fails
+MAX_DEVIATION_BPS = 50
+
+# size of the spot price probe, as a fraction of the leg's amount
+PROBE = 10**4
+
+Transfer = namedtuple("Transfer", ["token", "src", "dst", "value"])
+
+LegResult = namedtuple(
+    "LegResult", ["leg", "limit", "realized", "deviation_bps", "impact_bps"]
+)
+
+Simulation = namedtuple("Simulation", ["given_out", "legs", "gas", "leftovers"])
+
+
+def _hex(value):
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    return value
+
+
+def decode_transfers(logs):
+    """
+    ERC20 Transfer events of receipt `logs`, in order, addresses lowercase.
+    """
+    transfers = []
+
+    for log in logs:
+        topics = [_hex(t) for t in log["topics"]]
+        if len(topics) != 3 or topics[0].lower() != TRANSFER_TOPIC:
+            continue
+
+        data = _hex(log["data"])
+        transfers.append(
+            Transfer(
+                log["address"].lower(),
+                "0x" + topics[1][-40:].lower(),
+                "0x" + topics[2][-40:].lower(),
+                int(data, 16) if len(data) > 2 else 0,
+            )
+        )
+
+    return transfers
+
+
+def _next(transfers, start, token):
+    for i in range(start, len(transfers)):
+        if transfers[i].token == token:
+            return (i + 1, transfers[i].value)
+    return (len(transfers), None)
+
+
+def realized_amounts(legs, transfers, account):
+    """
+    (amount_in, amount_out) of each leg, executed in order by `account`.
+
+    A leg pays its first token from `account` and receives its last one, the
+    hops in between don't touch it. None where no transfer was found.
+    """
+    account = account.lower()
+    sent = [t for t in transfers if t.src == account]
+    received = [t for t in transfers if t.dst == account]
+
+    (i, j) = (0, 0)
+    amounts = []
+    for leg in legs:
+        (i, amount_in) = _next(sent, i, leg.path[0].lower())
+        (j, amount_out) = _next(received, j, leg.path[-1].lower())
+        amounts.append((amount_in, amount_out))
+
+    return amounts
+
+
+def quote_leg(market, leg, amount, given_out=False):
+    """
+    Quote of `amount` on the leg's route, None if the market can't fill it.
+    """
+    if leg.venue == "univ3":
+        quoted = market.v3.quote(leg.path[0], leg.path[-1], amount, given_out, leg.fee)
+    else:
+        quoted = market.v2.quote_path(leg.venue, leg.path, amount, given_out)
+
+    if quoted in (0, MAX_UINT256):
+        return None
+    return quoted
+
+
+def price_impact_bps(market, leg, realized, given_out=False):
+    """
+    How much worse than the spot price the leg executed, in basis points.
+
+    The spot price is the one of a probe of 1 / PROBE of the amount, so the
+    fees count in neither. None when the probe can't be quoted.
+    """
+    probe = leg.amount // PROBE
+    quoted = quote_leg(market, leg, probe, given_out) if probe else None
+    if quoted is None or realized is None:
+        return None
+
+    # spot: `quoted` for `probe`, executed: `realized` for `leg.amount`
+    if given_out:
+        return realized * probe * 10_000 // (leg.amount * quoted) - 10_000
+    return 10_000 - realized * probe * 10_000 // (leg.amount * quoted)
+
+
+def deviation_bps(quoted, realized, given_out=False):
+    """
+    How much worse than quoted the leg realized, in basis points.
+    """
+    if realized is None:
+        return None
+    if given_out:
+        return (realized - quoted) * 10_000 // quoted
+    return (quoted - realized) * 10_000 // quoted
+
+
+def simulate(market, swaps, receipts, account, given_out=False, leftovers=None):
+    """
+    Simulation of the (leg, limit) `swaps`, executed in order by the
+    `receipts` of `account`. `leftovers` are the token balances left.
+    """
+    transfers = decode_transfers([log for r in receipts for log in r.logs])
+    legs = [leg for (leg, _) in swaps]
+    results = []
+
+    for ((leg, limit), (amount_in, amount_out)) in zip(
+        swaps, realized_amounts(legs, transfers, account)
+    ):
+        realized = amount_in if given_out else amount_out
+        results.append(
+            LegResult(
+                leg,
+                limit,
+                realized,
+                deviation_bps(leg.quoted, realized, given_out),
+                price_impact_bps(market, leg, realized, given_out),
+            )
+        )
+
+    return Simulation(
+        given_out, results, [r.gas_used for r in receipts], dict(leftovers or {})
+    )
+
+
+def check(simulation, max_deviation_bps=MAX_DEVIATION_BPS):
+    """
+    Reasons not to post the calls, none if the simulation passes.
+    """
+    failures = []
+
+    for (i, r) in enumerate(simulation.legs):
+        name = f"swap {i} {r.leg.venue} {r.leg.path[0]} -> {r.leg.path[-1]}"
+        if r.realized is None:
+            failures.append(f"{name}: no transfer found")
+        elif r.deviation_bps > max_deviation_bps:
+            failures.append(
+                f"{name}: realized {r.realized} for {r.leg.quoted} quoted, "
+                f"{r.deviation_bps} bps worse (max {max_deviation_bps})"
+            )
+
+    return failures
+
+
+def report(simulation):
+    """
+    Table of the legs, then the gas of every call and the leftovers.
+    """
+    side = "in" if simulation.given_out else "out"
+    lines = [
+        f"{'#':>3} {'venue':<6} {'token in':<10} {'token out':<10} "
+        f"{'quoted ' + side:>26} {'realized ' + side:>26} {'dev bps':>8} "
+        f"{'impact bps':>10}"
+    ]
+
+    for (i, r) in enumerate(simulation.legs):
+        lines.append(
+            f"{i:>3} {r.leg.venue:<6} {r.leg.path[0][:10]:<10} "
+            f"{r.leg.path[-1][:10]:<10} {r.leg.quoted:>26} {str(r.realized):>26} "
+            f"{str(r.deviation_bps):>8} {str(r.impact_bps):>10}"
+        )
+
+    lines.append("")
+    for (i, gas) in enumerate(simulation.gas):
+        lines.append(f"call {i}: {gas} gas")
+    lines.append(f"total: {sum(simulation.gas)} gas")
+
+    for (token, amount) in simulation.leftovers.items():
+        lines.append(f"left {token}: {amount}")
+
+    return "\n".join(lines)
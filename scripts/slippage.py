@@ -0,0 +1,118 @@
+"""
+Depth-aware slippage bounds of the planned swaps.
+
+A swap waiting for its transaction (the Safe signatures, then inclusion)
+executes after other trades hit its pools. The model insures each leg against
+`flow` of adverse volume per block, trading ahead of it in the same direction,
+over `delay_blocks`. Flows of many blocks partly cancel out, so the volume
+grows with the square root of the delay.
+
+On a pool of input reserve X (the virtual one of a V3 pool, at its current
+price), an adverse trade of F moves the price against the leg by
+(X + F)**2 / X**2, so the bounds are tight on deep pools and wide on thin
+ones. Multi-hop legs compound the moves of their hops, each hop's F being the
+volume converted at the leg's own rate.
+
+Everything is integer math on the Market the plan was made on, all the bounds
+of a plan in one pass. They are clamped to [min_bps, max_bps] around the
+quote, the floor covering rounding and the blocks before the first one.
+"""
+
+from math import isqrt
+
+from scripts.univ2_math import get_amount_out
+
+# expected blocks between the quotes and the execution
+DELAY_BLOCKS = 25
+
+# adverse volume insured against per block, in the legs' quoted token (WETH)
+FLOW_PER_BLOCK = 2 * 10**18
+
+MIN_BPS = 10
+MAX_BPS = 500
+
+
+class SlippageModel:
+    def __init__(
+        self,
+        delay_blocks=DELAY_BLOCKS,
+        flow=FLOW_PER_BLOCK,
+        min_bps=MIN_BPS,
+        max_bps=MAX_BPS,
+    ):
+        self.delay_blocks = delay_blocks
+        self.flow = flow
+        self.min_bps = min_bps
+        self.max_bps = max_bps
+
+    @property
+    def volume(self):
+        """
+        Adverse volume over the whole delay.
+        """
+        return self.flow * isqrt(self.delay_blocks)
+
+    def hops(self, market, leg, given_out=False):
+        """
+        (input reserve, input amount) of every hop of `leg`, None when a pool
+        of the leg has no liquidity.
+        """
+        amount = leg.quoted if given_out else leg.amount
+
+        if leg.venue == "univ3":
+            pool = market.v3.get_pool(leg.path[0], leg.path[-1], leg.fee)
+            if pool is None or not pool.liquidity:
+                return None
+
+            (sqrt_price, liquidity) = (pool.sqrt_price_x96, pool.liquidity)
+            if leg.path[0].lower() == pool.token0:
+                reserve = (liquidity << 96) // sqrt_price
+            else:
+                reserve = (liquidity * sqrt_price) >> 96
+            return [(reserve, amount)]
+
+        hops = []
+        for (r_in, r_out) in market.v2.path_reserves(leg.venue, leg.path):
+            if not (r_in and r_out):
+                return None
+            hops.append((r_in, amount))
+            amount = get_amount_out(amount, r_in, r_out) if amount else 0
+
+        return hops
+
+    def limit(self, market, leg, given_out=False):
+        """
+        Min out of an exact-in leg, or max in of an exact-out one.
+        """
+        quoted = leg.quoted
+        if given_out:
+            floor = -(-quoted * (10_000 + self.min_bps) // 10_000)
+            ceiling = quoted * (10_000 + self.max_bps) // 10_000
+        else:
+            floor = quoted * (10_000 - self.max_bps) // 10_000
+            ceiling = quoted * (10_000 - self.min_bps) // 10_000
+
+        hops = self.hops(market, leg, given_out)
+        if hops is None or quoted == 0:
+            return ceiling if given_out else floor
+
+        # adverse volume of each hop, in its input token
+        volume = self.volume
+        (moved, unmoved) = (1, 1)
+        for (reserve, amount) in hops:
+            adverse = volume * amount // quoted
+            moved *= (reserve + adverse) ** 2
+            unmoved *= reserve**2
+
+        if given_out:
+            bound = -(-quoted * moved // unmoved)
+        else:
+            bound = quoted * unmoved // moved
+
+        return min(max(bound, floor), ceiling)
+
+    def limits(self, market, legs, given_out=False):
+        """
+        limit() of every leg of a plan.
+        """
+        return [self.limit(market, leg, given_out) for leg in legs]
@@ -0,0 +1,309 @@
+"""
+Loads on-chain pool state once per block for the local AMM math engines.
+"""
+
+from eth_abi import decode_abi, decode_single, encode_abi
+from eth_utils import function_signature_to_4byte_selector
+
+from scripts.constants import (
+    FACTORY_SUSHI,
+    FACTORY_UNIV2,
+    FACTORY_UNIV3,
+    FEE_TIERS,
+    WETH,
+)
+from scripts.bake_solver import Basket
+from scripts.market import Market
+from scripts.multicall import aggregate
+from scripts.pool_index import POOL_INDEX, PoolIndex
+from scripts.univ2_math import V2Snapshot, sort_tokens
+from scripts.univ3_math import V3Pool, V3Snapshot
+
+ZERO_ADDRESS = "0x" + "00" * 20
+
+FACTORIES_UNIV2 = {"univ2": FACTORY_UNIV2, "sushi": FACTORY_SUSHI}
+
+
+def _selector(signature):
+    return "0x" + function_signature_to_4byte_selector(signature).hex()
+
+
+GET_PAIR = _selector("getPair(address,address)")
+GET_RESERVES = _selector("getReserves()")
+GET_POOL = _selector("getPool(address,address,uint24)")
+SLOT0 = _selector("slot0()")
+LIQUIDITY = _selector("liquidity()")
+TICK_SPACING = _selector("tickSpacing()")
+TICK_BITMAP = _selector("tickBitmap(int16)")
+TICKS = _selector("ticks(int24)")
+GET_TOKENS = _selector("getTokens()")
+BALANCE = _selector("balance(address)")
+TOTAL_SUPPLY = _selector("totalSupply()")
+OUTSTANDING_FEE = _selector("calcOutStandingAnnualizedFee()")
+GET_CAP = _selector("getCap()")
+
+SLOT0_TYPES = ["uint160", "int24", "uint16", "uint16", "uint16", "uint8", "bool"]
+TICKS_TYPES = [
+    "uint128",
+    "int128",
+    "uint256",
+    "uint256",
+    "int56",
+    "uint160",
+    "uint32",
+    "bool",
+]
+
+# tickBitmap words loaded on each side of the current one
+BITMAP_WORDS = 10
+
+
+def weth_pairs(tokens):
+    return [(t, WETH) for t in tokens if t.lower() != WETH.lower()]
+
+
+def _resolve(requests, block_identifier):
+    """
+    Resolves pool addresses through the persistent POOL_INDEX, asking the
+    factories only about the unknown ones.
+
+    `requests` maps our keys to (index_key, factory, calldata). Returns
+    {key: pool} for the existing pools.
+    """
+    found = {
+        k: POOL_INDEX.get(index_key, block_identifier)
+        for (k, (index_key, _, _)) in requests.items()
+    }
+    missing = sorted(k for (k, pool) in found.items() if pool is None)
+
+    if missing:
+        calls = [requests[k][1:] for k in missing]
+        (block, results) = aggregate(calls, block_identifier)
+
+        for (k, (success, data)) in zip(missing, results):
+            if success:
+                found[k] = decode_single("address", bytes(data))
+                POOL_INDEX.put(requests[k][0], found[k], block)
+
+        POOL_INDEX.save()
+
+    return {k: p for (k, p) in found.items() if p and p.lower() != ZERO_ADDRESS}
+
+
+def univ2_pairs(token_pairs, venues=("univ2", "sushi"), block_identifier=None):
+    """
+    Resolves the pair address of every (token_a, token_b) on every venue.
+
+    Returns {(venue, token0, token1): pair}, missing pairs are left out.
+    """
+    requests = {}
+    for (token_a, token_b) in token_pairs:
+        (token0, token1) = sort_tokens(token_a, token_b)
+        for v in venues:
+            factory = FACTORIES_UNIV2[v]
+            args = encode_abi(["address", "address"], [token0, token1])
+            requests[(v, token0, token1)] = (
+                PoolIndex.key(factory, token0, token1),
+                factory,
+                GET_PAIR + args.hex(),
+            )
+
+    return _resolve(requests, block_identifier)
+
+
+def fetch_univ2_snapshot(token_pairs, venues=("univ2", "sushi"), block_identifier=None):
+    """
+    Reads the reserves of all the pairs of `token_pairs` on `venues` in one
+    multicall batch pinned to a single block.
+    """
+    pairs = univ2_pairs(token_pairs, venues, block_identifier)
+    keys = sorted(pairs)
+
+    (block, results) = aggregate(
+        [(pairs[k], GET_RESERVES) for k in keys], block_identifier
+    )
+
+    reserves = {}
+    for (key, (success, data)) in zip(keys, results):
+        if success:
+            (reserve0, reserve1, _) = decode_abi(
+                ["uint112", "uint112", "uint32"], bytes(data)
+            )
+            reserves[key] = (reserve0, reserve1)
+
+    return V2Snapshot(block, reserves)
+
+
+def univ3_pools(token_pairs, fees=FEE_TIERS, block_identifier=None):
+    """
+    Resolves the Uniswap V3 pool of every (token_a, token_b) for every fee.
+
+    Returns {(token0, token1, fee): pool}, missing pools are left out.
+    """
+    requests = {}
+    for (token_a, token_b) in token_pairs:
+        (token0, token1) = sort_tokens(token_a, token_b)
+        for fee in fees:
+            args = encode_abi(["address", "address", "uint24"], [token0, token1, fee])
+            requests[(token0, token1, fee)] = (
+                PoolIndex.key(FACTORY_UNIV3, token0, token1, fee),
+                FACTORY_UNIV3,
+                GET_POOL + args.hex(),
+            )
+
+    return _resolve(requests, block_identifier)
+
+
+def fetch_univ3_snapshot(
+    token_pairs, fees=FEE_TIERS, words=BITMAP_WORDS, block_identifier=None
+):
+    """
+    Loads slot0, liquidity and the initialized ticks `words` bitmap words
+    around the current price of every pool, in three multicall rounds pinned
+    to the same block.
+    """
+    pools = univ3_pools(token_pairs, fees, block_identifier)
+    keys = sorted(pools)
+
+    # slot0, liquidity and tick spacing
+    calls = [
+        (pools[k], data) for k in keys for data in (SLOT0, LIQUIDITY, TICK_SPACING)
+    ]
+    (block, results) = aggregate(calls, block_identifier)
+
+    state = {}
+    for (i, key) in enumerate(keys):
+        (slot0, liquidity, spacing) = results[3 * i : 3 * i + 3]
+        if not (slot0[0] and liquidity[0] and spacing[0]):
+            continue
+
+        (sqrt_price, tick) = decode_abi(SLOT0_TYPES, bytes(slot0[1]))[:2]
+        spacing = decode_single("int24", bytes(spacing[1]))
+        word = (tick // spacing) >> 8
+        (first, last) = (max(word - words, -(2**15)), min(word + words, 2**15 - 1))
+
+        state[key] = {
+            "sqrt_price": sqrt_price,
+            "tick": tick,
+            "liquidity": decode_single("uint128", bytes(liquidity[1])),
+            "spacing": spacing,
+            "words": range(first, last + 1),
+        }
+
+    # tick bitmap
+    calls = [
+        (pools[k], TICK_BITMAP + encode_abi(["int16"], [w]).hex())
+        for k in state
+        for w in state[k]["words"]
+    ]
+    (_, results) = aggregate(calls, block)
+
+    results = iter(results)
+    initialized = []
+    for (key, s) in state.items():
+        s["bitmap"] = {}
+        for w in s["words"]:
+            (success, data) = next(results)
+            bits = decode_single("uint256", bytes(data)) if success else 0
+            if bits:
+                s["bitmap"][w] = bits
+
+            while bits:
+                bit = (bits & -bits).bit_length() - 1
+                initialized.append((key, ((w << 8) + bit) * s["spacing"]))
+                bits &= bits - 1
+
+    # liquidityNet of the initialized ticks
+    calls = [
+        (pools[key], TICKS + encode_abi(["int24"], [t]).hex())
+        for (key, t) in initialized
+    ]
+    (_, results) = aggregate(calls, block)
+
+    for ((key, t), (success, data)) in zip(initialized, results):
+        if success:
+            state[key].setdefault("ticks", {})[t] = decode_abi(
+                TICKS_TYPES, bytes(data)
+            )[1]
+
+    snapshot = {}
+    for (key, s) in state.items():
+        snapshot[key] = V3Pool(
+            key[0],
+            key[1],
+            key[2],
+            s["spacing"],
+            s["sqrt_price"],
+            s["tick"],
+            s["liquidity"],
+            s["bitmap"],
+            s.get("ticks", {}),
+            s["words"][0],
+            s["words"][-1],
+        )
+
+    return V3Snapshot(block, snapshot)
+
+
+def fetch_univ3_pool(key, block_identifier=None):
+    """
+    The V3Pool of `key`, (token0, token1, fee), None if it doesn't exist.
+    """
+    (token0, token1, fee) = key
+    snapshot = fetch_univ3_snapshot(
+        [(token0, token1)], fees=(fee,), block_identifier=block_identifier
+    )
+    return snapshot.pools.get(key)
+
+
+def pool_addresses(keys, block_identifier=None):
+    """
+    {address: key} of the pools of `keys`, (venue, token0, token1) on the V2
+    venues and ("univ3", token0, token1, fee) on Uniswap V3.
+    """
+    found = {}
+
+    for venue in FACTORIES_UNIV2:
+        pairs = [k[1:] for k in keys if k[0] == venue]
+        if pairs:
+            found.update(univ2_pairs(pairs, (venue,), block_identifier))
+
+    for fee in sorted({k[3] for k in keys if k[0] == "univ3"}):
+        pairs = [k[1:3] for k in keys if k[0] == "univ3" and k[3] == fee]
+        for (key, pool) in univ3_pools(pairs, (fee,), block_identifier).items():
+            found[("univ3", *key)] = pool
+
+    return {pool.lower(): key for (key, pool) in found.items()}
+
+
+def fetch_market(token_pairs, block_identifier=None, v2_pairs=()):
+    """
+    Loads the V2 reserves and the V3 pools of `token_pairs` at the same block.
+    `v2_pairs` are only loaded on the V2 venues, for the multi-hop paths.
+    """
+    v2 = fetch_univ2_snapshot(
+        sorted(set(token_pairs) | set(v2_pairs)), block_identifier=block_identifier
+    )
+    v3 = fetch_univ3_snapshot(token_pairs, block_identifier=v2.block)
+
+    return Market(v2, v3)
+
+
+def fetch_basket(basket, block_identifier=None):
+    """
+    Loads what the local calcTokensForAmount of a PieDAO basket needs, in two
+    multicall rounds pinned to the same block.
+    """
+    (block, ((_, data),)) = aggregate([(basket, GET_TOKENS)], block_identifier)
+    tokens = list(decode_single("address[]", bytes(data)))
+
+    calls = [(basket, BALANCE + encode_abi(["address"], [t]).hex()) for t in tokens]
+    calls += [(basket, TOTAL_SUPPLY), (basket, OUTSTANDING_FEE), (basket, GET_CAP)]
+    (_, results) = aggregate(calls, block)
+
+    (balances, (total_supply, fee, cap)) = (
+        [decode_single("uint256", bytes(data)) for (_, data) in results[:-3]],
+        [decode_single("uint256", bytes(data)) for (_, data) in results[-3:]],
+    )
+
+    return Basket(tokens, balances, total_supply, fee, cap)
@@ -0,0 +1,88 @@
+"""
+Split-order routing.
+
+A single pool charges the whole price impact of a large trade. Splitting it
+across routes (venues and fee tiers) that don't share liquidity does better:
+the amount is cut in `steps` chunks and every chunk goes, greedily, to the
+route whose marginal price is the best given what it already got. AMM price
+functions are concave, so this is optimal up to the chunk size.
+
+Opening a route costs the gas of one more Swap entry: `costs` maps routes
+to that cost in the unit of the WETH side, and a route is only opened when
+its marginal gain covers it.
+
+Everything runs on a Market (local math), a split is a few hundred quotes
+per token and cheap enough to recompute every block.
+"""
+
+from scripts.constants import MAX_UINT256, ROUTES
+
+SPLIT_STEPS = 20
+
+
+def _chunks(amount, steps):
+    size = amount // steps
+    if size == 0:
+        return [amount]
+    return [size] * (steps - 1) + [amount - size * (steps - 1)]
+
+
+def _split(market, token_in, token_out, amount, given_out, routes, steps, costs):
+    if amount == 0:
+        return []
+    if not routes:
+        raise ValueError(f"no route between {token_in} and {token_out}")
+
+    costs = costs or {}
+    allocated = {r: 0 for r in routes}
+    quoted = {r: 0 for r in routes}
+    memo = {}
+
+    def quote(route, x):
+        if (route, x) not in memo:
+            memo[(route, x)] = market.quote(route, token_in, token_out, x, given_out)
+        return memo[(route, x)]
+
+    def opening(route):
+        return 0 if allocated[route] else costs.get(route, 0)
+
+    for chunk in _chunks(amount, steps):
+        candidates = {r: quote(r, allocated[r] + chunk) for r in routes}
+
+        if given_out:
+            # cheapest extra WETH in for the chunk
+            best = min(routes, key=lambda r: candidates[r] - quoted[r] + opening(r))
+            if candidates[best] == MAX_UINT256:
+                raise ValueError(f"no route can fill {amount} of {token_out}")
+        else:
+            # most extra out for the chunk
+            best = max(routes, key=lambda r: candidates[r] - quoted[r] - opening(r))
+            if candidates[best] == 0:
+                raise ValueError(f"no route can take {amount} of {token_in}")
+
+        allocated[best] += chunk
+        quoted[best] = candidates[best]
+
+    return [(r, allocated[r], quoted[r]) for r in routes if allocated[r]]
+
+
+def split_given_in(
+    market, token_in, token_out, amount, routes=ROUTES, steps=SPLIT_STEPS, costs=None
+):
+    """
+    Splits an exact `amount` in to maximize the total out.
+
+    Returns [(route, amount_in, amount_out), ...], empty for a zero amount.
+    """
+    return _split(market, token_in, token_out, amount, False, routes, steps, costs)
+
+
+def split_given_out(
+    market, token_in, token_out, amount, routes=ROUTES, steps=SPLIT_STEPS, costs=None
+):
+    """
+    Splits an exact `amount` out to minimize the total in.
+
+    Returns [(route, amount_out, amount_in), ...], empty for a zero amount.
+    """
+    return _split(market, token_in, token_out, amount, True, routes, steps, costs)
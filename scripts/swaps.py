@@ -0,0 +1,50 @@
+"""
+Encoding of the BasketMigrator.Swap entries passed to execSwaps / bake.
+"""
+
+from eth_abi import encode_single
+
+from scripts.constants import ROUTER_UNIV3
+from scripts.quotes import ROUTERS_UNIV2
+
+
+def encode_swap(venue, fee, token_in, token_out, amount, limit):
+    """
+    Returns the (v3, data) Swap for `amount` of token_in -> token_out on the
+    (venue, fee) route. `amount` and `limit` follow the migrator's meaning:
+    exact in / min out for execSwaps, exact out / max in for bake.
+    """
+    if venue == "univ3":
+        return (
+            True,
+            encode_single(
+                "(address,address,address,uint24,uint256,uint256)",
+                [ROUTER_UNIV3, token_in, token_out, fee, amount, limit],
+            ),
+        )
+
+    return (
+        False,
+        encode_single(
+            "(address,address[],uint256,uint256)",
+            [ROUTERS_UNIV2[venue], [token_in, token_out], amount, limit],
+        ),
+    )
+
+
+def encode_leg(leg, limit):
+    """
+    encode_swap for a scripts.planner.Leg, multi-hop V2 paths included.
+    """
+    if leg.venue == "univ3":
+        return encode_swap(
+            leg.venue, leg.fee, leg.path[0], leg.path[-1], leg.amount, limit
+        )
+
+    return (
+        False,
+        encode_single(
+            "(address,address[],uint256,uint256)",
+            [ROUTERS_UNIV2[leg.venue], leg.path, leg.amount, limit],
+        ),
+    )
@@ -0,0 +1,144 @@
+"""
+Constant product (x * y = k) math of the Uniswap V2 / Sushiswap routers.
+
+Integer-exact ports of UniswapV2Library.getAmountOut / getAmountIn, so a
+reserves snapshot gives the very same amounts the routers' getAmountsOut /
+getAmountsIn would return at that block, without any RPC.
+"""
+
+from scripts.constants import MAX_UINT256
+
+
+def sort_tokens(token_a, token_b):
+    token_a = token_a.lower()
+    token_b = token_b.lower()
+
+    if int(token_a, 16) < int(token_b, 16):
+        return (token_a, token_b)
+    return (token_b, token_a)
+
+
+def get_amount_out(amount_in, reserve_in, reserve_out):
+    """
+    UniswapV2Library.getAmountOut, raises ValueError where the library reverts.
+    """
+    if amount_in <= 0:
+        raise ValueError("INSUFFICIENT_INPUT_AMOUNT")
+    if reserve_in <= 0 or reserve_out <= 0:
+        raise ValueError("INSUFFICIENT_LIQUIDITY")
+
+    amount_in_with_fee = amount_in * 997
+    numerator = amount_in_with_fee * reserve_out
+    denominator = reserve_in * 1000 + amount_in_with_fee
+    return numerator // denominator
+
+
+def get_amount_in(amount_out, reserve_in, reserve_out):
+    """
+    UniswapV2Library.getAmountIn, raises ValueError where the library reverts.
+    """
+    if amount_out <= 0:
+        raise ValueError("INSUFFICIENT_OUTPUT_AMOUNT")
+    if reserve_in <= 0 or reserve_out <= 0 or amount_out >= reserve_out:
+        raise ValueError("INSUFFICIENT_LIQUIDITY")
+
+    numerator = reserve_in * amount_out * 1000
+    denominator = (reserve_out - amount_out) * 997
+    return numerator // denominator + 1
+
+
+def amounts_out(amounts_in, reserve_in, reserve_out):
+    """
+    Vectorized get_amount_out: quotes every amount of `amounts_in` against the
+    same reserves. Amounts the router would reject map to 0.
+    """
+    if reserve_in <= 0 or reserve_out <= 0:
+        return [0] * len(amounts_in)
+
+    reserve_in_scaled = reserve_in * 1000
+    return [
+        (a * 997 * reserve_out) // (reserve_in_scaled + a * 997) if a > 0 else 0
+        for a in amounts_in
+    ]
+
+
+def amounts_in(amounts_out, reserve_in, reserve_out):
+    """
+    Vectorized get_amount_in: amounts the router would reject map to 2**256 - 1.
+    """
+    if reserve_in <= 0 or reserve_out <= 0:
+        return [MAX_UINT256] * len(amounts_out)
+
+    reserve_in_scaled = reserve_in * 1000
+    return [
+        (reserve_in_scaled * a) // ((reserve_out - a) * 997) + 1
+        if 0 < a < reserve_out
+        else MAX_UINT256
+        for a in amounts_out
+    ]
+
+
+class V2Snapshot:
+    """
+    Reserves of a set of pairs at a given block.
+
+    `reserves` maps (venue, token0, token1), tokens lowercase and sorted as in
+    the pair, to (reserve0, reserve1).
+    """
+
+    def __init__(self, block, reserves):
+        self.block = block
+        self.reserves = reserves
+
+    def get_reserves(self, venue, token_in, token_out):
+        """
+        Returns (reserve_in, reserve_out), (0, 0) if the pair doesn't exist.
+        """
+        (token0, token1) = sort_tokens(token_in, token_out)
+        (reserve0, reserve1) = self.reserves.get((venue, token0, token1), (0, 0))
+
+        if token_in.lower() == token0:
+            return (reserve0, reserve1)
+        return (reserve1, reserve0)
+
+    def path_reserves(self, venue, path):
+        return [self.get_reserves(venue, a, b) for (a, b) in zip(path, path[1:])]
+
+    def quote(self, venue, token_in, token_out, amount, given_out=False):
+        """
+        Same result as the router's getAmountsOut / getAmountsIn for a direct
+        path, with the 0 / 2**256 - 1 sentinels of scripts.quotes.
+        """
+        (reserve_in, reserve_out) = self.get_reserves(venue, token_in, token_out)
+
+        try:
+            if given_out:
+                return get_amount_in(amount, reserve_in, reserve_out)
+            return get_amount_out(amount, reserve_in, reserve_out)
+        except ValueError:
+            return MAX_UINT256 if given_out else 0
+
+    def quote_many(self, venue, token_in, token_out, amounts, given_out=False):
+        """
+        Vectorized quote over many candidate `amounts`.
+        """
+        (reserve_in, reserve_out) = self.get_reserves(venue, token_in, token_out)
+
+        if given_out:
+            return amounts_in(amounts, reserve_in, reserve_out)
+        return amounts_out(amounts, reserve_in, reserve_out)
+
+    def quote_path(self, venue, path, amount, given_out=False):
+        """
+        Multi-hop getAmountsOut / getAmountsIn, returns the final amount.
+        """
+        try:
+            if given_out:
+                for (r_in, r_out) in reversed(self.path_reserves(venue, path)):
+                    amount = get_amount_in(amount, r_in, r_out)
+            else:
+                for (r_in, r_out) in self.path_reserves(venue, path):
+                    amount = get_amount_out(amount, r_in, r_out)
+            return amount
+        except ValueError:
+            return MAX_UINT256 if given_out else 0
@@ -0,0 +1,493 @@
+"""
+Offline Uniswap V3 swap simulator.
+
+Integer-exact ports of TickMath, SqrtPriceMath, SwapMath, TickBitmap and the
+swap loop of UniswapV3Pool, so that a pool snapshot (slot0, liquidity and the
+initialized ticks around the current price) answers QuoterV1's
+quoteExactInputSingle / quoteExactOutputSingle without any RPC.
+"""
+
+from scripts.constants import MAX_UINT256
+
+MIN_TICK = -887272
+MAX_TICK = 887272
+MIN_SQRT_RATIO = 4295128739
+MAX_SQRT_RATIO = 1461446703485210103287273052203988822378723970342
+
+Q96 = 2**96
+MAX_UINT160 = 2**160 - 1
+
+# TickMath.getSqrtRatioAtTick magic numbers, bit i of |tick| -> ratio factor
+_TICK_RATIOS = [
+    0xFFF97272373D413259A46990580E213A,
+    0xFFF2E50F5F656932EF12357CF3C7FDCC,
+    0xFFE5CACA7E10E4E61C3624EAA0941CD0,
+    0xFFCB9843D60F6159C9DB58835C926644,
+    0xFF973B41FA98C081472E6896DFB254C0,
+    0xFF2EA16466C96A3843EC78B326B52861,
+    0xFE5DEE046A99A2A811C461F1969C3053,
+    0xFCBE86C7900A88AEDCFFC83B479AA3A4,
+    0xF987A7253AC413176F2B074CF7815E54,
+    0xF3392B0822B70005940C7A398E4B70F3,
+    0xE7159475A2C29B7443B29C7FA6E889D9,
+    0xD097F3BDFD2022B8845AD8F792AA5825,
+    0xA9F746462D870FDF8A65DC1F90E061E5,
+    0x70D869A156D2A1B890BB3DF62BAF32F7,
+    0x31BE135F97D08FD981231505542FCFA6,
+    0x9AA508B5B7A84E1C677DE54F3E99BC9,
+    0x5D6AF8DEDB81196699C329225EE604,
+    0x2216E584F5FA1EA926041BEDFE98,
+    0x48A170391F7DC42444E8FA2,
+]
+
+
+class SimulationError(Exception):
+    """The pool would revert, or the swap leaves the loaded tick range."""
+
+
+# FullMath
+
+
+def mul_div(a, b, denominator):
+    result = a * b // denominator
+    if result > MAX_UINT256:
+        raise SimulationError("mulDiv overflow")
+    return result
+
+
+def mul_div_rounding_up(a, b, denominator):
+    result = -(-a * b // denominator)
+    if result > MAX_UINT256:
+        raise SimulationError("mulDiv overflow")
+    return result
+
+
+def div_rounding_up(x, y):
+    return -(-x // y)
+
+
+def _to_uint160(x):
+    if x > MAX_UINT160:
+        raise SimulationError("uint160 overflow")
+    return x
+
+
+# TickMath
+
+
+def get_sqrt_ratio_at_tick(tick):
+    abs_tick = abs(tick)
+    if abs_tick > MAX_TICK:
+        raise SimulationError("T")
+
+    if abs_tick & 0x1:
+        ratio = 0xFFFCB933BD6FAD37AA2D162D1A594001
+    else:
+        ratio = 0x100000000000000000000000000000000
+
+    for (i, factor) in enumerate(_TICK_RATIOS):
+        if abs_tick & (0x2 << i):
+            ratio = (ratio * factor) >> 128
+
+    if tick > 0:
+        ratio = MAX_UINT256 // ratio
+
+    return (ratio >> 32) + (0 if ratio % (1 << 32) == 0 else 1)
+
+
+def get_tick_at_sqrt_ratio(sqrt_price_x96):
+    """
+    Greatest tick whose sqrt ratio is <= sqrt_price_x96, which is the
+    definition TickMath.getTickAtSqrtRatio implements.
+    """
+    if not MIN_SQRT_RATIO <= sqrt_price_x96 < MAX_SQRT_RATIO:
+        raise SimulationError("R")
+
+    (low, high) = (MIN_TICK, MAX_TICK)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if get_sqrt_ratio_at_tick(mid) <= sqrt_price_x96:
+            low = mid
+        else:
+            high = mid - 1
+
+    return low
+
+
+# SqrtPriceMath
+
+
+def get_next_sqrt_price_from_amount0_rounding_up(sqrt_p, liquidity, amount, add):
+    if amount == 0:
+        return sqrt_p
+
+    numerator1 = liquidity << 96
+    product = amount * sqrt_p
+
+    if add:
+        if product <= MAX_UINT256:
+            denominator = numerator1 + product
+            if denominator <= MAX_UINT256:
+                return mul_div_rounding_up(numerator1, sqrt_p, denominator)
+
+        return div_rounding_up(numerator1, numerator1 // sqrt_p + amount)
+
+    if product > MAX_UINT256 or numerator1 <= product:
+        raise SimulationError("amount0 out of range")
+
+    denominator = numerator1 - product
+    return _to_uint160(mul_div_rounding_up(numerator1, sqrt_p, denominator))
+
+
+def get_next_sqrt_price_from_amount1_rounding_down(sqrt_p, liquidity, amount, add):
+    if add:
+        if amount <= MAX_UINT160:
+            quotient = (amount << 96) // liquidity
+        else:
+            quotient = mul_div(amount, Q96, liquidity)
+
+        return _to_uint160(sqrt_p + quotient)
+
+    if amount <= MAX_UINT160:
+        quotient = div_rounding_up(amount << 96, liquidity)
+    else:
+        quotient = mul_div_rounding_up(amount, Q96, liquidity)
+
+    if sqrt_p <= quotient:
+        raise SimulationError("amount1 out of range")
+
+    return sqrt_p - quotient
+
+
+def get_next_sqrt_price_from_input(sqrt_p, liquidity, amount_in, zero_for_one):
+    if zero_for_one:
+        return get_next_sqrt_price_from_amount0_rounding_up(
+            sqrt_p, liquidity, amount_in, True
+        )
+    return get_next_sqrt_price_from_amount1_rounding_down(
+        sqrt_p, liquidity, amount_in, True
+    )
+
+
+def get_next_sqrt_price_from_output(sqrt_p, liquidity, amount_out, zero_for_one):
+    if zero_for_one:
+        return get_next_sqrt_price_from_amount1_rounding_down(
+            sqrt_p, liquidity, amount_out, False
+        )
+    return get_next_sqrt_price_from_amount0_rounding_up(
+        sqrt_p, liquidity, amount_out, False
+    )
+
+
+def get_amount0_delta(sqrt_a, sqrt_b, liquidity, round_up):
+    if sqrt_a > sqrt_b:
+        (sqrt_a, sqrt_b) = (sqrt_b, sqrt_a)
+
+    numerator1 = liquidity << 96
+    numerator2 = sqrt_b - sqrt_a
+
+    if round_up:
+        return div_rounding_up(
+            mul_div_rounding_up(numerator1, numerator2, sqrt_b), sqrt_a
+        )
+    return mul_div(numerator1, numerator2, sqrt_b) // sqrt_a
+
+
+def get_amount1_delta(sqrt_a, sqrt_b, liquidity, round_up):
+    if sqrt_a > sqrt_b:
+        (sqrt_a, sqrt_b) = (sqrt_b, sqrt_a)
+
+    if round_up:
+        return mul_div_rounding_up(liquidity, sqrt_b - sqrt_a, Q96)
+    return mul_div(liquidity, sqrt_b - sqrt_a, Q96)
+
+
+# SwapMath
+
+
+def compute_swap_step(sqrt_current, sqrt_target, liquidity, amount_remaining, fee):
+    """
+    Returns (sqrt_next, amount_in, amount_out, fee_amount).
+    """
+    zero_for_one = sqrt_current >= sqrt_target
+    exact_in = amount_remaining >= 0
+
+    if exact_in:
+        remaining_less_fee = mul_div(amount_remaining, 10**6 - fee, 10**6)
+        if zero_for_one:
+            amount_in = get_amount0_delta(sqrt_target, sqrt_current, liquidity, True)
+        else:
+            amount_in = get_amount1_delta(sqrt_current, sqrt_target, liquidity, True)
+
+        if remaining_less_fee >= amount_in:
+            sqrt_next = sqrt_target
+        else:
+            sqrt_next = get_next_sqrt_price_from_input(
+                sqrt_current, liquidity, remaining_less_fee, zero_for_one
+            )
+    else:
+        if zero_for_one:
+            amount_out = get_amount1_delta(sqrt_target, sqrt_current, liquidity, False)
+        else:
+            amount_out = get_amount0_delta(sqrt_current, sqrt_target, liquidity, False)
+
+        if -amount_remaining >= amount_out:
+            sqrt_next = sqrt_target
+        else:
+            sqrt_next = get_next_sqrt_price_from_output(
+                sqrt_current, liquidity, -amount_remaining, zero_for_one
+            )
+
+    reached = sqrt_target == sqrt_next
+
+    if zero_for_one:
+        if not (reached and exact_in):
+            amount_in = get_amount0_delta(sqrt_next, sqrt_current, liquidity, True)
+        if not (reached and not exact_in):
+            amount_out = get_amount1_delta(sqrt_next, sqrt_current, liquidity, False)
+    else:
+        if not (reached and exact_in):
+            amount_in = get_amount1_delta(sqrt_current, sqrt_next, liquidity, True)
+        if not (reached and not exact_in):
+            amount_out = get_amount0_delta(sqrt_current, sqrt_next, liquidity, False)
+
+    if not exact_in and amount_out > -amount_remaining:
+        amount_out = -amount_remaining
+
+    if exact_in and sqrt_next != sqrt_target:
+        fee_amount = amount_remaining - amount_in
+    else:
+        fee_amount = mul_div_rounding_up(amount_in, fee, 10**6 - fee)
+
+    return (sqrt_next, amount_in, amount_out, fee_amount)
+
+
+# TickBitmap
+
+
+def _msb(x):
+    return x.bit_length() - 1
+
+
+def _lsb(x):
+    return (x & -x).bit_length() - 1
+
+
+class V3Pool:
+    """
+    In-memory state of a Uniswap V3 pool.
+
+    `bitmap` holds the tickBitmap words from `min_word` to `max_word` and
+    `ticks` the liquidityNet of every initialized tick in those words.
+    """
+
+    def __init__(
+        self,
+        token0,
+        token1,
+        fee,
+        tick_spacing,
+        sqrt_price_x96,
+        tick,
+        liquidity,
+        bitmap,
+        ticks,
+        min_word,
+        max_word,
+    ):
+        self.token0 = token0.lower()
+        self.token1 = token1.lower()
+        self.fee = fee
+        self.tick_spacing = tick_spacing
+        self.sqrt_price_x96 = sqrt_price_x96
+        self.tick = tick
+        self.liquidity = liquidity
+        self.bitmap = bitmap
+        self.ticks = ticks
+        self.min_word = min_word
+        self.max_word = max_word
+
+    def _word(self, word_pos):
+        if not self.min_word <= word_pos <= self.max_word:
+            raise SimulationError("tick range not loaded")
+        return self.bitmap.get(word_pos, 0)
+
+    def next_initialized_tick_within_one_word(self, tick, lte):
+        compressed = tick // self.tick_spacing
+
+        if lte:
+            (word_pos, bit_pos) = (compressed >> 8, compressed & 0xFF)
+            mask = (1 << bit_pos) - 1 + (1 << bit_pos)
+            masked = self._word(word_pos) & mask
+
+            if masked:
+                next_compressed = compressed - (bit_pos - _msb(masked))
+            else:
+                next_compressed = compressed - bit_pos
+
+            return (next_compressed * self.tick_spacing, masked != 0)
+
+        (word_pos, bit_pos) = ((compressed + 1) >> 8, (compressed + 1) & 0xFF)
+        mask = MAX_UINT256 ^ ((1 << bit_pos) - 1)
+        masked = self._word(word_pos) & mask
+
+        if masked:
+            next_compressed = compressed + 1 + (_lsb(masked) - bit_pos)
+        else:
+            next_compressed = compressed + 1 + (255 - bit_pos)
+
+        return (next_compressed * self.tick_spacing, masked != 0)
+
+    def swap(self, zero_for_one, amount_specified, sqrt_price_limit_x96):
+        """
+        UniswapV3Pool.swap without side effects, returns (amount0, amount1)
+        from the pool's point of view.
+        """
+        if amount_specified == 0:
+            raise SimulationError("AS")
+
+        if zero_for_one:
+            if not MIN_SQRT_RATIO < sqrt_price_limit_x96 < self.sqrt_price_x96:
+                raise SimulationError("SPL")
+        elif not self.sqrt_price_x96 < sqrt_price_limit_x96 < MAX_SQRT_RATIO:
+            raise SimulationError("SPL")
+
+        exact_input = amount_specified > 0
+        remaining = amount_specified
+        calculated = 0
+        sqrt_price = self.sqrt_price_x96
+        tick = self.tick
+        liquidity = self.liquidity
+
+        while remaining != 0 and sqrt_price != sqrt_price_limit_x96:
+            sqrt_start = sqrt_price
+            (tick_next, initialized) = self.next_initialized_tick_within_one_word(
+                tick, zero_for_one
+            )
+            tick_next = min(max(tick_next, MIN_TICK), MAX_TICK)
+            sqrt_next = get_sqrt_ratio_at_tick(tick_next)
+
+            if (zero_for_one and sqrt_next < sqrt_price_limit_x96) or (
+                not zero_for_one and sqrt_next > sqrt_price_limit_x96
+            ):
+                sqrt_target = sqrt_price_limit_x96
+            else:
+                sqrt_target = sqrt_next
+
+            (sqrt_price, amount_in, amount_out, fee_amount) = compute_swap_step(
+                sqrt_price, sqrt_target, liquidity, remaining, self.fee
+            )
+
+            if exact_input:
+                remaining -= amount_in + fee_amount
+                calculated -= amount_out
+            else:
+                remaining += amount_out
+                calculated += amount_in + fee_amount
+
+            if sqrt_price == sqrt_next:
+                if initialized:
+                    liquidity_net = self.ticks.get(tick_next, 0)
+                    if zero_for_one:
+                        liquidity_net = -liquidity_net
+                    liquidity += liquidity_net
+                    if liquidity < 0:
+                        raise SimulationError("LS")
+
+                tick = tick_next - 1 if zero_for_one else tick_next
+            elif sqrt_price != sqrt_start:
+                tick = get_tick_at_sqrt_ratio(sqrt_price)
+
+        if zero_for_one == exact_input:
+            return (amount_specified - remaining, calculated)
+        return (calculated, amount_specified - remaining)
+
+    def quote_exact_input(self, token_in, amount_in):
+        """
+        QuoterV1.quoteExactInputSingle with no price limit.
+        """
+        zero_for_one = token_in.lower() == self.token0
+        limit = MIN_SQRT_RATIO + 1 if zero_for_one else MAX_SQRT_RATIO - 1
+
+        (amount0, amount1) = self.swap(zero_for_one, amount_in, limit)
+        return -amount1 if zero_for_one else -amount0
+
+    def quote_exact_output(self, token_in, amount_out):
+        """
+        QuoterV1.quoteExactOutputSingle with no price limit, which reverts if
+        the pool can't deliver the whole `amount_out`.
+        """
+        zero_for_one = token_in.lower() == self.token0
+        limit = MIN_SQRT_RATIO + 1 if zero_for_one else MAX_SQRT_RATIO - 1
+
+        (amount0, amount1) = self.swap(zero_for_one, -amount_out, limit)
+        if zero_for_one:
+            (amount_in, received) = (amount0, -amount1)
+        else:
+            (amount_in, received) = (amount1, -amount0)
+
+        if received != amount_out:
+            raise SimulationError("partial fill")
+        return amount_in
+
+    def to_dict(self):
+        return {
+            "token0": self.token0,
+            "token1": self.token1,
+            "fee": self.fee,
+            "tick_spacing": self.tick_spacing,
+            "sqrt_price_x96": str(self.sqrt_price_x96),
+            "tick": self.tick,
+            "liquidity": str(self.liquidity),
+            "bitmap": {str(k): str(v) for (k, v) in self.bitmap.items()},
+            "ticks": {str(k): str(v) for (k, v) in self.ticks.items()},
+            "min_word": self.min_word,
+            "max_word": self.max_word,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            d["token0"],
+            d["token1"],
+            d["fee"],
+            d["tick_spacing"],
+            int(d["sqrt_price_x96"]),
+            d["tick"],
+            int(d["liquidity"]),
+            {int(k): int(v) for (k, v) in d["bitmap"].items()},
+            {int(k): int(v) for (k, v) in d["ticks"].items()},
+            d["min_word"],
+            d["max_word"],
+        )
+
+
+class V3Snapshot:
+    """
+    Pools at a given block, keyed by (token0, token1, fee) as in the factory.
+    """
+
+    def __init__(self, block, pools):
+        self.block = block
+        self.pools = pools
+
+    def get_pool(self, token_in, token_out, fee):
+        (a, b) = (token_in.lower(), token_out.lower())
+        key = (a, b, fee) if int(a, 16) < int(b, 16) else (b, a, fee)
+        return self.pools.get(key)
+
+    def quote(self, token_in, token_out, amount, given_out=False, fee=3000):
+        """
+        Same result as the quoter, with the 0 / 2**256 - 1 sentinels. A swap
+        running past the loaded ticks is reported as failed too.
+        """
+        pool = self.get_pool(token_in, token_out, fee)
+
+        try:
+            if pool is None:
+                raise SimulationError("no pool")
+            if given_out:
+                return pool.quote_exact_output(token_in, amount)
+            return pool.quote_exact_input(token_in, amount)
+        except SimulationError:
+            return MAX_UINT256 if given_out else 0
@@ -0,0 +1,302 @@
+"""
+Fork setup shared by the e2e tests.
+
+Contract handles are session fixtures. The DEFI++ reconfiguration and the
+deployments are module fixtures, as every module starts from a reset fork
+(`module_setup`, so the modules can be spread over xdist workers), and every
+test reverts to the chain snapshot taken before it (`isolation`), so a test
+only pays for its own transactions. Beside the fresh `migrator`, lifecycle
+states are reusable fixtures, each on its own BasketMigrator:
+
+- `burned`: entry closed, BDI burned and unwrapped (state 1)
+- `swapped`: `burned` once the BDI assets are sold for WETH by execSwaps
+
+Tests must not take snapshots of their own, chain.undo() reverts a
+transaction without dropping the test's snapshot.
+"""
+import pytest
+
+from brownie import chain, interface
+from brownie_tokens import MintableForkToken
+from eth_abi import encode_single
+
+from scripts.constants import DEV_SAFE_ADDRESS, DPP_ADDR, HALF_HOUR, WETH
+from scripts.contracts import load_contract
+from scripts.quotes import quote_univ2, quote_univ3
+
+ENTERED = 2000e18
+
+
+@pytest.fixture(scope="module", autouse=True)
+def module_setup(module_isolation):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+@pytest.fixture(scope="session")
+def BDI():
+    yield MintableForkToken("0x0309c98B1bffA350bcb3F9fB9780970CA32a5060")
+
+
+@pytest.fixture(scope="session")
+def DPP():
+    yield MintableForkToken(DPP_ADDR)
+
+
+@pytest.fixture(scope="session")
+def DPL():
+    yield MintableForkToken("0x78f225869c08d478c34e5f645d07a87d3fe8eb78")
+
+
+@pytest.fixture(scope="session")
+def DPS():
+    yield MintableForkToken("0xad6a626ae2b43dcb1b39430ce496d2fa0365ba9c")
+
+
+@pytest.fixture(scope="session")
+def bdi_assets():
+    yield [
+        "0x0bc529c00C6401aEF6D220BE8C6Ea1667F6Ad93e",
+        "0xc00e94cb662c3520282e6f5717214004a7f26888",
+        "0xC011a73ee8576Fb46F5E1c5751cA3B9Fe0af2a6F",
+        "0x9f8F72aA9304c8B593d555F12eF6589cC3A579A2",
+        "0x408e41876cCCDC0F92210600ef50372656052a38",
+        "0xdeFA4e8a7bcBA345F687a2f1456F5Edd9CE97202",
+        "0xBBbbCA6A901c926F240b89EacB641d8Aec7AEafD",
+        "0xba100000625a3754423978a60c9317c58a424e3D",
+        "0x1f9840a85d5aF5bf1D1762F925BDADdC4201F984",
+        "0x7Fc66500c84A76Ad7e9c93437bFc5Ac33E2DDaE9",
+        "0x6B3595068778DD592e39A122f4f5a5cF09C90fE2",
+        "0x2ba592F78dB6436527729929AAf6c908497cB200",
+        "0x514910771AF9Ca656af840dff83E8264EcF986CA",
+        "0x9d409a0A012CFbA9B15F6D4B36Ac57A46966Ab9a",
+        "0xE41d2489571d322189246DaFA5ebDe1F4699F498",
+    ]
+
+
+@pytest.fixture(scope="session")
+def dpp_proxy():
+    yield interface.IProxy(DPP_ADDR)
+
+
+@pytest.fixture(scope="session")
+def dpp_balancer_pool():
+    yield load_contract(DPP_ADDR)
+
+
+@pytest.fixture(scope="session")
+def dpp_caller_facet():
+    yield interface.ICallFacet(DPP_ADDR)
+
+
+@pytest.fixture(scope="session")
+def dpp_basket_facet():
+    yield interface.IBasketFacet(DPP_ADDR)
+
+
+@pytest.fixture(scope="session")
+def dpl_basket_facet():
+    yield interface.IBasketFacet("0x78f225869c08d478c34e5f645d07a87d3fe8eb78")
+
+
+@pytest.fixture(scope="session")
+def dps_basket_facet():
+    yield interface.IBasketFacet("0xad6a626ae2b43dcb1b39430ce496d2fa0365ba9c")
+
+
+@pytest.fixture(scope="session")
+def weth_token():
+    yield interface.ERC20(WETH)
+
+
+@pytest.fixture(scope="session")
+def router_sushi():
+    yield load_contract("0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F")
+
+
+@pytest.fixture(scope="session")
+def router_univ2():
+    yield load_contract("0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D")
+
+
+@pytest.fixture(scope="session")
+def router_univ3():
+    yield load_contract("0xE592427A0AEce92De3Edee1F18E0157C05861564")
+
+
+@pytest.fixture(scope="session")
+def quoter_univ3():
+    yield load_contract("0xb27308f9F90D607463bb33eA1BeBb41C27CE5AB6")
+
+
+@pytest.fixture(scope="session")
+def factory_univ3():
+    yield load_contract("0x1F98431c8aD98523631AE4a59f267346ea31F984")
+
+
+@pytest.fixture(scope="session")
+def experinator():
+    yield load_contract("0xd6a2AAeb7ee0243D7d3148cCDB10C0BD1bb56336")
+
+
+@pytest.fixture(scope="session")
+def gov(accounts):
+    yield accounts[0]
+
+
+@pytest.fixture(scope="session")
+def misc_accounts(accounts):
+    yield accounts[2:8]
+
+
+@pytest.fixture(scope="module")
+def dpp_migrated(
+    dpp_proxy,
+    dpp_balancer_pool,
+    dpp_caller_facet,
+    dpp_basket_facet,
+    dpl_basket_facet,
+    dps_basket_facet,
+    experinator,
+):
+    """
+    DEFI++ converted to an ExperiPie holding the DPS tokens, unlocked.
+    """
+    dpp_proxy.setProxyOwner(experinator, {"from": DEV_SAFE_ADDRESS})
+
+    dpp_balancer_pool.setController(
+        experinator, {"from": dpp_balancer_pool.getController()}
+    )
+
+    experinator.toExperiPie(
+        dpp_caller_facet, DEV_SAFE_ADDRESS, {"from": experinator.owner()}
+    )
+
+    # exit pools
+    exit_pool_data_dpl = dpl_basket_facet.exitPool.encode_input(
+        dpl_basket_facet.balanceOf(dpp_proxy)
+    )
+
+    dpp_caller_facet.callNoValue(
+        [dpl_basket_facet], [exit_pool_data_dpl], {"from": DEV_SAFE_ADDRESS}
+    )
+
+    # exit pools
+    exit_pool_data_dps = dps_basket_facet.exitPool.encode_input(
+        dps_basket_facet.balanceOf(dpp_proxy)
+    )
+    dpp_caller_facet.callNoValue(
+        [dps_basket_facet], [exit_pool_data_dps], {"from": DEV_SAFE_ADDRESS}
+    )
+
+    # remove dpl, dps, adds only tokens from dps (should be enough for an e2e test)
+
+    dpp_basket_facet.removeToken(dpl_basket_facet, {"from": DEV_SAFE_ADDRESS})
+    dpp_basket_facet.removeToken(dps_basket_facet, {"from": DEV_SAFE_ADDRESS})
+
+    for token in [
+        "0xBBbbCA6A901c926F240b89EacB641d8Aec7AEafD",
+        "0x408e41876cCCDC0F92210600ef50372656052a38",
+        "0x04Fa0d235C4abf4BcF4787aF4CF447DE572eF828",
+        "0xba100000625a3754423978a60c9317c58a424e3D",
+        "0xec67005c4E498Ec7f55E092bd1d35cbC47C91892",
+        "0x89Ab32156e46F46D02ade3FEcbe5Fc4243B9AAeD",
+    ]:
+        dpp_basket_facet.addToken(token, {"from": DEV_SAFE_ADDRESS})
+
+    dpp_basket_facet.setLock(chain.height, {"from": DEV_SAFE_ADDRESS})
+    dpp_basket_facet.setCap(100000000e18, {"from": DEV_SAFE_ADDRESS})
+
+    yield dpp_basket_facet
+
+
+@pytest.fixture(scope="module")
+def migrator(gov, BasketMigrator, dpp_migrated):
+    yield gov.deploy(BasketMigrator, gov)
+
+
+def _burned(BDI, gov, alice, BasketMigrator):
+    migrator = gov.deploy(BasketMigrator, gov)
+
+    BDI._mint_for_testing(alice, ENTERED)
+    BDI.approve(migrator, ENTERED, {"from": alice})
+    migrator.enter(ENTERED, {"from": alice})
+
+    migrator.closeEntry({"from": gov})
+    migrator.burnAndUnwrap({"from": gov})
+
+    return migrator
+
+
+@pytest.fixture(scope="module")
+def burned(BDI, gov, misc_accounts, BasketMigrator, dpp_migrated):
+    yield _burned(BDI, gov, misc_accounts[0], BasketMigrator)
+
+
+def _best_sell(t, bal, router_univ2, router_sushi, router_univ3, quoter, factory):
+    univ2_out = quote_univ2(router_univ2, t, WETH, bal)
+    sushi_out = quote_univ2(router_sushi, t, WETH, bal)
+    univ3_out = quote_univ3(factory, quoter, t, WETH, bal)
+
+    if univ2_out >= sushi_out and univ2_out >= univ3_out:
+        return (
+            False,
+            encode_single(
+                "(address,address[],uint256,uint256)",
+                [router_univ2.address, [t, WETH], bal, univ2_out],
+            ),
+        )
+    if sushi_out >= univ2_out and sushi_out >= univ3_out:
+        return (
+            False,
+            encode_single(
+                "(address,address[],uint256,uint256)",
+                [router_sushi.address, [t, WETH], bal, sushi_out],
+            ),
+        )
+    return (
+        True,
+        encode_single(
+            "(address,address,address,uint24,uint256,uint256)",
+            [router_univ3.address, t, WETH, 3000, bal, univ3_out],
+        ),
+    )
+
+
+@pytest.fixture(scope="module")
+def swapped(
+    gov,
+    BDI,
+    misc_accounts,
+    BasketMigrator,
+    dpp_migrated,
+    bdi_assets,
+    router_univ2,
+    router_sushi,
+    router_univ3,
+    quoter_univ3,
+    factory_univ3,
+):
+    # its own migrator, so `burned` stays as is
+    migrator = _burned(BDI, gov, misc_accounts[0], BasketMigrator)
+
+    # exec bdi swaps to eth
+    swaps = [
+        _best_sell(
+            t,
+            interface.ERC20(t).balanceOf(migrator),
+            router_univ2,
+            router_sushi,
+            router_univ3,
+            quoter_univ3,
+            factory_univ3,
+        )
+        for t in bdi_assets
+    ]
+    migrator.execSwaps(swaps, chain.time() + HALF_HOUR, {"from": gov})
+
+    yield migrator
@@ -0,0 +1,110 @@
+import pytest
+
+from brownie import interface
+
+from scripts.bake_solver import tokens_for_amount
+from scripts.constants import (
+    BDI_ASSETS,
+    DPP_ADDR,
+    QUOTER_UNIV3,
+    ROUTER_SUSHI,
+    ROUTER_UNIV2,
+    WETH,
+)
+from scripts.snapshots import (
+    fetch_basket,
+    fetch_univ2_snapshot,
+    fetch_univ3_snapshot,
+    weth_pairs,
+)
+
+
+@pytest.fixture(scope="module")
+def univ2_snapshot():
+    yield fetch_univ2_snapshot(weth_pairs(BDI_ASSETS))
+
+
+@pytest.fixture(scope="module")
+def univ3_snapshot():
+    yield fetch_univ3_snapshot(weth_pairs(BDI_ASSETS))
+
+
+@pytest.mark.parametrize(
+    "venue,router", [("univ2", ROUTER_UNIV2), ("sushi", ROUTER_SUSHI)]
+)
+def test_univ2_snapshot_matches_router(univ2_snapshot, venue, router):
+    router = interface.IUniswapV2Router01(router)
+    amounts = [10**15, 10**17, 10**19, 10**21]
+
+    for t in BDI_ASSETS:
+        (reserve_in, _) = univ2_snapshot.get_reserves(venue, t, WETH)
+        if reserve_in == 0:
+            continue
+
+        for amt in amounts:
+            expected = router.getAmountsOut(
+                amt, [t, WETH], block_identifier=univ2_snapshot.block
+            )[1]
+
+            assert univ2_snapshot.quote(venue, t, WETH, amt) == expected
+
+            quote_in = univ2_snapshot.quote(venue, WETH, t, amt, given_out=True)
+            try:
+                expected = router.getAmountsIn(
+                    amt, [WETH, t], block_identifier=univ2_snapshot.block
+                )[0]
+            except:
+                expected = 2**256 - 1
+
+            assert quote_in == expected
+
+
+def test_univ3_snapshot_matches_quoter(univ3_snapshot):
+    quoter = interface.IQuoter(QUOTER_UNIV3)
+    amounts = [10**15, 10**17, 10**19, 10**21]
+
+    for t in BDI_ASSETS:
+        if univ3_snapshot.get_pool(t, WETH, 3000) is None:
+            continue
+
+        for amt in amounts:
+            for (token_in, token_out) in ((t, WETH), (WETH, t)):
+                try:
+                    expected = quoter.quoteExactInputSingle.call(
+                        token_in,
+                        token_out,
+                        3000,
+                        amt,
+                        0,
+                        block_identifier=univ3_snapshot.block,
+                    )
+                except:
+                    expected = 0
+
+                assert univ3_snapshot.quote(token_in, token_out, amt) == expected
+
+                try:
+                    expected = quoter.quoteExactOutputSingle.call(
+                        token_in,
+                        token_out,
+                        3000,
+                        amt,
+                        0,
+                        block_identifier=univ3_snapshot.block,
+                    )
+                except:
+                    expected = 2**256 - 1
+
+                quote = univ3_snapshot.quote(token_in, token_out, amt, given_out=True)
+                assert quote == expected
+
+
+def test_local_calc_tokens_for_amount():
+    basket = fetch_basket(DPP_ADDR)
+    dpp = interface.IBasketFacet(DPP_ADDR)
+
+    for amount in (1, 10**18, 2000 * 10**18, 123456789 * 10**12):
+        (tokens, amounts) = dpp.calcTokensForAmount(amount)
+
+        assert list(tokens) == basket.tokens
+        assert list(amounts) == tokens_for_amount(basket, amount)
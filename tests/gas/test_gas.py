@@ -0,0 +1,242 @@
+"""
+Gas benchmarks of the BasketMigrator entry points, on a mainnet fork of the
+baseline's block (see README.md):
+
+    $ brownie test tests/gas --network mainnet-fork-archive
+
+Each benchmark fails when it regresses beyond the threshold of
+tests/gas/baseline.json or has no baseline, the whole run is reported in
+.cache/gas_report.json (see scripts/gas_report.py). GAS_BASELINE=update
+accepts the run's figures. The suite is skipped while the baseline holds no
+figure at all.
+"""
+
+import os
+
+import pytest
+
+from brownie import chain, interface
+from brownie_tokens import MintableForkToken
+
+from scripts.constants import DPP_ADDR, USDC, WETH
+from scripts.gas_report import GasReport
+from scripts.merkle import ClaimTree, claims_for
+from scripts.packed import pack_legs
+from scripts.planner import Leg
+from scripts.swaps import encode_leg
+
+HALF_HOUR = 1800
+DEV_SAFE_ADDRESS = "0x6458A23B020f489651f2777Bd849ddEd34DfCcd2"
+
+SWAP_COUNTS = [1, 2, 5, 10, 20, 30]
+SWAP_AMOUNT = 10**16
+
+# V2 and V3 swaps, taken in turn
+MIX = [("univ2", 0), ("sushi", 0), ("univ3", 500)]
+
+
+UPDATE = os.environ.get("GAS_BASELINE") == "update"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def module_setup(module_isolation):
+    pass
+
+
+@pytest.fixture(scope="module")
+def gas_report():
+    report = GasReport()
+
+    mismatch = report.check_block(chain.height)
+    if mismatch is not None:
+        pytest.fail(mismatch)
+
+    unmeasured = report.check_measured()
+    if unmeasured is not None and not UPDATE:
+        pytest.skip(unmeasured)
+
+    yield report
+
+    report.save()
+    if UPDATE:
+        report.update_baseline()
+
+
+@pytest.fixture
+def bench(gas_report):
+    def bench(name, tx):
+        regression = gas_report.record(name, tx.gas_used)
+        assert UPDATE or regression is None, regression
+        return tx
+
+    yield bench
+
+
+@pytest.fixture
+def BDI():
+    yield MintableForkToken("0x0309c98B1bffA350bcb3F9fB9780970CA32a5060")
+
+
+@pytest.fixture
+def DPP():
+    yield MintableForkToken(DPP_ADDR)
+
+
+@pytest.fixture
+def gov(accounts):
+    yield accounts[0]
+
+
+@pytest.fixture
+def users(accounts):
+    yield accounts[2:8]
+
+
+@pytest.fixture
+def migrator(gov, BasketMigrator):
+    yield gov.deploy(BasketMigrator, gov)
+
+
+@pytest.fixture
+def entered(BDI, users, migrator):
+    for user in users:
+        BDI._mint_for_testing(user, 1e19)
+        BDI.approve(migrator, 1e19, {"from": user})
+        migrator.enter(1e19, {"from": user})
+
+    yield migrator
+
+
+@pytest.fixture
+def baking(gov, entered):
+    entered.closeEntry({"from": gov})
+    entered.burnAndUnwrap({"from": gov})
+
+    yield entered
+
+
+@pytest.fixture
+def settled(DPP, gov, baking):
+    DPP._mint_for_testing(baking, 6e19)
+    baking.settle(True, {"from": gov})
+
+    yield baking
+
+
+@pytest.fixture
+def weth_migrator(gov, migrator):
+    gov.transfer(WETH, 1e18)
+    interface.ERC20(WETH).transfer(migrator, 1e18, {"from": gov})
+    migrator.closeEntry({"from": gov})
+
+    # approve every router once, benchmarks then scale with the swaps only
+    migrator.execSwapsPacked(
+        pack_legs([(Leg(v, fee, [WETH, USDC], SWAP_AMOUNT, 0), 0) for (v, fee) in MIX]),
+        chain.time() + HALF_HOUR,
+        {"from": gov},
+    )
+
+    yield migrator
+
+
+def _swaps(n):
+    return [
+        (Leg(venue, fee, [WETH, USDC], SWAP_AMOUNT, 0), 0)
+        for (venue, fee) in (MIX[i % len(MIX)] for i in range(n))
+    ]
+
+
+# deposits
+
+
+def test_enter(BDI, users, migrator, bench):
+    BDI._mint_for_testing(users[0], 2e19)
+    BDI.approve(migrator, 2e19, {"from": users[0]})
+
+    bench("enter", migrator.enter(1e19, {"from": users[0]}))
+    bench("enter_again", migrator.enter(1e19, {"from": users[0]}))
+
+
+def test_close_entry(gov, entered, bench):
+    bench("closeEntry", entered.closeEntry({"from": gov}))
+
+
+def test_burn_and_unwrap(gov, entered, bench):
+    entered.closeEntry({"from": gov})
+
+    bench("burnAndUnwrap", entered.burnAndUnwrap({"from": gov}))
+
+
+# swaps
+
+
+@pytest.mark.parametrize("n", SWAP_COUNTS)
+def test_exec_swaps(gov, weth_migrator, bench, n):
+    deadline = chain.time() + HALF_HOUR
+    swaps = _swaps(n)
+
+    chain.snapshot()
+    bench(
+        f"execSwaps[{n}]",
+        weth_migrator.execSwaps(
+            [encode_leg(leg, limit) for (leg, limit) in swaps], deadline, {"from": gov}
+        ),
+    )
+    chain.revert()
+
+    bench(
+        f"execSwapsPacked[{n}]",
+        weth_migrator.execSwapsPacked(pack_legs(swaps), deadline, {"from": gov}),
+    )
+
+
+# bake
+
+
+@pytest.mark.parametrize("approvals", [True, False])
+def test_bake(gov, baking, bench, approvals):
+    dpp = interface.IBasketFacet(DPP_ADDR)
+    dpp.setLock(chain.height, {"from": DEV_SAFE_ADDRESS})
+    dpp.setCap(100000000e18, {"from": DEV_SAFE_ADDRESS})
+
+    # the underlyings are minted, swaps are benchmarked by execSwaps
+    (tokens, amounts) = dpp.calcTokensForAmount(1e18)
+    for (t, amount) in zip(tokens, amounts):
+        MintableForkToken(t)._mint_for_testing(baking, amount)
+
+    deadline = chain.time() + HALF_HOUR
+    if not approvals:
+        # approved by a first bake, as in a migration baking in several calls
+        baking.bake(1e16, 1, deadline, True, [], {"from": gov})
+
+    name = "bake" if approvals else "bake_approved"
+    bench(name, baking.bake(1e17, 1, deadline, approvals, [], {"from": gov}))
+
+
+# settlement
+
+
+def test_settle(DPP, gov, baking, bench):
+    DPP._mint_for_testing(baking, 6e19)
+
+    bench("settle", baking.settle(False, {"from": gov}))
+    bench("settle_final", baking.settle(True, {"from": gov}))
+
+
+def test_exit(users, settled, bench):
+    bench("exit", settled.exit({"from": users[0]}))
+
+
+def test_exit_for(gov, users, settled, bench):
+    bench(f"exitFor[{len(users)}]", settled.exitFor(users, {"from": gov}))
+
+
+def test_claim(DPP, gov, users, baking, bench):
+    DPP._mint_for_testing(baking, 6e19)
+    baking.settle(False, {"from": gov})
+
+    deposits = {u.address: baking.deposits(u) for u in users}
+    tree = ClaimTree(claims_for(deposits, baking.rate()))
+    baking.settleMerkle(tree.root, {"from": gov})
+
+    bench("claim", baking.claim(*tree.claims[0], tree.proofs()[0], {"from": users[1]}))
@@ -0,0 +1,91 @@
+"""
+BasketMigrator fixtures of the fork tests.
+
+The migrator modules (test_migrator*.py) run on the fork: each starts from
+the fork as launched (brownie's module_isolation), so they can be spread
+over xdist workers (`brownie test -n auto`). Deployments and mints are module
+fixtures, each test reverts to the chain snapshot taken before it. Tests undo
+transactions with chain.undo(), their own snapshot would replace the test's.
+
+The other unit modules are pure Python and don't touch the chain.
+"""
+
+import pytest
+
+from brownie_tokens import MintableForkToken
+
+# BDI minted to each depositor, once per module
+FUNDS = 1e20
+
+
+# modules of the fork tests, by name
+FORK_MODULES = "test_migrator"
+
+
+def _on_fork(request):
+    return request.module.__name__.rpartition(".")[2].startswith(FORK_MODULES)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def module_setup(request):
+    if _on_fork(request):
+        request.getfixturevalue("module_isolation")
+
+
+@pytest.fixture(autouse=True)
+def isolation(request):
+    if _on_fork(request):
+        request.getfixturevalue("fn_isolation")
+
+
+@pytest.fixture(scope="module")
+def BDI():
+    yield MintableForkToken("0x0309c98B1bffA350bcb3F9fB9780970CA32a5060")
+
+
+@pytest.fixture(scope="module")
+def DPP():
+    yield MintableForkToken("0x8D1ce361eb68e9E05573443C407D4A3Bed23B033")
+
+
+@pytest.fixture(scope="module")
+def gov(accounts):
+    yield accounts[0]
+
+
+@pytest.fixture(scope="module")
+def misc_accounts(BDI, accounts):
+    # the first three are funded with BDI
+    for user in accounts[2:5]:
+        BDI._mint_for_testing(user, FUNDS)
+
+    yield accounts[2:8]
+
+
+def _deploy(BDI, gov, misc_accounts, BasketMigrator):
+    migrator = gov.deploy(BasketMigrator, gov)
+    for user in misc_accounts[:3]:
+        BDI.approve(migrator, FUNDS, {"from": user})
+
+    return migrator
+
+
+@pytest.fixture(scope="module")
+def migrator(BDI, gov, misc_accounts, BasketMigrator):
+    yield _deploy(BDI, gov, misc_accounts, BasketMigrator)
+
+
+@pytest.fixture(scope="module")
+def burned(BDI, gov, misc_accounts, BasketMigrator):
+    """
+    State 1 with the BDI of alice (1e19) and bob (3e19) burned and unwrapped.
+    """
+    migrator = _deploy(BDI, gov, misc_accounts, BasketMigrator)
+    (alice, bob) = misc_accounts[:2]
+
+    migrator.enter(1e19, {"from": alice})
+    migrator.enter(3e19, {"from": bob})
+    migrator.closeEntry({"from": gov})
+    migrator.burnAndUnwrap({"from": gov})
+
+    yield migrator
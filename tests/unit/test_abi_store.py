@@ -0,0 +1,41 @@
+from scripts.abi_store import ABI_STORE, AbiStore
+from scripts.constants import QUOTER_UNIV3, ROUTER_SUSHI, ROUTER_UNIV2, ROUTER_UNIV3
+
+ADDRESS = "0x00000000000000000000000000000000000000AA"
+ABI = [{"type": "function", "name": "owner", "inputs": [], "outputs": []}]
+
+
+def _functions(address):
+    (_, abi) = ABI_STORE.get(address)
+    return {e["name"] for e in abi if e["type"] == "function"}
+
+
+def test_put_then_get(tmp_path):
+    store = AbiStore(str(tmp_path))
+
+    assert store.get(ADDRESS) is None
+
+    store.put(ADDRESS, "Owned", ABI)
+    assert store.get(ADDRESS.lower()) == ("Owned", ABI)
+    assert store.addresses() == [ADDRESS.lower()]
+
+
+def test_other_versions_are_misses(tmp_path):
+    store = AbiStore(str(tmp_path))
+    store.put(ADDRESS, "Owned", ABI)
+
+    with open(store._file(ADDRESS)) as f:
+        content = f.read()
+    with open(store._file(ADDRESS), "w") as f:
+        f.write(content.replace('"version": 1', '"version": 2'))
+
+    assert store.get(ADDRESS) is None
+
+
+def test_vendored_abis_cover_the_scripts():
+    assert {"getAmountsOut", "getAmountsIn"} <= _functions(ROUTER_UNIV2)
+    assert {"getAmountsOut", "getAmountsIn"} <= _functions(ROUTER_SUSHI)
+    assert {"exactInputSingle", "exactOutputSingle"} <= _functions(ROUTER_UNIV3)
+    assert {"quoteExactInputSingle", "quoteExactOutputSingle"} <= _functions(
+        QUOTER_UNIV3
+    )
@@ -0,0 +1,33 @@
+from scripts.approvals import needs_basket_approvals, required_approvals
+from scripts.constants import DAI, DPP_ADDR, ROUTER_SUSHI, ROUTER_UNIV3, USDC, WETH
+from scripts.planner import Leg
+
+
+def test_required_approvals():
+    legs = [
+        Leg("sushi", 0, [WETH, USDC], 1, 1),
+        Leg("sushi", 0, [WETH, DAI, USDC], 1, 1),
+        Leg("univ3", 500, [WETH, USDC], 1, 1),
+        Leg("univ3", 3000, [DAI, WETH], 1, 1),
+    ]
+
+    assert required_approvals(legs) == sorted(
+        [
+            (WETH.lower(), ROUTER_SUSHI.lower()),
+            (WETH.lower(), ROUTER_UNIV3.lower()),
+            (DAI.lower(), ROUTER_UNIV3.lower()),
+        ]
+    )
+
+    pairs = required_approvals(legs[:1], [USDC, DAI])
+    assert (USDC.lower(), DPP_ADDR.lower()) in pairs
+    assert len(pairs) == 3
+
+
+def test_needs_basket_approvals():
+    router = (WETH.lower(), ROUTER_SUSHI.lower())
+    basket = (USDC.lower(), DPP_ADDR.lower())
+
+    assert needs_basket_approvals([router, basket])
+    assert not needs_basket_approvals([router])
+    assert not needs_basket_approvals([])
@@ -0,0 +1,211 @@
+import time
+import socket
+import asyncio
+
+import pytest
+from aiohttp import ClientError, web
+from eth_abi import decode_abi, encode_single
+
+from scripts.async_quotes import (
+    AsyncQuoteEngine,
+    GET_AMOUNTS_IN,
+    GET_AMOUNTS_OUT,
+    GET_POOL,
+    QUOTE_EXACT_INPUT_SINGLE,
+    QUOTE_EXACT_OUTPUT_SINGLE,
+)
+from scripts.pool_index import PoolIndex
+from scripts.quotes import Quote
+
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+NO_POOL = "0x0000000000000000000000000000000000000bad"
+TOKENS = ["0x" + f"{i:040x}" for i in range(1, 11)]
+
+# stand-in JSON-RPC node: deterministic answers behind an artificial latency
+
+
+def _answer(data):
+    selector = data[:4]
+    args = data[4:]
+
+    if selector == GET_AMOUNTS_OUT:
+        (amount, path) = decode_abi(["uint256", "address[]"], args)
+        return encode_single("uint256[]", [amount, amount * 2])
+    if selector == GET_AMOUNTS_IN:
+        (amount, path) = decode_abi(["uint256", "address[]"], args)
+        return encode_single("uint256[]", [amount * 3, amount])
+    if selector == GET_POOL:
+        tokens = decode_abi(["address", "address", "uint24"], args)[:2]
+        pool = "0x" + ("00" if NO_POOL in tokens else "11") * 20
+        return encode_single("address", pool)
+
+    types = ["address", "address", "uint24", "uint256", "uint160"]
+    (_, _, _, amount, _) = decode_abi(types, args)
+    if selector == QUOTE_EXACT_INPUT_SINGLE:
+        return encode_single("uint256", amount * 5)
+    if selector == QUOTE_EXACT_OUTPUT_SINGLE:
+        return encode_single("uint256", amount * 7)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class StandInNode:
+    def __init__(self, latency=0.05, failures=0):
+        self.latency = latency
+        self.failures = failures
+        self.requests = 0
+        self.pool_requests = 0
+        self.in_flight = 0
+        self.peak = 0
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+
+    async def handle(self, request):
+        body = await request.json()
+        self.requests += 1
+
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+        if self.failures:
+            self.failures -= 1
+            return web.Response(status=502)
+
+        if body["method"] == "eth_blockNumber":
+            result = hex(14_000_000)
+        else:
+            data = bytes.fromhex(body["params"][0]["data"][2:])
+            self.pool_requests += data[:4] == GET_POOL
+            result = "0x" + _answer(data).hex()
+
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": result})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", self.port).start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+def _quotes():
+    return [
+        Quote(v, t, WETH, 10**18, given_out)
+        for t in TOKENS + [NO_POOL]
+        for v in ("univ2", "sushi", "univ3")
+        for given_out in (False, True)
+    ]
+
+
+def _expected(q):
+    if q.venue == "univ3":
+        if q.token_in == NO_POOL:
+            return 2**256 - 1 if q.given_out else 0
+        return q.amount * (7 if q.given_out else 5)
+    return q.amount * (3 if q.given_out else 2)
+
+
+def _run(nodes, quotes, pool_index=None, block=None, **kwargs):
+    async def run():
+        servers = [StandInNode(**n) for n in nodes]
+        for s in servers:
+            await s.__aenter__()
+        try:
+            urls = [s.url for s in servers]
+            index = pool_index or PoolIndex()
+            async with AsyncQuoteEngine(urls, pool_index=index, **kwargs) as engine:
+                start = time.perf_counter()
+                result = await engine.quote_all(quotes, block)
+                return (result, time.perf_counter() - start, servers)
+        finally:
+            for s in servers:
+                await s.__aexit__()
+
+    return asyncio.run(run())
+
+
+def test_quotes_match_sentinels():
+    quotes = _quotes()
+    ((block, amounts), _, _) = _run([{}], quotes)
+
+    assert block == 14_000_000
+    assert amounts == [_expected(q) for q in quotes]
+
+
+def test_concurrency_is_bounded():
+    quotes = _quotes()
+
+    (_, _, (serial,)) = _run([{}], quotes, concurrency=1)
+    (_, _, (concurrent,)) = _run([{}], quotes, concurrency=8)
+
+    assert serial.peak == 1
+    assert 1 < concurrent.peak <= 8
+
+
+def test_concurrency_speedup():
+    # univ2 quotes at a given block: one request per quote, nothing else
+    quotes = [q for q in _quotes() if q.venue != "univ3"]
+    node = {"latency": 0.02}
+
+    (serial, serial_time, _) = _run([node], quotes, block=14_000_000, concurrency=1)
+    (concurrent, concurrent_time, _) = _run(
+        [node], quotes, block=14_000_000, concurrency=8
+    )
+
+    assert serial == concurrent
+    # 44 round trips one at a time, then 6 rounds of 8
+    assert serial_time >= len(quotes) * 0.02
+    assert serial_time / concurrent_time > 4
+
+
+def test_pools_are_resolved_once():
+    quotes = _quotes()
+    index = PoolIndex()
+
+    (_, _, (node,)) = _run([{}], quotes, pool_index=index)
+    # one getPool per token, NO_POOL included
+    assert node.pool_requests == len(TOKENS) + 1
+
+    ((_, amounts), _, (node,)) = _run([{}], quotes, pool_index=index)
+    assert node.pool_requests == 0
+    assert amounts == [_expected(q) for q in quotes]
+
+
+def test_retries_after_failures():
+    quotes = _quotes()[:6]
+    ((_, amounts), _, _) = _run([{"failures": 2}], quotes, retries=3, backoff=0)
+
+    assert amounts == [_expected(q) for q in quotes]
+
+
+def test_node_failures_are_not_sentinels():
+    # univ2 quotes at a given block: only the quotes themselves are sent
+    quotes = _quotes()[:2]
+
+    # an unreachable node raises instead of reporting empty pools
+    with pytest.raises(ClientError):
+        _run([{"failures": 100}], quotes, block=14_000_000, retries=1, backoff=0)
+
+
+def test_hedged_requests_beat_slow_endpoint():
+    quotes = _quotes()[:6]
+
+    ((_, amounts), elapsed, (slow, fast)) = _run(
+        [{"latency": 2.0}, {"latency": 0.01}], quotes, hedge_delay=0.05
+    )
+
+    assert amounts == [_expected(q) for q in quotes]
+    assert elapsed < 1.0
+    assert fast.requests > 0
@@ -0,0 +1,96 @@
+import pytest
+
+from scripts.bake_solver import Basket, plan_bake, solve_bake, tokens_for_amount
+from scripts.market import Market
+from scripts.paths import PathFinder
+from scripts.slippage import SlippageModel
+from scripts.univ2_math import V2Snapshot, sort_tokens
+from scripts.univ3_math import V3Snapshot
+
+WETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+YFI = "0x0bc529c00c6401aef6d220be8c6ea1667f6ad93e"
+UNI = "0x1f9840a85d5af5bf1d1762f925bdaddc4201f984"
+
+# 1 DEFI++ = 0.001 YFI + 1 UNI, about 0.02 WETH
+BASKET = Basket([YFI, UNI], [10**18, 1000 * 10**18], 1000 * 10**18, 0, 10**30)
+
+
+def _market():
+    reserves = {}
+    for (token, r_token, r_weth) in (
+        (YFI, 100 * 10**18, 1000 * 10**18),
+        (UNI, 100_000 * 10**18, 1000 * 10**18),
+    ):
+        (token0, token1) = sort_tokens(token, WETH)
+        pair = (r_token, r_weth) if token0 == token else (r_weth, r_token)
+        reserves[("univ2", token0, token1)] = pair
+
+    market = Market(V2Snapshot(1, reserves), V3Snapshot(1, {}))
+    return (market, PathFinder(market, []))
+
+
+def test_tokens_for_amount():
+    assert tokens_for_amount(BASKET, 10**18) == [10**15 + 1, 10**18 + 1]
+
+    with_fee = BASKET._replace(outstanding_fee=1000 * 10**18)
+    assert tokens_for_amount(with_fee, 10**18) == [5 * 10**14 + 1, 5 * 10**17 + 1]
+
+
+def test_plan_covers_every_token():
+    (market, finder) = _market()
+
+    plan = plan_bake(BASKET, market, finder, 10**18)
+
+    assert {leg.path[-1] for leg in plan.legs} == {YFI, UNI}
+    assert plan.max_amount_in == sum(plan.limits) + 1
+    assert plan.limits == SlippageModel().limits(market, plan.legs, given_out=True)
+    assert all(limit > leg.quoted for (leg, limit) in zip(plan.legs, plan.limits))
+
+
+def test_solver_finds_the_largest_affordable_bake():
+    (market, finder) = _market()
+    budget = 50 * 10**18
+    precision = 10**12
+
+    plan = solve_bake(BASKET, market, finder, budget, precision=precision)
+
+    assert plan.max_amount_in <= budget
+    over = plan_bake(BASKET, market, finder, plan.amount_out + precision)
+    assert over.max_amount_in > budget
+
+    # price impact: 50 WETH mints less than 50 / 0.02
+    assert 2000 * 10**18 < plan.amount_out < 2500 * 10**18
+
+
+def test_solver_respects_the_cap():
+    (market, finder) = _market()
+    capped = BASKET._replace(cap=BASKET.total_supply + 100 * 10**18)
+
+    assert (
+        solve_bake(capped, market, finder, 50 * 10**18).amount_out == 100 * 10**18
+    )
+    assert solve_bake(BASKET, market, finder, 0).amount_out == 0
+
+    # the fee joinPool mints first takes part of the room
+    fee = 10 * 10**18
+    with_fee = capped._replace(outstanding_fee=fee)
+    plan = solve_bake(with_fee, market, finder, 50 * 10**18)
+    assert plan.amount_out == 100 * 10**18 - fee
+    assert with_fee.total_supply + fee + plan.amount_out <= with_fee.cap
+
+
+def test_unroutable_underlyings_are_all_named():
+    (market, finder) = _market()
+    (zrx, bal) = (
+        "0xe41d2489571d322189246dafa5ebde1f4699f498",
+        "0xba100000625a3754423978a60c9317c58a424e3d",
+    )
+    basket = BASKET._replace(tokens=[YFI, zrx, UNI, bal], balances=BASKET.balances * 2)
+
+    with pytest.raises(ValueError) as e:
+        plan_bake(basket, market, finder, 10**18)
+    assert zrx in str(e.value) and bal in str(e.value)
+
+    # not an empty bake: the solver reports them too
+    with pytest.raises(ValueError, match=zrx):
+        solve_bake(basket, market, finder, 50 * 10**18)
@@ -0,0 +1,70 @@
+import pytest
+
+from scripts.chunks import chunk_bake, chunk_exec_swaps, chunk_exit_for, pack
+from scripts.gas_model import DEFAULT_GAS, GasModel
+from scripts.planner import Leg
+
+WETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+TOKENS = ["0x" + f"{i:040x}" for i in range(1, 16)]
+
+
+def _swaps(venue="univ2", given_out=False):
+    return [
+        (
+            Leg(venue, 0, [WETH, t] if given_out else [t, WETH], 10**18, 10**18),
+            10**18,
+        )
+        for t in TOKENS
+    ]
+
+
+def test_pack_fills_first_fit_decreasing():
+    chunks = pack([5, 4, 3, 3, 2, 1], lambda x: x, 10, base=2)
+
+    assert chunks == [[5, 3], [4, 3, 1], [2]]
+    assert all(2 + sum(c) <= 10 for c in chunks)
+
+
+def test_pack_refuses_oversized_items():
+    with pytest.raises(ValueError):
+        pack([9], lambda x: x, 10, base=2)
+
+
+def test_exec_swaps_chunks_stay_under_budget():
+    model = GasModel()
+    budget = DEFAULT_GAS["exec_base"] + 4 * DEFAULT_GAS["v2_in"]
+
+    chunks = chunk_exec_swaps(_swaps(), model, budget)
+
+    assert len(chunks) == 4
+    assert sorted(s for c in chunks for s in c) == sorted(_swaps())
+    assert chunk_exec_swaps(_swaps(), model) == [_swaps()]
+
+
+def test_bake_keeps_what_fits_next_to_join_pool():
+    model = GasModel()
+    swaps = _swaps("univ3", given_out=True)
+
+    (chunks, final) = chunk_bake(swaps, len(TOKENS), model)
+    assert (chunks, final) == ([], swaps)
+
+    budget = model.bake_gas(len(TOKENS)) + 2 * DEFAULT_GAS["v3_out"]
+    (chunks, final) = chunk_bake(swaps, len(TOKENS), model, budget)
+
+    assert len(final) == 2
+    assert sum(map(len, chunks)) + len(final) == len(swaps)
+    assert all(
+        DEFAULT_GAS["exec_base"] + len(c) * DEFAULT_GAS["v3_out"] <= budget
+        for c in chunks
+    )
+
+
+def test_exit_for_chunks_keep_users_in_order():
+    model = GasModel()
+    budget = model.exit_gas(4)
+
+    chunks = chunk_exit_for(TOKENS, model, budget)
+
+    assert [len(c) for c in chunks] == [4, 4, 4, 3]
+    assert sum(chunks, []) == TOKENS
+    assert all(model.exit_gas(len(c)) <= budget for c in chunks)
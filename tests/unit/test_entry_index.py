@@ -0,0 +1,128 @@
+import pytest
+from requests.exceptions import HTTPError, ReadTimeout
+
+from scripts.entry_index import (
+    ENTRY_TOPIC,
+    EntryIndex,
+    decode_entry,
+    iter_entries,
+    reconcile,
+)
+
+MIGRATOR = "0x" + "ab" * 20
+USERS = ["0x" + f"{i:040x}" for i in range(1, 6)]
+
+
+def _log(block, index, who, amount):
+    return {
+        "blockNumber": block,
+        "logIndex": index,
+        "topics": [ENTRY_TOPIC, "0x" + "00" * 12 + who[2:]],
+        "data": "0x" + f"{amount:064x}",
+    }
+
+
+class Provider:
+    """
+    eth_getLogs over `logs`, refusing ranges wider than `max_range` blocks.
+    """
+
+    def __init__(self, logs, max_range, error=None):
+        self.logs = logs
+        self.max_range = max_range
+        self.error = error or ValueError(
+            {"code": -32005, "message": "query limit exceeded"}
+        )
+        self.calls = []
+
+    def get_logs(self, params):
+        (start, end) = (params["fromBlock"], params["toBlock"])
+        self.calls.append((start, end))
+
+        if end - start + 1 > self.max_range:
+            raise self.error
+
+        return [
+            log
+            for log in self.logs
+            if start <= log["blockNumber"] <= end and params["topics"] == [ENTRY_TOPIC]
+        ]
+
+
+LOGS = [
+    _log(10, 0, USERS[0], 5),
+    _log(10, 1, USERS[1], 7),
+    _log(450, 3, USERS[0], 1),
+    _log(999, 0, USERS[2], 2),
+]
+
+
+def test_decode_entry():
+    assert decode_entry(LOGS[1]) == (10, USERS[1], 7)
+
+    # web3 gives HexBytes topics
+    raw = {**LOGS[1], "topics": [bytes(32), bytes(12) + b"\x02" * 20]}
+    assert decode_entry(raw).who == "0x" + "02" * 20
+
+
+def test_ranges_shrink_on_provider_limits():
+    provider = Provider(LOGS, max_range=300)
+    entries = list(iter_entries(provider.get_logs, MIGRATOR, 0, 999, chunk=1000))
+
+    assert [e.block for e in entries] == [10, 10, 450, 999]
+
+    # halved until accepted, and not grown back to a refused width
+    widths = [end - start + 1 for (start, end) in provider.calls]
+    assert widths == [1000, 500, 250, 250, 250, 250]
+
+    with pytest.raises(ValueError):
+        list(iter_entries(Provider(LOGS, max_range=0).get_logs, MIGRATOR, 0, 10))
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        ReadTimeout("read timed out"),
+        HTTPError("413 Client Error: Request Entity Too Large"),
+        HTTPError("503 Server Error: Service Unavailable"),
+        TimeoutError(),
+    ],
+)
+def test_ranges_shrink_on_provider_failures(error):
+    provider = Provider(LOGS, max_range=300, error=error)
+    entries = list(iter_entries(provider.get_logs, MIGRATOR, 0, 999, chunk=1000))
+
+    assert [e.block for e in entries] == [10, 10, 450, 999]
+    assert [end - start + 1 for (start, end) in provider.calls][:3] == [1000, 500, 250]
+
+    with pytest.raises(type(error)):
+        list(iter_entries(Provider(LOGS, 0, error).get_logs, MIGRATOR, 0, 10))
+
+
+def test_index_resumes_from_checkpoint(tmp_path):
+    path = str(tmp_path / "entries.json")
+    provider = Provider(LOGS, max_range=10_000)
+
+    index = EntryIndex(MIGRATOR, 5, path).update(provider.get_logs, 500)
+    assert index.totals == {USERS[0]: 6, USERS[1]: 7}
+
+    resumed = EntryIndex(MIGRATOR, 5, path)
+    assert resumed.block == 500
+
+    provider.calls = []
+    resumed.update(provider.get_logs, 1000)
+
+    assert provider.calls[0][0] == 501
+    assert resumed.depositors() == USERS[:3]
+    assert resumed.totals[USERS[2]] == 2
+
+
+def test_reconcile(tmp_path):
+    provider = Provider(LOGS, max_range=10_000)
+    index = EntryIndex(MIGRATOR, 0, str(tmp_path / "e.json"))
+    index.update(provider.get_logs, 1000)
+
+    # USERS[1] exited
+    assert reconcile(index, [6, 0, 2], 15) == []
+    assert reconcile(index, [6, 3, 2], 15) == [(USERS[1], 7, 3)]
+    assert reconcile(index, [6, 7, 2], 16) == [(None, 15, 16)]
@@ -0,0 +1,29 @@
+from scripts.gas_model import DEFAULT_GAS, GasModel, contract_version
+from scripts.planner import Leg
+
+
+def test_swap_gas():
+    model = GasModel()
+
+    assert model.swap_gas("univ3", given_out=True) == DEFAULT_GAS["v3_out"]
+    assert model.swap_gas("sushi") == DEFAULT_GAS["v2_in"]
+    assert model.swap_gas("univ2", 3) == (
+        DEFAULT_GAS["v2_in"] + 2 * DEFAULT_GAS["v2_hop"]
+    )
+    assert model.leg_gas(Leg("univ2", 0, ["a", "b", "c"], 1, 1)) == model.swap_gas(
+        "univ2", 2
+    )
+
+
+def test_models_are_cached_per_version(tmp_path):
+    path = str(tmp_path / "gas.json")
+    v1 = contract_version("0x6080")
+    v2 = contract_version("6081")
+
+    GasModel({**DEFAULT_GAS, "v2_in": 1}, v1).save(path)
+    GasModel({**DEFAULT_GAS, "v2_in": 2}, v2).save(path)
+
+    assert GasModel.load(v1, path).gas["v2_in"] == 1
+    assert GasModel.load(v2, path).gas["v2_in"] == 2
+    assert GasModel.load("unknown", path).gas == DEFAULT_GAS
+    assert GasModel.load(v1, str(tmp_path / "missing.json")).gas == DEFAULT_GAS
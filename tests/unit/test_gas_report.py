@@ -0,0 +1,60 @@
+import json
+
+from scripts.gas_report import GasReport
+
+
+def _baseline(tmp_path, gas, threshold=0.02):
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps({"block": 100, "threshold": threshold, "gas": gas}))
+    return str(path)
+
+
+def test_regressions_beyond_threshold(tmp_path):
+    report = GasReport(_baseline(tmp_path, {"enter": 50_000, "exit": 40_000}))
+
+    assert report.record("enter", 51_000) is None
+    assert "enter" in report.record("enter", 51_001)
+    assert report.record("exit", 30_000) is None
+    assert "no baseline" in report.record("new", 10**6)
+
+    assert report.report() == {
+        "enter": {"gas": 51_001, "baseline": 50_000, "delta": 1_001},
+        "exit": {"gas": 30_000, "baseline": 40_000, "delta": -10_000},
+        "new": {"gas": 10**6, "baseline": None, "delta": None},
+    }
+
+
+def test_report_and_baseline_update(tmp_path):
+    baseline = _baseline(tmp_path, {"enter": 50_000, "settle": 30_000}, 0.05)
+    report = GasReport(baseline)
+    report.record("enter", 49_000)
+
+    report.save(str(tmp_path / "out" / "report.json"))
+    with open(tmp_path / "out" / "report.json") as f:
+        assert json.load(f)["benchmarks"]["enter"]["delta"] == -1_000
+
+    report.update_baseline()
+    updated = GasReport(baseline)
+
+    assert (updated.block, updated.threshold) == (100, 0.05)
+    assert updated.baseline == {"enter": 49_000, "settle": 30_000}
+
+
+def test_missing_baseline(tmp_path):
+    report = GasReport(str(tmp_path / "missing.json"))
+
+    assert "no baseline" in report.record("enter", 10**9)
+
+
+def test_unmeasured_baseline(tmp_path):
+    assert "block 100" in GasReport(_baseline(tmp_path, {})).check_measured()
+    assert GasReport(_baseline(tmp_path, {"enter": 50_000})).check_measured() is None
+
+
+def test_fork_block(tmp_path):
+    report = GasReport(_baseline(tmp_path, {}))
+
+    assert report.check_block(100) is None
+    assert report.check_block(150) is None
+    assert "block 100" in report.check_block(99)
+    assert "block 100" in report.check_block(15_000_000)
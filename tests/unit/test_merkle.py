@@ -0,0 +1,53 @@
+import json
+import time
+
+import pytest
+
+from scripts.merkle import Claim, ClaimTree, claims_for, leaf, verify
+
+ACCOUNTS = ["0x" + f"{i:040x}" for i in range(1, 20_001)]
+
+
+def test_leaf_is_abi_encode_packed():
+    claim = Claim(1, "0x" + "11" * 20, 5)
+
+    # keccak256(abi.encodePacked(uint256(1), address(0x1111..), uint256(5)))
+    assert (
+        leaf(claim).hex()
+        == "eccb0da302bf92508109e1da21770f78e16210fefb06b014f74ea4542ff9ef55"
+    )
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 7, 8, 9])
+def test_every_proof_verifies(n):
+    claims = claims_for({a: 10**18 for a in ACCOUNTS[:n]}, 2 * 10**18)
+    tree = ClaimTree(claims)
+
+    for (claim, proof) in zip(claims, tree.proofs()):
+        assert claim.amount == 2 * 10**18
+        assert verify(proof, tree.root, claim)
+        assert not verify(proof, tree.root, claim._replace(amount=claim.amount + 1))
+
+
+def test_tens_of_thousands_of_claims(tmp_path):
+    deposits = {a: i + 1 for (i, a) in enumerate(ACCOUNTS)}
+
+    start = time.perf_counter()
+    tree = ClaimTree(claims_for(deposits, 10**18))
+    tree.export(str(tmp_path / "claims.json"))
+    assert time.perf_counter() - start < 5
+
+    with open(tmp_path / "claims.json") as f:
+        exported = json.load(f)
+
+    assert exported["merkleRoot"] == "0x" + tree.root.hex()
+    assert exported["total"] == str(sum(deposits.values()))
+
+    entry = exported["claims"][ACCOUNTS[12_345]]
+    claim = Claim(entry["index"], ACCOUNTS[12_345], int(entry["amount"]))
+    assert verify([bytes.fromhex(p[2:]) for p in entry["proof"]], tree.root, claim)
+
+
+def test_no_claims():
+    with pytest.raises(ValueError):
+        ClaimTree([])
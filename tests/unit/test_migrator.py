@@ -1,43 +1,6 @@
-import pytest
 import brownie
 
 from brownie import chain
-from brownie_tokens import MintableForkToken
-
-
-class _MintableTestToken(MintableForkToken):
-    def __init__(self, address):
-        super().__init__(address)
-
-
-@pytest.fixture
-def MintableTestToken():
-    yield _MintableTestToken
-
-
-@pytest.fixture
-def BDI():
-    yield _MintableTestToken("0x0309c98B1bffA350bcb3F9fB9780970CA32a5060")
-
-
-@pytest.fixture
-def DPP():
-    yield _MintableTestToken("0x8D1ce361eb68e9E05573443C407D4A3Bed23B033")
-
-
-@pytest.fixture
-def gov(accounts):
-    yield accounts[0]
-
-
-@pytest.fixture
-def misc_accounts(accounts):
-    yield accounts[2:8]
-
-
-@pytest.fixture
-def migrator(gov, BasketMigrator):
-    yield gov.deploy(BasketMigrator, gov)
 
 
 def test_initial_state(gov, migrator):
@@ -50,11 +13,9 @@ def test_initial_state(gov, migrator):
 # user's interactions
 
 
-def test_enter(BDI, misc_accounts, migrator):
+def test_enter(misc_accounts, migrator):
     alice = misc_accounts[0]
 
-    BDI._mint_for_testing(alice, 1e19)
-    BDI.approve(migrator, 1e19, {"from": alice})
     migrator.enter(1e19, {"from": alice})
 
     assert migrator.state() == 0
@@ -62,12 +23,9 @@ def test_enter(BDI, misc_accounts, migrator):
     assert migrator.totalDeposits() == 1e19
 
 
-def test_enter_twice(BDI, misc_accounts, migrator):
+def test_enter_twice(misc_accounts, migrator):
     alice = misc_accounts[0]
 
-    BDI._mint_for_testing(alice, 1e19)
-    BDI.approve(migrator, 1e19, {"from": alice})
-
     migrator.enter(5e18, {"from": alice})
     migrator.enter(5e18, {"from": alice})
 
@@ -76,24 +34,18 @@ def test_enter_twice(BDI, misc_accounts, migrator):
     assert migrator.totalDeposits() == 1e19
 
 
-def test_cant_exit_if_not_finalized(BDI, misc_accounts, migrator):
+def test_cant_exit_if_not_finalized(misc_accounts, migrator):
     alice = misc_accounts[0]
 
-    BDI._mint_for_testing(alice, 1e19)
-    BDI.approve(migrator, 1e19, {"from": alice})
-
     migrator.enter(5e18, {"from": alice})
 
     with brownie.reverts():
         migrator.exit({"from": alice})
 
 
-def test_cant_exit_if_entry_closed(BDI, gov, misc_accounts, migrator):
+def test_cant_exit_if_entry_closed(gov, misc_accounts, migrator):
     alice = misc_accounts[0]
 
-    BDI._mint_for_testing(alice, 1e19)
-    BDI.approve(migrator, 1e19, {"from": alice})
-
     migrator.enter(5e18, {"from": alice})
 
     migrator.closeEntry({"from": gov})
@@ -102,24 +54,15 @@ def test_cant_exit_if_entry_closed(BDI, gov, misc_accounts, migrator):
         migrator.exit({"from": alice})
 
 
-def test_can_exit_if_settled(BDI, DPP, gov, misc_accounts, migrator):
+def test_can_exit_if_settled(DPP, gov, misc_accounts, burned):
     alice = misc_accounts[0]
 
-    BDI._mint_for_testing(alice, 1e19)
-    BDI.approve(migrator, 1e19, {"from": alice})
-
-    migrator.enter(5e18, {"from": alice})
-
-    migrator.closeEntry({"from": gov})
-
-    migrator.burnAndUnwrap({"from": gov})
+    DPP._mint_for_testing(burned, 4e19)
+    burned.settle(True, {"from": gov})
 
-    DPP._mint_for_testing(migrator, 5e18)
-    migrator.settle(True, {"from": gov})
+    burned.exit({"from": alice})
 
-    migrator.exit({"from": alice})
-
-    assert DPP.balanceOf(alice) == 5e18
+    assert DPP.balanceOf(alice) == 1e19
 
 
 # state changes
@@ -133,10 +76,8 @@ def test_close_entry(gov, migrator):
     assert migrator.state() == 1
 
 
-def test_burn_and_unwrap_doesnt_change_state(BDI, misc_accounts, gov, migrator):
+def test_burn_and_unwrap_doesnt_change_state(misc_accounts, gov, migrator):
     alice = misc_accounts[0]
-    BDI._mint_for_testing(alice, 5e18)
-    BDI.approve(migrator, 5e18, {"from": alice})
 
     migrator.enter(5e18, {"from": alice})
 
@@ -149,63 +90,54 @@ def test_burn_and_unwrap_doesnt_change_state(BDI, misc_accounts, gov, migrator):
     assert migrator.state() == 1
 
 
-def test_settle_not_final_doesnt_change_state(DPP, BDI, misc_accounts, gov, migrator):
-    alice = misc_accounts[0]
-    BDI._mint_for_testing(alice, 5e18)
-    BDI.approve(migrator, 5e18, {"from": alice})
+def test_settle_not_final_doesnt_change_state(DPP, gov, burned):
+    assert burned.state() == 1
 
-    migrator.enter(5e18, {"from": alice})
+    DPP._mint_for_testing(burned, 4e19)
+    burned.settle(False, {"from": gov})
 
-    migrator.closeEntry({"from": gov})
+    assert burned.state() == 1
 
-    migrator.burnAndUnwrap({"from": gov})
 
-    assert migrator.state() == 1
+def test_settle_final_changes_state(DPP, gov, burned):
+    assert burned.state() == 1
 
-    DPP._mint_for_testing(migrator, 5e18)
-    migrator.settle(False, {"from": gov})
+    DPP._mint_for_testing(burned, 4e19)
+    burned.settle(True, {"from": gov})
 
-    assert migrator.state() == 1
+    assert burned.state() == 2
 
 
-def test_settle_final_changes_state(DPP, BDI, misc_accounts, gov, migrator):
-    alice = misc_accounts[0]
-    BDI._mint_for_testing(alice, 5e18)
-    BDI.approve(migrator, 5e18, {"from": alice})
+# rate
 
-    migrator.enter(5e18, {"from": alice})
 
-    migrator.closeEntry({"from": gov})
-    migrator.burnAndUnwrap({"from": gov})
+def test_rate(DPP, gov, burned):
+    DPP._mint_for_testing(burned, 4e19)
+    burned.settle(False, {"from": gov})
 
-    assert migrator.state() == 1
+    assert burned.rate() == 1e18
 
-    DPP._mint_for_testing(migrator, 5e18)
-    migrator.settle(True, {"from": gov})
+    DPP._mint_for_testing(burned, 4e19)
+    burned.settle(True, {"from": gov})
 
-    assert migrator.state() == 2
+    assert burned.rate() == 2e18
 
 
-# rate
+# swaps
 
 
-def test_rate(DPP, BDI, misc_accounts, gov, migrator):
-    alice = misc_accounts[0]
-    BDI._mint_for_testing(alice, 5e18)
-    BDI.approve(migrator, 5e18, {"from": alice})
+def test_exec_swaps_given_out_only_gov_while_baking(gov, misc_accounts, migrator):
+    deadline = chain.time() + 1800
 
-    migrator.enter(5e18, {"from": alice})
+    with brownie.reverts():
+        migrator.execSwapsGivenOut([], deadline, {"from": gov})
 
     migrator.closeEntry({"from": gov})
 
-    migrator.burnAndUnwrap({"from": gov})
-
-    DPP._mint_for_testing(migrator, 5e18)
-    migrator.settle(False, {"from": gov})
-
-    assert migrator.rate() == 1e18
+    with brownie.reverts():
+        migrator.execSwapsGivenOut([], deadline, {"from": misc_accounts[0]})
 
-    DPP._mint_for_testing(migrator, 5e18)
-    migrator.settle(True, {"from": gov})
+    with brownie.reverts():
+        migrator.execSwapsGivenOut([], chain.time() - 1, {"from": gov})
 
-    assert migrator.rate() == 2e18
+    migrator.execSwapsGivenOut([], deadline, {"from": gov})
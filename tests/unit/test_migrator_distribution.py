@@ -0,0 +1,90 @@
+import brownie
+
+from brownie import chain, web3
+
+from scripts.entry_index import EntryIndex, reconcile
+from scripts.merkle import ClaimTree, claims_for
+
+
+# distribution
+
+
+def test_exit_for(DPP, gov, misc_accounts, burned):
+    (alice, bob, carol) = misc_accounts[:3]
+    migrator = burned
+
+    with brownie.reverts():
+        migrator.exitFor([alice, bob], {"from": gov})
+
+    DPP._mint_for_testing(migrator, 8e19)
+    migrator.settle(True, {"from": gov})
+
+    with brownie.reverts():
+        migrator.exitFor([alice, bob], {"from": alice})
+
+    # alice already exited and carol never entered: the batch skips them
+    migrator.exit({"from": alice})
+    tx = migrator.exitFor([alice, bob, carol], {"from": gov})
+
+    assert DPP.balanceOf(alice) == 2e19
+    assert DPP.balanceOf(bob) == 6e19
+    assert migrator.deposits(bob) == 0
+    assert len(tx.events["Exit"]) == 1
+    assert tx.events["Exit"]["who"] == bob
+    assert tx.events["Exit"]["amount"] == 6e19
+
+
+def test_entry_index(misc_accounts, migrator, tmp_path):
+    (alice, bob) = misc_accounts[:2]
+
+    for (user, amount) in ((alice, 1e19), (bob, 3e19), (alice, 2e19)):
+        migrator.enter(amount, {"from": user})
+
+    path = str(tmp_path / "entries.json")
+    index = EntryIndex(migrator.address, migrator.tx.block_number, path)
+    index.update(web3.eth.get_logs, chain.height, chunk=2)
+
+    assert index.depositors() == [alice.address.lower(), bob.address.lower()]
+    assert index.totals[alice.address.lower()] == 3e19
+
+    deposits = [migrator.deposits(u) for u in index.depositors()]
+    assert reconcile(index, deposits, migrator.totalDeposits()) == []
+
+
+def test_merkle_claims(DPP, gov, misc_accounts, burned):
+    (alice, bob, carol) = misc_accounts[:3]
+    migrator = burned
+
+    DPP._mint_for_testing(migrator, 8e19)
+    migrator.settle(False, {"from": gov})
+
+    deposits = {u.address: migrator.deposits(u) for u in (alice, bob)}
+    tree = ClaimTree(claims_for(deposits, migrator.rate()))
+    (alice_proof, bob_proof) = tree.proofs()
+
+    with brownie.reverts():
+        migrator.settleMerkle(tree.root, {"from": alice})
+    with brownie.reverts():
+        migrator.settleMerkle("0x" + "00" * 32, {"from": gov})
+
+    migrator.settleMerkle(tree.root, {"from": gov})
+
+    assert migrator.state() == 2
+    with brownie.reverts():
+        migrator.exit({"from": alice})
+
+    # anyone can claim for bob, once
+    (index, account, amount) = tree.claims[1]
+    with brownie.reverts():
+        migrator.claim(index, account, amount + 1, bob_proof, {"from": carol})
+
+    migrator.claim(index, account, amount, bob_proof, {"from": carol})
+
+    assert DPP.balanceOf(bob) == 6e19
+    assert migrator.isClaimed(1) and not migrator.isClaimed(0)
+    with brownie.reverts():
+        migrator.claim(index, account, amount, bob_proof, {"from": bob})
+
+    migrator.claim(*tree.claims[0], alice_proof, {"from": alice})
+
+    assert DPP.balanceOf(alice) == 2e19
@@ -0,0 +1,88 @@
+import pytest
+import brownie
+
+from brownie import chain
+
+from scripts.constants import DAI, ROUTER_UNIV2, USDC, WETH
+from scripts.packed import pack_leg, pack_legs
+from scripts.planner import Leg
+from scripts.swaps import encode_leg
+
+
+# packed swaps
+
+
+def _calldata_size(tx):
+    return len(bytes.fromhex(tx.input[2:]))
+
+
+@pytest.fixture(scope="module")
+def weth_migrator(gov, migrator):
+    weth = brownie.interface.ERC20(WETH)
+
+    gov.transfer(WETH, 3e18)
+    weth.transfer(migrator, 3e18, {"from": gov})
+    migrator.closeEntry({"from": gov})
+
+    yield migrator
+
+
+def test_packed_swaps_match_abi_swaps(gov, weth_migrator):
+    deadline = chain.time() + 1800
+    usdc = brownie.interface.ERC20(USDC)
+    dai = brownie.interface.ERC20(DAI)
+    swaps = [
+        (Leg("univ2", 0, [WETH, USDC], 10**18, 0), 0),
+        (Leg("univ3", 500, [WETH, USDC], 10**18, 0), 0),
+        (Leg("sushi", 0, [WETH, USDC, DAI], 10**18, 0), 0),
+    ]
+
+    abi = weth_migrator.execSwaps(
+        [encode_leg(leg, limit) for (leg, limit) in swaps], deadline, {"from": gov}
+    )
+    balances = (usdc.balanceOf(weth_migrator), dai.balanceOf(weth_migrator))
+    chain.undo()
+
+    packed = weth_migrator.execSwapsPacked(pack_legs(swaps), deadline, {"from": gov})
+
+    assert (usdc.balanceOf(weth_migrator), dai.balanceOf(weth_migrator)) == balances
+
+    # selector, offset of the swaps and deadline, then the swaps' length and
+    # their bytes padded to a word
+    size = len(pack_legs(swaps))
+    assert _calldata_size(packed) == 4 + 3 * 32 + -(-size // 32) * 32
+    assert _calldata_size(packed) < _calldata_size(abi) // 3
+    assert packed.gas_used < abi.gas_used
+
+
+def test_packed_swaps_revert_on_bad_data(gov, weth_migrator):
+    deadline = chain.time() + 1800
+    swap = pack_leg(Leg("univ2", 0, [WETH, USDC], 10**17, 0), 0)
+
+    with brownie.reverts():
+        weth_migrator.execSwapsPacked(bytes([3]) + swap[1:], deadline, {"from": gov})
+
+    with brownie.reverts():
+        weth_migrator.execSwapsPacked(swap[:-1], deadline, {"from": gov})
+
+    weth_migrator.execSwapsPacked(swap, deadline, {"from": gov})
+
+
+# approvals
+
+
+def test_approvals_are_given_once(gov, weth_migrator):
+    deadline = chain.time() + 1800
+    swap = pack_leg(Leg("univ2", 0, [WETH, USDC], 10**17, 0), 0)
+
+    assert not weth_migrator.approved(WETH, ROUTER_UNIV2)
+
+    first = weth_migrator.execSwapsPacked(swap, deadline, {"from": gov})
+
+    assert weth_migrator.approved(WETH, ROUTER_UNIV2)
+
+    second = weth_migrator.execSwapsPacked(swap, deadline, {"from": gov})
+
+    # no approve, and no allowance read either
+    assert "Approval" not in second.events
+    assert second.gas_used < first.gas_used
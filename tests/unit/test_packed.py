@@ -0,0 +1,47 @@
+import pytest
+
+from scripts.constants import DAI, USDC, WETH
+from scripts.packed import PackedSwap, pack_leg, pack_legs, pack_swap, unpack
+from scripts.planner import Leg
+
+
+def test_layout():
+    v2 = pack_swap("sushi", 0, [WETH, USDC], 10**18, 1)
+    v3 = pack_swap("univ3", 500, [WETH, USDC], 10**18, 1)
+
+    assert len(v2) == 74
+    assert len(v3) == 76
+
+    assert v2[:2] == bytes([1, 2])
+    assert v2[2:22] == bytes.fromhex(WETH[2:])
+    assert v2[-32:-16] == (10**18).to_bytes(16, "big")
+    assert v2[-16:] == (1).to_bytes(16, "big")
+
+    assert v3[0] == 2
+    assert v3[41:44] == (500).to_bytes(3, "big")
+
+
+def test_roundtrip():
+    swaps = [
+        (Leg("univ2", 0, [WETH, USDC, DAI], 10**18, 0), 2),
+        (Leg("univ3", 3000, [WETH, USDC], 5 * 10**6, 0), 10**17),
+    ]
+
+    assert unpack(pack_legs(swaps)) == [
+        PackedSwap("univ2", 0, [t.lower() for t in (WETH, USDC, DAI)], 10**18, 2),
+        PackedSwap("univ3", 3000, [WETH.lower(), USDC.lower()], 5 * 10**6, 10**17),
+    ]
+    assert pack_legs([]) == b""
+
+
+def test_rejects_what_the_contract_cant_decode():
+    with pytest.raises(ValueError):
+        pack_swap("univ2", 0, [WETH, USDC], 2**128, 0)
+    with pytest.raises(ValueError):
+        pack_leg(Leg("univ3", 500, [WETH, USDC, DAI], 1, 0), 0)
+    with pytest.raises(ValueError):
+        pack_swap("univ3", 2**24, [WETH, USDC], 1, 0)
+    with pytest.raises(ValueError):
+        unpack(pack_swap("univ2", 0, [WETH, USDC], 1, 1)[:-1])
+    with pytest.raises(ValueError):
+        unpack(bytes([3]))
@@ -0,0 +1,154 @@
+from scripts.market import Market
+from scripts.paths import PathFinder, connector_pairs
+from scripts.planner import leg_pools, plan_given_in, plan_given_out, plan_tokens
+from scripts.univ2_math import V2Snapshot, sort_tokens
+from scripts.univ3_math import V3Snapshot
+
+TOKEN = "0x0bc529c00c6401aef6d220be8c6ea1667f6ad93e"  # YFI
+WETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+USDC = "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
+DAI = "0x6b175474e89094c44da98b954eedeac495271d0f"
+
+
+def _market(pairs):
+    """
+    Market from {(venue, token_a, token_b): (reserve_a, reserve_b)}.
+    """
+    reserves = {}
+    for ((venue, a, b), (r_a, r_b)) in pairs.items():
+        (token0, token1) = sort_tokens(a, b)
+        reserves[(venue, token0, token1)] = (r_a, r_b) if a == token0 else (r_b, r_a)
+
+    return Market(V2Snapshot(1, reserves), V3Snapshot(1, {}))
+
+
+# thin YFI/WETH pair, deep YFI/USDC and USDC/WETH pairs, at 1 YFI = 10 WETH
+# = 30000 USDC
+MARKET = {
+    ("univ2", TOKEN, WETH): (10 * 10**18, 100 * 10**18),
+    ("univ2", TOKEN, USDC): (1000 * 10**18, 30_000_000 * 10**6),
+    ("univ2", USDC, WETH): (300_000_000 * 10**6, 100_000 * 10**18),
+}
+
+
+def test_connector_pairs():
+    pairs = connector_pairs([TOKEN], WETH, [USDC, DAI])
+
+    assert sort_tokens(TOKEN, WETH) in pairs
+    assert sort_tokens(TOKEN, USDC) in pairs
+    assert sort_tokens(USDC, DAI) in pairs
+    assert sort_tokens(DAI, WETH) in pairs
+    assert len(pairs) == 6
+
+
+def test_paths_only_go_through_connectors():
+    finder = PathFinder(_market(MARKET), [USDC])
+    assert finder.paths("univ2", TOKEN, WETH) == [[TOKEN, USDC, WETH], [TOKEN, WETH]]
+
+    finder = PathFinder(_market(MARKET), [])
+    assert finder.paths("univ2", TOKEN, WETH) == [[TOKEN, WETH]]
+
+
+def test_deep_path_beats_thin_direct_pair():
+    finder = PathFinder(_market(MARKET), [USDC])
+
+    (venue, path, quoted) = finder.best(TOKEN, WETH, 5 * 10**18)
+
+    assert (venue, path) == ("univ2", [TOKEN, USDC, WETH])
+    assert quoted > 40 * 10**18
+
+
+def test_gas_can_keep_trades_direct():
+    finder = PathFinder(_market(MARKET), [USDC])
+    amount = 10**18
+
+    assert finder.best(TOKEN, WETH, amount)[1] == [TOKEN, USDC, WETH]
+
+    # the extra hop costs more than the better price brings
+    direct = finder.market.quote(("univ2", 0), TOKEN, WETH, amount)
+    routed = finder.best(TOKEN, WETH, amount)[2]
+    extra_gas = finder.path_gas("univ2", [0, 0, 0]) - finder.path_gas("univ2", [0, 0])
+    gas_price = (routed - direct) // extra_gas + 1
+
+    assert finder.best(TOKEN, WETH, amount, gas_price=gas_price)[1] == [TOKEN, WETH]
+
+
+def test_planner_uses_path_or_split():
+    market = _market(MARKET)
+    finder = PathFinder(market, [USDC])
+
+    (leg,) = plan_given_in(market, finder, TOKEN, WETH, 5 * 10**18)
+    assert leg.path == [TOKEN, USDC, WETH]
+    assert leg.amount == 5 * 10**18
+
+    (leg,) = plan_given_out(market, finder, WETH, TOKEN, 10**18)
+    assert leg.path == [WETH, USDC, TOKEN]
+
+    assert plan_given_in(market, finder, TOKEN, WETH, 0) == []
+
+
+def test_planner_splits_when_no_connector_helps():
+    pairs = {
+        ("univ2", TOKEN, WETH): (1000 * 10**18, 10_000 * 10**18),
+        ("sushi", TOKEN, WETH): (1000 * 10**18, 10_000 * 10**18),
+    }
+    market = _market(pairs)
+    finder = PathFinder(market, [USDC])
+
+    legs = plan_given_in(market, finder, TOKEN, WETH, 100 * 10**18)
+
+    assert {leg.venue for leg in legs} == {"univ2", "sushi"}
+    assert all(leg.path == [TOKEN, WETH] for leg in legs)
+
+
+def test_planner_skips_dust_and_costly_routes():
+    pairs = {
+        ("univ2", TOKEN, WETH): (1000 * 10**18, 10_000 * 10**18),
+        ("sushi", TOKEN, WETH): (1000 * 10**18, 10_000 * 10**18),
+    }
+    market = _market(pairs)
+    finder = PathFinder(market, [USDC])
+    gas_price = 100 * 10**9
+
+    # ~0.001 WETH out, less than the gas of a swap
+    assert plan_given_in(market, finder, TOKEN, WETH, 10**14, gas_price) == []
+
+    # a second swap isn't worth its gas for a mid-sized trade
+    legs = plan_given_in(market, finder, TOKEN, WETH, 10**18, gas_price)
+    assert len(legs) == 1
+
+
+def test_tokens_dont_share_pools():
+    # USDC sells through USDC/WETH, the pair YFI's best path also goes through
+    market = _market(MARKET)
+    finder = PathFinder(market, [USDC])
+    amounts = {TOKEN: 5 * 10**18, USDC: 1_000_000 * 10**6}
+
+    def sell(t, amount, exclude):
+        return plan_given_in(market, finder, t, WETH, amount, exclude=exclude)
+
+    for order in (amounts, dict(reversed(amounts.items()))):
+        legs = plan_tokens(order, sell)
+
+        # USDC/WETH stays USDC's own, YFI trades on its direct pair
+        assert [leg.path for leg in legs[USDC]] == [[USDC, WETH]]
+        assert [leg.path for leg in legs[TOKEN]] == [[TOKEN, WETH]]
+
+        pools = [set(leg_pools(leg)) for t in legs for leg in legs[t]]
+        assert set.isdisjoint(*pools)
+
+    # alone, YFI would go through USDC/WETH
+    assert sell(TOKEN, 5 * 10**18, frozenset())[0].path == [TOKEN, USDC, WETH]
+
+
+def test_best_all_keeps_paths_apart():
+    market = _market({**MARKET, ("univ2", DAI, USDC): MARKET[("univ2", TOKEN, USDC)]})
+    finder = PathFinder(market, [USDC])
+    trades = [(TOKEN, WETH, 5 * 10**18), (DAI, WETH, 5 * 10**18)]
+
+    assert finder.best(DAI, WETH, 5 * 10**18)[1] == [DAI, USDC, WETH]
+
+    (yfi, dai) = finder.best_all(trades)
+    assert yfi[1] == [TOKEN, USDC, WETH]
+    # the only path of DAI goes through USDC/WETH as well
+    assert dai is None
@@ -0,0 +1,45 @@
+from scripts.pool_index import ZERO_ADDRESS, PoolIndex
+
+FACTORY = "0x1F98431c8aD98523631AE4a59f267346ea31F984"
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+TOKEN = "0x0bc529c00C6401aEF6D220BE8C6Ea1667F6Ad93e"
+POOL = "0x00000000000000000000000000000000000000AA"
+
+
+def test_existing_pools_never_expire():
+    index = PoolIndex()
+    index.put(PoolIndex.key(FACTORY, TOKEN, WETH, 3000), POOL, 100)
+
+    key = PoolIndex.key(FACTORY.lower(), TOKEN.lower(), WETH.lower(), 3000)
+    assert index.get(key) == POOL
+    assert index.get(key, 10**9) == POOL
+    assert index.get(PoolIndex.key(FACTORY, TOKEN, WETH, 500)) is None
+
+
+def test_missing_pools_expire_after_ttl():
+    index = PoolIndex(negative_ttl=10)
+    key = PoolIndex.key(FACTORY, TOKEN, WETH, 100)
+    index.put(key, ZERO_ADDRESS, 100)
+
+    assert index.get(key, 105) == ZERO_ADDRESS
+    assert index.get(key, 111) is None
+    # unknown block or an older one than the check: can't tell
+    assert index.get(key) is None
+    assert index.get(key, 99) is None
+
+    index.put(key, POOL, 120)
+    assert index.get(key, 120) == POOL
+    assert key not in index.missing
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "pools.json")
+    index = PoolIndex(path)
+    index.put(PoolIndex.key(FACTORY, TOKEN, WETH, 3000), POOL, 100)
+    index.put(PoolIndex.key(FACTORY, TOKEN, WETH, 100), ZERO_ADDRESS, 100)
+    index.save()
+
+    loaded = PoolIndex(path)
+    assert loaded.pools == index.pools
+    assert loaded.missing == index.missing
+    assert not loaded.dirty
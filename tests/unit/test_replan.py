@@ -0,0 +1,209 @@
+from scripts.market import Market
+from scripts.planner import Leg
+from scripts.replan import (
+    MAX_AGE,
+    MINT_TOPIC,
+    SWAP_TOPIC,
+    SYNC_TOPIC,
+    Replanner,
+    apply_logs,
+    leg_pools,
+    plan_pools,
+)
+from scripts.univ2_math import V2Snapshot, sort_tokens
+from scripts.univ3_math import V3Pool, V3Snapshot, get_sqrt_ratio_at_tick
+
+WETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+YFI = "0x0bc529c00c6401aef6d220be8c6ea1667f6ad93e"
+UNI = "0x1f9840a85d5af5bf1d1762f925bdaddc4201f984"
+SUSHI = "0x6b3595068778dd592e39a122f4f5a5cf09c90fe2"
+
+YFI_PAIR = "0x" + "01" * 20
+SUSHI_PAIR = "0x" + "02" * 20
+UNI_POOL = "0x" + "03" * 20
+
+YFI_KEY = ("univ2", *sort_tokens(YFI, WETH))
+SUSHI_KEY = ("univ2", *sort_tokens(SUSHI, WETH))
+UNI_KEY = ("univ3", *sort_tokens(UNI, WETH), 3000)
+
+ADDRESSES = {YFI_PAIR: YFI_KEY, SUSHI_PAIR: SUSHI_KEY, UNI_POOL: UNI_KEY}
+
+E18 = 10**18
+
+
+def _market(block=100):
+    pool = V3Pool(
+        *UNI_KEY[1:3], 3000, 60, get_sqrt_ratio_at_tick(0), 0, E18, {}, {}, -1, 0
+    )
+    v2 = V2Snapshot(block, {YFI_KEY: (E18, E18), SUSHI_KEY: (E18, E18)})
+    return Market(v2, V3Snapshot(block, {UNI_KEY[1:]: pool}))
+
+
+def _legs():
+    return {
+        YFI: [Leg("univ2", 0, [YFI, WETH], E18, E18)],
+        SUSHI: [Leg("univ2", 0, [SUSHI, WETH], E18, E18)],
+        UNI: [Leg("univ3", 3000, [UNI, WETH], E18, E18)],
+    }
+
+
+def _word(value):
+    return value.to_bytes(32, "big", signed=True)
+
+
+def _log(block, index, address, topic, *values):
+    return {
+        "blockNumber": block,
+        "logIndex": index,
+        "address": address,
+        "topics": [bytes.fromhex(topic[2:])],
+        "data": b"".join(_word(v) for v in values),
+    }
+
+
+def test_leg_pools():
+    multi_hop = Leg("sushi", 0, [YFI, SUSHI, WETH], E18, E18)
+    assert leg_pools(multi_hop) == [
+        ("sushi", *sort_tokens(YFI, SUSHI)),
+        ("sushi", *sort_tokens(SUSHI, WETH)),
+    ]
+    assert leg_pools(_legs()[UNI][0]) == [UNI_KEY]
+
+    assert plan_pools(_legs())[YFI_KEY] == {YFI}
+
+
+def test_apply_logs():
+    market = _market()
+    logs = [
+        _log(102, 0, YFI_PAIR, SYNC_TOPIC, 3 * E18, 4 * E18),
+        _log(101, 5, YFI_PAIR, SYNC_TOPIC, 2 * E18, 2 * E18),
+        _log(101, 0, UNI_POOL, SWAP_TOPIC, 5, -5, 7 * 2**96, 2 * E18, -60),
+        # not a pool of the plan
+        _log(101, 1, "0x" + "ff" * 20, SYNC_TOPIC, 1, 1),
+    ]
+
+    (traded, stale) = apply_logs(market, logs, ADDRESSES)
+
+    assert (traded, stale) == ({YFI_KEY, UNI_KEY}, set())
+    # the last Sync wins
+    assert market.v2.reserves[YFI_KEY] == (3 * E18, 4 * E18)
+    pool = market.v3.pools[UNI_KEY[1:]]
+    assert (pool.sqrt_price_x96, pool.liquidity, pool.tick) == (
+        7 * 2**96,
+        2 * E18,
+        -60,
+    )
+
+    # out of the loaded ticks, or new liquidity: the pool is read again
+    swap = _log(103, 0, UNI_POOL, SWAP_TOPIC, 5, -5, 2**96, E18, 60 * 256 * 2)
+    assert apply_logs(market, [swap], ADDRESSES)[1] == {UNI_KEY}
+    mint = _log(103, 0, UNI_POOL, MINT_TOPIC, 0, 0, 0, 0, 0)
+    assert apply_logs(market, [mint], ADDRESSES) == ({UNI_KEY}, {UNI_KEY})
+
+
+class Provider:
+    """
+    eth_getLogs over `logs`, by address and block range.
+    """
+
+    def __init__(self, logs):
+        self.logs = logs
+        self.calls = []
+
+    def get_logs(self, params):
+        self.calls.append(params)
+        return [
+            log
+            for log in self.logs
+            if params["fromBlock"] <= log["blockNumber"] <= params["toBlock"]
+            and log["address"] in params["address"]
+        ]
+
+
+def test_refresh_replans_the_traded_tokens(tmp_path):
+    path = tmp_path / "plan.json"
+    amounts = {YFI: E18, SUSHI: E18, UNI: E18}
+    Replanner("test", path).record(_market(), amounts, _legs(), amount_out=42)
+
+    # the plan is read back from disk
+    replanner = Replanner("test", path)
+    assert replanner.plan() == [leg for legs in _legs().values() for leg in legs]
+    assert replanner.meta == {"amount_out": 42}
+
+    provider = Provider(
+        [
+            _log(100, 0, YFI_PAIR, SYNC_TOPIC, 9, 9),
+            _log(105, 0, YFI_PAIR, SYNC_TOPIC, 2 * E18, E18),
+            _log(106, 0, UNI_POOL, MINT_TOPIC, 0, 0, 0, 0, 0),
+        ]
+    )
+    fetched = []
+
+    def fetch_pool(key, block):
+        fetched.append((key, block))
+        return None
+
+    traded = replanner.refresh(
+        provider.get_logs, 110, lambda keys: ADDRESSES, fetch_pool
+    )
+
+    assert traded == {YFI_KEY, UNI_KEY}
+    assert provider.calls[0]["fromBlock"] == 101
+    assert replanner.market.v2.reserves[YFI_KEY] == (2 * E18, E18)
+    assert fetched == [(UNI_KEY[1:], 110)]
+    assert replanner.market.v3.pools == {}
+
+    excluded = {}
+
+    def plan_token(t, amount, exclude):
+        excluded[t] = exclude
+        return [Leg("sushi", 0, [t, WETH], amount, 1)]
+
+    # SUSHI didn't trade but its amount changed
+    amounts = {**amounts, SUSHI: 2 * E18}
+    assert replanner.replan(traded, amounts, plan_token) == [YFI, SUSHI, UNI]
+    # a token only stays off the pools of the others
+    assert ("sushi", *sort_tokens(YFI, WETH)) in excluded[SUSHI]
+    assert ("sushi", *sort_tokens(SUSHI, WETH)) not in excluded[SUSHI]
+
+    replanner = Replanner("test", path)
+    assert replanner.block == 110
+    assert [leg.venue for leg in replanner.plan()] == ["sushi"] * 3
+
+    # nothing traded since: nothing is re-planned
+    assert replanner.refresh(Provider([]).get_logs, 120, lambda k: {}, None) == set()
+    assert replanner.replan(set(), amounts, plan_token) == []
+
+
+def test_refresh_brings_the_whole_market(tmp_path):
+    # the SushiSwap YFI pair isn't in the plan, YFI may move to it
+    sushi_key = ("sushi", *sort_tokens(YFI, WETH))
+    sushi_pair = "0x" + "04" * 20
+    market = _market()
+    market.v2.reserves[sushi_key] = (E18, E18)
+
+    replanner = Replanner("test", tmp_path / "plan.json")
+    replanner.record(market, {YFI: E18}, {YFI: _legs()[YFI]})
+
+    resolved = []
+
+    def resolve(keys):
+        resolved.extend(keys)
+        return {**ADDRESSES, sushi_pair: sushi_key}
+
+    provider = Provider([_log(105, 0, sushi_pair, SYNC_TOPIC, 2 * E18, E18)])
+    traded = replanner.refresh(provider.get_logs, 110, resolve, None)
+
+    assert sushi_key in resolved and UNI_KEY in resolved
+    assert traded == {sushi_key}
+    assert replanner.market.v2.reserves[sushi_key] == (2 * E18, E18)
+
+
+def test_usable(tmp_path):
+    replanner = Replanner("test", tmp_path / "plan.json")
+    assert not replanner.usable(100)
+
+    replanner.record(_market(), {}, {})
+    assert replanner.usable(100 + MAX_AGE)
+    assert not replanner.usable(101 + MAX_AGE)
+    assert not replanner.usable(99)
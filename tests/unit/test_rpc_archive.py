@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from scripts.rpc_archive import (
+    ArchiveMiss,
+    RpcArchive,
+    RpcProxy,
+    request_block,
+    request_key,
+)
+
+TOKEN = "0x0309c98B1bffA350bcb3F9fB9780970CA32a5060"
+BLOCK = "0xe1d480"
+
+STORAGE = ["eth_getStorageAt", [TOKEN, "0x0", BLOCK]]
+CODE = ["eth_getCode", [TOKEN, BLOCK]]
+CALL = ["eth_call", [{"to": TOKEN, "data": "0x18160ddd"}, BLOCK]]
+
+
+class Upstream:
+    """
+    Mainnet stand-in: answers every request with its method, counting them.
+    eth_call reverts.
+    """
+
+    def __init__(self):
+        self.requests = []
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                request = json.loads(self.rfile.read(length))
+                upstream.requests.append(request["method"])
+
+                response = {"jsonrpc": "2.0", "id": request["id"]}
+                if request["method"] == "eth_call":
+                    response["error"] = {"code": 3, "message": "execution reverted"}
+                else:
+                    response["result"] = "0x" + request["method"].encode().hex()
+
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://%s:%d" % self.server.server_address[:2]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def upstream():
+    upstream = Upstream()
+    yield upstream
+    upstream.close()
+
+
+def _post(url, payload):
+    request = urllib.request.Request(
+        url, json.dumps(payload).encode(), {"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request) as resp:
+        return json.loads(resp.read())
+
+
+def _rpc(url, method, params, id=1):
+    return _post(url, {"jsonrpc": "2.0", "id": id, "method": method, "params": params})
+
+
+def test_request_block():
+    assert request_block(*STORAGE) == str(int(BLOCK, 16))
+    assert request_block(*CALL) == str(int(BLOCK, 16))
+    assert request_block("eth_getBalance", [TOKEN, "latest"]) == "latest"
+    assert request_block("eth_getBalance", [TOKEN]) == "none"
+    assert request_block("eth_chainId", []) == "none"
+    assert request_block("eth_call", [{}, {"blockNumber": BLOCK}]) == "14800000"
+
+
+def test_request_key():
+    # ids and dict order don't matter, params do
+    assert request_key("eth_call", [{"to": TOKEN, "data": "0x"}]) == request_key(
+        "eth_call", [{"data": "0x", "to": TOKEN}]
+    )
+    assert request_key(*CODE) != request_key("eth_getCode", [TOKEN, "0x1"])
+
+
+def test_archive(tmp_path):
+    archive = RpcArchive(str(tmp_path))
+
+    with pytest.raises(ArchiveMiss):
+        archive.get(*CODE)
+
+    archive.put(*CODE, {"result": "0x6080"})
+    # same answer, stored once
+    archive.put("eth_getCode", [TOKEN, "0xe1d481"], {"result": "0x6080"})
+    archive.flush()
+
+    blobs = [f for (_, _, files) in os.walk(tmp_path / "blobs") for f in files]
+    assert len(blobs) == 1
+    assert sorted(os.listdir(tmp_path / "blocks")) == ["14800000.json", "14800001.json"]
+
+    # reloaded from disk
+    archive = RpcArchive(str(tmp_path))
+    assert archive.get(*CODE) == {"result": "0x6080"}
+    assert archive.get("eth_getCode", [TOKEN, "0xe1d481"]) == {"result": "0x6080"}
+
+
+def test_record_replay(tmp_path, upstream):
+    recorder = RpcProxy(RpcArchive(str(tmp_path)), upstream.url, port=0).start()
+    try:
+        recorded = [
+            _rpc(recorder.url, *r, id=i) for (i, r) in enumerate([STORAGE, CODE, CALL])
+        ]
+        # archived requests aren't forwarded again, errors are
+        assert _rpc(recorder.url, *CODE, id=1) == recorded[1]
+        assert _rpc(recorder.url, *CALL, id=2) == recorded[2]
+    finally:
+        recorder.close()
+
+    assert upstream.requests == [
+        "eth_getStorageAt",
+        "eth_getCode",
+        "eth_call",
+        "eth_call",
+    ]
+    assert recorded[0]["result"] == "0x" + b"eth_getStorageAt".hex()
+    assert recorded[2]["error"]["message"] == "execution reverted"
+
+    upstream.close()
+    replayer = RpcProxy(RpcArchive(str(tmp_path)), port=0).start()
+    try:
+        # same answers, ids of the new requests
+        for (i, r) in enumerate([STORAGE, CODE]):
+            assert _rpc(replayer.url, *r, id=i) == recorded[i]
+        assert _rpc(replayer.url, *CODE, id=7)["id"] == 7
+
+        # the upstream error wasn't archived
+        assert _rpc(replayer.url, *CALL)["error"]["code"] == -32000
+
+        batch = _post(
+            replayer.url,
+            [
+                {"jsonrpc": "2.0", "id": 1, "method": CODE[0], "params": CODE[1]},
+                {
+                    "jsonrpc": "2.0",
+                    "id": 2,
+                    "method": "eth_getCode",
+                    "params": [TOKEN, "0x1"],
+                },
+            ],
+        )
+        assert batch[0]["result"] == recorded[1]["result"]
+        assert batch[1]["error"]["code"] == -32000
+        assert replayer.misses == 2
+    finally:
+        replayer.close()
@@ -0,0 +1,87 @@
+import json
+
+from scripts.rpc_stats import BUCKETS_MS, RpcStats, describe
+
+QUOTER = "0xb27308f9F90D607463bb33eA1BeBb41C27CE5AB6"
+MULTICALL = "0x5BA1e12693Dc8F9c48aAD8770482f4739bEeD696"
+
+# quoteExactOutputSingle(...) and an unknown selector
+QUOTE = "0x30d07f21" + "00" * 160
+UNKNOWN = "0xdeadbeef"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_describe():
+    assert describe("eth_call", [{"to": QUOTER, "data": QUOTE}, "latest"]) == (
+        QUOTER,
+        "quoteExactOutputSingle",
+    )
+    assert describe("eth_call", [{"to": QUOTER, "data": UNKNOWN}]) == (
+        QUOTER,
+        UNKNOWN,
+    )
+    assert describe("eth_getCode", [QUOTER, "latest"]) == (QUOTER, None)
+    assert describe("eth_blockNumber", []) == (None, None)
+
+
+def test_middleware_attributes_calls_to_stages(tmp_path):
+    clock = Clock()
+    stats = RpcStats(clock)
+
+    def make_request(method, params):
+        clock.now += 0.004 if method == "eth_call" else 0.3
+        return {"result": "0x" + "00" * 32}
+
+    request = stats.middleware(make_request, None)
+
+    with stats.stage("init"):
+        request("eth_getCode", [MULTICALL, "latest"])
+
+    with stats.stage("quoting"):
+        for _ in range(3):
+            request("eth_call", [{"to": QUOTER, "data": QUOTE}, "latest"])
+        clock.now += 1.0  # local math
+
+    groups = stats.groups()
+    quotes = groups[("quoting", "eth_call", "quoteExactOutputSingle")]
+
+    assert quotes["count"] == 3
+    assert abs(quotes["latency"] - 0.012) < 1e-9
+    assert quotes["histogram"][BUCKETS_MS.index(5)] == 3
+    assert quotes["request_bytes"] > 3 * 160
+    init = groups[("init", "eth_getCode", None)]
+    assert init["histogram"][BUCKETS_MS.index(500)] == 1
+    assert abs(stats.stages["quoting"] - 1.012) < 1e-9
+
+    summary = stats.summary()
+    assert "quoteExactOutputSingle" in summary
+    assert "12.0 ms in RPC" in summary
+
+    path = tmp_path / "stats.json"
+    stats.export(str(path))
+    exported = json.loads(path.read_text())
+
+    assert exported["buckets_ms"] == list(BUCKETS_MS)
+    assert {g["stage"] for g in exported["groups"]} == {"init", "quoting"}
+
+
+def test_install_once():
+    class Onion(dict):
+        def add(self, middleware, name):
+            self[name] = middleware
+
+    class W3:
+        middleware_onion = Onion()
+
+    stats = RpcStats()
+    stats.install(W3)
+    stats.install(W3)
+
+    assert list(W3.middleware_onion) == ["rpc_stats"]
@@ -0,0 +1,128 @@
+from collections import namedtuple
+
+from scripts.market import Market
+from scripts.planner import Leg
+from scripts.simulation import (
+    TRANSFER_TOPIC,
+    Transfer,
+    check,
+    decode_transfers,
+    deviation_bps,
+    price_impact_bps,
+    realized_amounts,
+    report,
+    simulate,
+)
+from scripts.univ2_math import V2Snapshot, get_amount_in, get_amount_out, sort_tokens
+from scripts.univ3_math import V3Snapshot
+
+WETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+YFI = "0x0bc529c00c6401aef6d220be8c6ea1667f6ad93e"
+UNI = "0x1f9840a85d5af5bf1d1762f925bdaddc4201f984"
+MIGRATOR = "0x00000000000000000000000000000000000000aa"
+PAIR = "0x00000000000000000000000000000000000000bb"
+BASKET = "0x00000000000000000000000000000000000000cc"
+
+(R_YFI, R_WETH) = (100 * 10**18, 1000 * 10**18)
+
+Receipt = namedtuple("Receipt", ["logs", "gas_used"])
+
+
+def _market():
+    (token0, token1) = sort_tokens(YFI, WETH)
+    pair = (R_YFI, R_WETH) if token0 == YFI else (R_WETH, R_YFI)
+    v2 = V2Snapshot(1, {("univ2", token0, token1): pair})
+    return Market(v2, V3Snapshot(1, {}))
+
+
+def _log(token, src, dst, value):
+    return {
+        "address": token,
+        "topics": [
+            bytes.fromhex(TRANSFER_TOPIC[2:]),
+            bytes(12) + bytes.fromhex(src[2:]),
+            bytes(12) + bytes.fromhex(dst[2:]),
+        ],
+        "data": "0x" + value.to_bytes(32, "big").hex(),
+    }
+
+
+def test_decode_transfers():
+    other = {"address": WETH, "topics": ["0x" + "11" * 32], "data": "0x"}
+
+    assert decode_transfers([_log(WETH, MIGRATOR, PAIR, 5), other]) == [
+        Transfer(WETH, MIGRATOR, PAIR, 5)
+    ]
+
+
+def test_realized_amounts():
+    legs = [
+        Leg("univ2", 0, [YFI, WETH], 10, 0),
+        Leg("sushi", 0, [YFI, UNI, WETH], 20, 0),
+    ]
+    transfers = [
+        Transfer(YFI, MIGRATOR, PAIR, 10),
+        Transfer(WETH, PAIR, MIGRATOR, 100),
+        # the intermediate hop doesn't touch the migrator
+        Transfer(YFI, MIGRATOR, PAIR, 20),
+        Transfer(UNI, PAIR, PAIR, 7),
+        Transfer(WETH, PAIR, MIGRATOR, 190),
+        # bake's joinPool
+        Transfer(UNI, MIGRATOR, BASKET, 3),
+    ]
+
+    assert realized_amounts(legs, transfers, MIGRATOR) == [(10, 100), (20, 190)]
+    assert realized_amounts(legs[:1], [], MIGRATOR) == [(None, None)]
+
+
+def test_deviation():
+    assert deviation_bps(1000, 990) == 100
+    assert deviation_bps(1000, 1010) == -100
+    assert deviation_bps(1000, 1010, given_out=True) == 100
+    assert deviation_bps(1000, None) is None
+
+
+def test_price_impact():
+    market = _market()
+    amount = 10**18
+
+    sold = get_amount_out(amount, R_YFI, R_WETH)
+    leg = Leg("univ2", 0, [YFI, WETH], amount, sold)
+    # 1% of the pool: about 1% of impact
+    assert 95 <= price_impact_bps(market, leg, sold) <= 100
+
+    bought = get_amount_in(amount, R_WETH, R_YFI)
+    leg = Leg("univ2", 0, [WETH, YFI], amount, bought)
+    assert 95 <= price_impact_bps(market, leg, bought, given_out=True) <= 105
+
+    assert price_impact_bps(market, leg._replace(amount=10), bought) is None
+
+
+def test_simulate_and_check():
+    market = _market()
+    amount = 10**18
+    quoted = get_amount_out(amount, R_YFI, R_WETH)
+    swaps = [(Leg("univ2", 0, [YFI, WETH], amount, quoted), quoted)]
+
+    def run(realized):
+        receipt = Receipt(
+            [_log(YFI, MIGRATOR, PAIR, amount), _log(WETH, PAIR, MIGRATOR, realized)],
+            120_000,
+        )
+        return simulate(market, swaps, [receipt], MIGRATOR, leftovers={YFI: 3})
+
+    simulation = run(quoted)
+    assert simulation.legs[0].realized == quoted
+    assert simulation.legs[0].deviation_bps == 0
+    assert simulation.gas == [120_000]
+    assert check(simulation) == []
+    assert "total: 120000 gas" in report(simulation)
+
+    # the pool moved by 1% since the quote
+    simulation = run(quoted * 99 // 100)
+    assert simulation.legs[0].deviation_bps == 100
+    assert len(check(simulation)) == 1
+    assert check(simulation, max_deviation_bps=100) == []
+
+    simulation = simulate(market, swaps, [Receipt([], 21_000)], MIGRATOR)
+    assert "no transfer found" in check(simulation)[0]
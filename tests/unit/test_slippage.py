@@ -0,0 +1,128 @@
+from scripts.market import Market
+from scripts.planner import Leg
+from scripts.slippage import SlippageModel
+from scripts.univ2_math import V2Snapshot, get_amount_in, get_amount_out, sort_tokens
+from scripts.univ3_math import V3Pool, V3Snapshot, get_sqrt_ratio_at_tick
+
+WETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+YFI = "0x0bc529c00c6401aef6d220be8c6ea1667f6ad93e"
+UNI = "0x1f9840a85d5af5bf1d1762f925bdaddc4201f984"
+
+E18 = 10**18
+
+
+def _market(pairs, pools=None):
+    reserves = {}
+    for (venue, a, b, r_a, r_b) in pairs:
+        (token0, token1) = sort_tokens(a, b)
+        reserves[(venue, token0, token1)] = (r_a, r_b) if token0 == a else (r_b, r_a)
+    return Market(V2Snapshot(1, reserves), V3Snapshot(1, pools or {}))
+
+
+def _sell(r_in, r_out, amount=E18, venue="univ2"):
+    return Leg(venue, 0, [YFI, WETH], amount, get_amount_out(amount, r_in, r_out))
+
+
+def _bps(limit, quoted):
+    return abs(limit - quoted) * 10_000 // quoted
+
+
+def test_deeper_pools_get_tighter_bounds():
+    market = _market(
+        [
+            ("univ2", YFI, WETH, 100 * E18, 1000 * E18),
+            ("sushi", YFI, WETH, 1000 * E18, 10_000 * E18),
+        ]
+    )
+    thin = _sell(100 * E18, 1000 * E18)
+    deep = _sell(1000 * E18, 10_000 * E18, venue="sushi")
+
+    (thin_min, deep_min) = SlippageModel().limits(market, [thin, deep])
+
+    assert thin_min < thin.quoted and deep_min < deep.quoted
+    # 10 WETH of adverse flow: about 2% on the thin pool, 0.2% on the deep one
+    assert 195 <= _bps(thin_min, thin.quoted) <= 205
+    assert 18 <= _bps(deep_min, deep.quoted) <= 21
+
+
+def test_given_out_bounds_are_max_in():
+    market = _market([("univ2", WETH, UNI, 1000 * E18, 100_000 * E18)])
+    amount = 1000 * E18
+    leg = Leg(
+        "univ2",
+        0,
+        [WETH, UNI],
+        amount,
+        get_amount_in(amount, 1000 * E18, 100_000 * E18),
+    )
+
+    limit = SlippageModel().limit(market, leg, given_out=True)
+
+    assert limit > leg.quoted
+    # 10 WETH of adverse flow on 1000 WETH of reserve
+    assert 195 <= _bps(limit, leg.quoted) <= 205
+
+
+def test_bounds_are_clamped():
+    market = _market([("univ2", YFI, WETH, 100 * E18, 1000 * E18)])
+    leg = _sell(100 * E18, 1000 * E18)
+
+    assert SlippageModel(flow=0).limit(market, leg) == leg.quoted * 9990 // 10_000
+    assert SlippageModel(flow=100 * E18).limit(market, leg) == (
+        leg.quoted * 9500 // 10_000
+    )
+
+    # no pool: the widest bound
+    missing = leg._replace(venue="sushi")
+    assert SlippageModel().limit(market, missing) == leg.quoted * 9500 // 10_000
+    assert SlippageModel().limit(market, missing, given_out=True) == (
+        leg.quoted * 10_500 // 10_000
+    )
+
+
+def test_longer_delays_widen_the_bounds():
+    market = _market([("univ2", YFI, WETH, 1000 * E18, 10_000 * E18)])
+    leg = _sell(1000 * E18, 10_000 * E18)
+
+    limits = [SlippageModel(delay_blocks=d).limit(market, leg) for d in (1, 25, 100)]
+
+    assert limits == sorted(limits, reverse=True)
+
+
+def test_multi_hop_compounds():
+    reserves = (1000 * E18, 10_000 * E18)
+    market = _market(
+        [
+            ("univ2", YFI, WETH, *reserves),
+            ("univ2", YFI, UNI, *reserves),
+            ("univ2", UNI, WETH, 10_000 * E18, 10_000 * E18),
+        ]
+    )
+    direct = _sell(*reserves)
+    quoted = market.v2.quote_path("univ2", [YFI, UNI, WETH], E18)
+    hops = Leg("univ2", 0, [YFI, UNI, WETH], E18, quoted)
+
+    model = SlippageModel()
+    assert len(model.hops(market, hops)) == 2
+    assert _bps(model.limit(market, hops), quoted) > _bps(
+        model.limit(market, direct), direct.quoted
+    )
+
+
+def test_v3_uses_the_virtual_reserves():
+    # at tick 0 the virtual reserves of both tokens are the liquidity
+    liquidity = 1000 * E18
+    (token0, token1) = sort_tokens(UNI, WETH)
+    pool = V3Pool(
+        token0, token1, 3000, 60, get_sqrt_ratio_at_tick(0), 0, liquidity, {}, {}, 0, 0
+    )
+    market = _market(
+        [("univ2", UNI, WETH, liquidity, liquidity)], {(token0, token1, 3000): pool}
+    )
+    v2 = Leg("univ2", 0, [UNI, WETH], E18, E18)
+    v3 = Leg("univ3", 3000, [UNI, WETH], E18, E18)
+
+    model = SlippageModel()
+    assert model.hops(market, v3) == [(liquidity, E18)]
+    assert model.limit(market, v3) == model.limit(market, v2)
+    assert model.limit(market, v3._replace(path=[WETH, UNI])) == model.limit(market, v2)
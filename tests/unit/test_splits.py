@@ -0,0 +1,83 @@
+import pytest
+
+from scripts.market import Market
+from scripts.splits import split_given_in, split_given_out
+from scripts.univ2_math import V2Snapshot, sort_tokens
+from scripts.univ3_math import V3Snapshot
+
+TOKEN = "0x0bc529c00C6401aEF6D220BE8C6Ea1667F6Ad93e"  # YFI
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+
+(TOKEN0, TOKEN1) = sort_tokens(TOKEN, WETH)
+
+
+def _market(univ2, sushi):
+    """
+    Market with two YFI/WETH pairs, reserves given as (YFI, WETH).
+    """
+    reserves = {}
+    for (venue, (r_token, r_weth)) in (("univ2", univ2), ("sushi", sushi)):
+        if TOKEN0 == TOKEN.lower():
+            reserves[(venue, TOKEN0, TOKEN1)] = (r_token, r_weth)
+        else:
+            reserves[(venue, TOKEN0, TOKEN1)] = (r_weth, r_token)
+
+    return Market(V2Snapshot(1, reserves), V3Snapshot(1, {}))
+
+
+def test_equal_pools_split_evenly():
+    market = _market(
+        (1000 * 10**18, 500 * 10**18), (1000 * 10**18, 500 * 10**18)
+    )
+    amount = 100 * 10**18
+
+    split = split_given_in(market, TOKEN, WETH, amount)
+    single = market.quote(("univ2", 0), TOKEN, WETH, amount)
+
+    assert [r for (r, _, _) in split] == [("univ2", 0), ("sushi", 0)]
+    assert sum(a for (_, a, _) in split) == amount
+    assert split[0][1] == split[1][1]
+    assert sum(out for (_, _, out) in split) > single
+
+
+def test_split_follows_depth():
+    market = _market(
+        (3000 * 10**18, 1500 * 10**18), (1000 * 10**18, 500 * 10**18)
+    )
+
+    split = dict(
+        (r, a) for (r, a, _) in split_given_in(market, TOKEN, WETH, 100 * 10**18)
+    )
+
+    assert split[("univ2", 0)] == 3 * split[("sushi", 0)]
+
+
+def test_small_amounts_stay_on_the_best_pool():
+    market = _market(
+        (1000 * 10**18, 500 * 10**18), (1000 * 10**18, 490 * 10**18)
+    )
+
+    split = split_given_in(market, TOKEN, WETH, 10**15)
+
+    assert [r for (r, _, _) in split] == [("univ2", 0)]
+
+
+def test_given_out_pays_less_than_a_single_pool():
+    market = _market(
+        (1000 * 10**18, 500 * 10**18), (1000 * 10**18, 500 * 10**18)
+    )
+    amount = 200 * 10**18
+
+    split = split_given_out(market, WETH, TOKEN, amount)
+    single = market.quote(("univ2", 0), WETH, TOKEN, amount, given_out=True)
+
+    assert sum(a for (_, a, _) in split) == amount
+    assert sum(cost for (_, _, cost) in split) < single
+
+
+def test_amounts_no_route_can_fill_raise():
+    market = _market((1000 * 10**18, 500 * 10**18), (0, 0))
+
+    assert split_given_in(market, TOKEN, WETH, 0) == []
+    with pytest.raises(ValueError):
+        split_given_out(market, WETH, TOKEN, 2000 * 10**18)
@@ -0,0 +1,83 @@
+import pytest
+
+from scripts.univ2_math import (
+    V2Snapshot,
+    amounts_in,
+    amounts_out,
+    get_amount_in,
+    get_amount_out,
+    sort_tokens,
+)
+
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+YFI = "0x0bc529c00C6401aEF6D220BE8C6Ea1667F6Ad93e"
+
+RESERVE_YFI = 1_234 * 10**18 + 567
+RESERVE_WETH = 8_901 * 10**18 + 234
+
+
+@pytest.fixture
+def snapshot():
+    (token0, token1) = sort_tokens(YFI, WETH)
+    assert token0 == YFI.lower()
+
+    yield V2Snapshot(1, {("sushi", token0, token1): (RESERVE_YFI, RESERVE_WETH)})
+
+
+def test_get_amount_out_matches_library():
+    # amountInWithFee * reserveOut / (reserveIn * 1000 + amountInWithFee)
+    assert (
+        get_amount_out(10**18, 100 * 10**18, 200 * 10**18) == 1974316068794122597
+    )
+
+
+def test_get_amount_in_matches_library():
+    # reserveIn * amountOut * 1000 / ((reserveOut - amountOut) * 997) + 1
+    assert get_amount_in(10**18, 100 * 10**18, 200 * 10**18) == 504024636724243082
+
+
+def test_round_trip_covers_amount():
+    amount_in = get_amount_in(10**18, RESERVE_WETH, RESERVE_YFI)
+    assert get_amount_out(amount_in, RESERVE_WETH, RESERVE_YFI) >= 10**18
+    assert get_amount_out(amount_in - 1, RESERVE_WETH, RESERVE_YFI) < 10**18
+
+
+def test_reverts_like_library():
+    with pytest.raises(ValueError):
+        get_amount_out(0, 1, 1)
+    with pytest.raises(ValueError):
+        get_amount_in(10, 100, 10)
+
+
+def test_vectorized_matches_scalar():
+    amounts = [0] + [i * 10**15 + i for i in range(1, 2000)]
+
+    assert amounts_out(amounts, RESERVE_YFI, RESERVE_WETH) == [0] + [
+        get_amount_out(a, RESERVE_YFI, RESERVE_WETH) for a in amounts[1:]
+    ]
+    assert amounts_in(amounts, RESERVE_WETH, RESERVE_YFI) == [2**256 - 1] + [
+        get_amount_in(a, RESERVE_WETH, RESERVE_YFI) for a in amounts[1:]
+    ]
+
+
+def test_snapshot_orients_reserves(snapshot):
+    assert snapshot.get_reserves("sushi", YFI, WETH) == (RESERVE_YFI, RESERVE_WETH)
+    assert snapshot.get_reserves("sushi", WETH, YFI) == (RESERVE_WETH, RESERVE_YFI)
+    assert snapshot.quote("sushi", YFI, WETH, 10**18) == get_amount_out(
+        10**18, RESERVE_YFI, RESERVE_WETH
+    )
+
+
+def test_snapshot_sentinels(snapshot):
+    assert snapshot.quote("univ2", YFI, WETH, 10**18) == 0
+    assert snapshot.quote("univ2", WETH, YFI, 10**18, given_out=True) == 2**256 - 1
+    assert (
+        snapshot.quote("sushi", WETH, YFI, RESERVE_YFI, given_out=True) == 2**256 - 1
+    )
+
+
+def test_snapshot_path(snapshot):
+    assert snapshot.quote_path("sushi", [YFI, WETH], 10**18) == snapshot.quote(
+        "sushi", YFI, WETH, 10**18
+    )
+    assert snapshot.quote_path("sushi", [YFI, WETH, YFI], 10**18) < 10**18